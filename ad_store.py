@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Ad Store Module
+
+Dieses Modul stellt eine SQLite-Datenbank (WAL-Modus) für Anzeigen, Verkäufer, Bilder,
+Analysen und Chatverläufe bereit. Anzeigen lassen sich darüber ohne Durchsuchen des
+Ausgabeverzeichnisses nachschlagen und nach Verkäufer, Postleitzahl oder Zeitpunkt abfragen.
+Die JSON-Dateien in output/ werden weiterhin geschrieben und dienen als Export.
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+import threading
+from glob import glob
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DEFAULT_DB_PATH = os.path.join('output', 'ads.db')
+
+# Felder einer Anzeige, die in eigenen Spalten bzw. Tabellen abgelegt werden
+AD_FIELDS = ('id', 'url', 'scraped_at', 'title', 'price', 'description', 'details', 'location', 'seller', 'images')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sellers (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    type TEXT,
+    member_since TEXT,
+    profile_url TEXT,
+    profile_json TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ads (
+    id TEXT PRIMARY KEY,
+    url TEXT,
+    scraped_at TEXT,
+    title TEXT,
+    price TEXT,
+    description TEXT,
+    zip_code TEXT,
+    city TEXT,
+    seller_id TEXT REFERENCES sellers(id),
+    details_json TEXT,
+    location_json TEXT,
+    seller_json TEXT,
+    extra_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS images (
+    ad_id TEXT NOT NULL REFERENCES ads(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    filename TEXT,
+    original_url TEXT,
+    width INTEGER,
+    height INTEGER,
+    size_bytes INTEGER,
+    PRIMARY KEY (ad_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    ad_id TEXT PRIMARY KEY,
+    model TEXT,
+    success INTEGER,
+    analyzed_at TEXT,
+    result_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chats (
+    ad_id TEXT PRIMARY KEY,
+    model TEXT,
+    created_at TEXT,
+    last_updated TEXT,
+    summary_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chat_turns (
+    ad_id TEXT NOT NULL REFERENCES chats(ad_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    role TEXT,
+    content TEXT,
+    PRIMARY KEY (ad_id, position)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ads_seller_id ON ads(seller_id);
+CREATE INDEX IF NOT EXISTS idx_ads_zip_code ON ads(zip_code);
+CREATE INDEX IF NOT EXISTS idx_ads_scraped_at ON ads(scraped_at);
+"""
+
+
+class AdStore:
+    """SQLite-Speicher für Anzeigen, Verkäufer, Bilder, Analysen und Chatverläufe."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """
+        Initialisiert die Datenbank und legt das Schema an.
+
+        Args:
+            db_path (str, optional): Pfad der Datenbankdatei. Standardmäßig "output/ads.db".
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        # Zuletzt geprüfte Änderungszeiten der JSON-Dateien (siehe import_newer_files)
+        self._file_mtimes: Dict[str, float] = {}
+        self._file_mtimes_lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Ergänzt Spalten, die in älteren Datenbanken fehlen"""
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(chats)')}
+        if 'summary_json' not in columns:
+            with conn:
+                conn.execute('ALTER TABLE chats ADD COLUMN summary_json TEXT')
+
+    def _connection(self) -> sqlite3.Connection:
+        """Liefert die Verbindung des aktuellen Threads (sqlite3-Verbindungen sind nicht threadsicher)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Schließt die Verbindung des aktuellen Threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # Anzeigen
+
+    def save_ad(self, data: Dict[str, Any]) -> None:
+        """
+        Speichert eine Anzeige samt Verkäufer und Bildern (ersetzt eine vorhandene Anzeige).
+
+        Args:
+            data (Dict[str, Any]): Daten der Anzeige wie von KleinanzeigenScraper.scrape()
+        """
+        seller = data.get('seller') or {}
+        location = data.get('location') or {}
+        seller_id = seller.get('user_id')
+        extra = {key: value for key, value in data.items() if key not in AD_FIELDS}
+
+        conn = self._connection()
+        with conn:
+            if seller_id:
+                conn.execute(
+                    """INSERT INTO sellers (id, name, type, member_since, profile_url, profile_json, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(id) DO UPDATE SET
+                           name = excluded.name, type = excluded.type, member_since = excluded.member_since,
+                           profile_url = excluded.profile_url, profile_json = excluded.profile_json,
+                           updated_at = excluded.updated_at""",
+                    (seller_id, seller.get('name'), seller.get('type'), seller.get('member_since'),
+                     seller.get('profile_url'), _dumps(seller.get('profile')), data.get('scraped_at'))
+                )
+
+            conn.execute(
+                """INSERT INTO ads (id, url, scraped_at, title, price, description, zip_code, city,
+                                  seller_id, details_json, location_json, seller_json, extra_json)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET
+                       url = excluded.url, scraped_at = excluded.scraped_at, title = excluded.title,
+                       price = excluded.price, description = excluded.description, zip_code = excluded.zip_code,
+                       city = excluded.city, seller_id = excluded.seller_id, details_json = excluded.details_json,
+                       location_json = excluded.location_json, seller_json = excluded.seller_json,
+                       extra_json = excluded.extra_json""",
+                (data['id'], data.get('url'), data.get('scraped_at'), data.get('title'), data.get('price'),
+                 data.get('description'), location.get('zip_code'), location.get('city'), seller_id,
+                 _dumps(data.get('details')), _dumps(data.get('location')), _dumps(data.get('seller')),
+                 _dumps(extra) if extra else None)
+            )
+
+            conn.execute('DELETE FROM images WHERE ad_id = ?', (data['id'],))
+            conn.executemany(
+                """INSERT INTO images (ad_id, position, filename, original_url, width, height, size_bytes)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [(data['id'], position, image.get('filename'), image.get('original_url'),
+                  image.get('width'), image.get('height'), image.get('size_bytes'))
+                 for position, image in enumerate(data.get('images') or [])]
+            )
+
+    def get_ad(self, ad_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Liefert eine Anzeige in derselben Struktur wie die JSON-Ausgabe des Scrapers.
+
+        Args:
+            ad_id (str): ID der Anzeige
+
+        Returns:
+            Optional[Dict[str, Any]]: Daten der Anzeige oder None
+        """
+        conn = self._connection()
+        row = conn.execute('SELECT * FROM ads WHERE id = ?', (ad_id,)).fetchone()
+        if row is None:
+            return None
+
+        images = conn.execute(
+            """SELECT filename, original_url, width, height, size_bytes
+               FROM images WHERE ad_id = ? ORDER BY position""",
+            (ad_id,)
+        ).fetchall()
+
+        data = {
+            'id': row['id'],
+            'url': row['url'],
+            'scraped_at': row['scraped_at'],
+            'title': row['title'],
+            'price': row['price'],
+            'description': row['description'],
+            'details': _loads(row['details_json']),
+            'location': _loads(row['location_json']),
+            'seller': _loads(row['seller_json']),
+            'images': [dict(image) for image in images]
+        }
+        if row['extra_json']:
+            data.update(json.loads(row['extra_json']))
+        return data
+
+    def touch_ad(self, ad_id: str, checked_at: str) -> None:
+        """
+        Vermerkt, dass eine Anzeige geprüft wurde und unverändert ist.
+
+        Args:
+            ad_id (str): ID der Anzeige
+            checked_at (str): Zeitpunkt der Prüfung (ISO 8601)
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE ads SET extra_json = json_set(COALESCE(extra_json, '{}'), '$.last_checked_at', ?) WHERE id = ?",
+                (checked_at, ad_id)
+            )
+
+    def has_ad(self, ad_id: str) -> bool:
+        """Gibt an, ob eine Anzeige gespeichert ist"""
+        row = self._connection().execute('SELECT 1 FROM ads WHERE id = ?', (ad_id,)).fetchone()
+        return row is not None
+
+    def list_ads(self, seller_id: Optional[str] = None, zip_code: Optional[str] = None,
+                 limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Listet Anzeigen, die neuesten zuerst.
+
+        Args:
+            seller_id (str, optional): Nur Anzeigen dieses Verkäufers
+            zip_code (str, optional): Nur Anzeigen mit dieser Postleitzahl
+            limit (int, optional): Maximale Anzahl. Standardmäßig 50.
+            offset (int, optional): Anzahl zu überspringender Anzeigen. Standardmäßig 0.
+
+        Returns:
+            List[Dict[str, Any]]: Kurzinformationen (id, title, price, zip_code, city, seller_id, scraped_at)
+        """
+        conditions = []
+        params = []
+        if seller_id:
+            conditions.append('seller_id = ?')
+            params.append(seller_id)
+        if zip_code:
+            conditions.append('zip_code = ?')
+            params.append(zip_code)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self._connection().execute(
+            f"""SELECT id, title, price, zip_code, city, seller_id, scraped_at
+                FROM ads {where} ORDER BY scraped_at DESC LIMIT ? OFFSET ?""",
+            (*params, limit, offset)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # Analysen
+
+    def list_unanalyzed(self, include_failed: bool = False, since: Optional[str] = None,
+                        limit: Optional[int] = None) -> List[str]:
+        """
+        Listet die IDs der Anzeigen ohne Analyse, die ältesten zuerst.
+
+        Args:
+            include_failed (bool, optional): Auch Anzeigen mit fehlgeschlagener Analyse. Standardmäßig False.
+            since (str, optional): Nur Anzeigen, die ab diesem Zeitpunkt (ISO 8601) gescrapt wurden
+            limit (int, optional): Maximale Anzahl
+
+        Returns:
+            List[str]: IDs der Anzeigen
+        """
+        conditions = ['(analyses.ad_id IS NULL OR analyses.success = 0)' if include_failed else 'analyses.ad_id IS NULL']
+        params = []
+        if since:
+            conditions.append('ads.scraped_at >= ?')
+            params.append(since)
+
+        rows = self._connection().execute(
+            f"""SELECT ads.id FROM ads LEFT JOIN analyses ON analyses.ad_id = ads.id
+                WHERE {' AND '.join(conditions)} ORDER BY ads.scraped_at, ads.id LIMIT ?""",
+            (*params, limit if limit is not None else -1)
+        ).fetchall()
+        return [row['id'] for row in rows]
+
+    def save_analysis(self, ad_id: str, result: Dict[str, Any]) -> None:
+        """
+        Speichert das Analyseergebnis einer Anzeige.
+
+        Args:
+            ad_id (str): ID der Anzeige
+            result (Dict[str, Any]): Ergebnis von GeminiAnalyzer.analyze()
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO analyses (ad_id, model, success, analyzed_at, result_json)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (ad_id, result.get('model'), int(bool(result.get('success'))), result.get('analyzed_at'),
+                 _dumps(result))
+            )
+
+    def get_analysis(self, ad_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Liefert das Analyseergebnis einer Anzeige.
+
+        Args:
+            ad_id (str): ID der Anzeige
+
+        Returns:
+            Optional[Dict[str, Any]]: Analyseergebnis oder None
+        """
+        row = self._connection().execute('SELECT result_json FROM analyses WHERE ad_id = ?', (ad_id,)).fetchone()
+        return _loads(row['result_json']) if row else None
+
+    # Chatverläufe
+
+    def save_chat(self, ad_id: str, chat_data: Dict[str, Any]) -> None:
+        """
+        Speichert den Chatverlauf einer Anzeige (ersetzt alle bisherigen Nachrichten).
+
+        Args:
+            ad_id (str): ID der Anzeige
+            chat_data (Dict[str, Any]): Chat mit model, created_at, last_updated, chat_history und summary
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """INSERT INTO chats (ad_id, model, created_at, last_updated, summary_json) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(ad_id) DO UPDATE SET model = excluded.model, last_updated = excluded.last_updated,
+                       summary_json = excluded.summary_json""",
+                (ad_id, chat_data.get('model'), chat_data.get('created_at'), chat_data.get('last_updated'),
+                 _dumps(chat_data.get('summary')))
+            )
+            conn.execute('DELETE FROM chat_turns WHERE ad_id = ?', (ad_id,))
+            conn.executemany(
+                'INSERT INTO chat_turns (ad_id, position, role, content) VALUES (?, ?, ?, ?)',
+                [(ad_id, position, turn.get('role'), turn.get('content'))
+                 for position, turn in enumerate(chat_data.get('chat_history') or [])]
+            )
+
+    def get_chat(self, ad_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Liefert den Chatverlauf einer Anzeige in der Struktur der Datei {ad_id}_chat.json.
+
+        Args:
+            ad_id (str): ID der Anzeige
+
+        Returns:
+            Optional[Dict[str, Any]]: Chatverlauf oder None
+        """
+        conn = self._connection()
+        row = conn.execute('SELECT * FROM chats WHERE ad_id = ?', (ad_id,)).fetchone()
+        if row is None:
+            return None
+
+        turns = conn.execute(
+            'SELECT role, content FROM chat_turns WHERE ad_id = ? ORDER BY position', (ad_id,)
+        ).fetchall()
+        return {
+            'ad_id': ad_id,
+            'model': row['model'],
+            'chat_history': [dict(turn) for turn in turns],
+            'summary': _loads(row['summary_json']),
+            'created_at': row['created_at'],
+            'last_updated': row['last_updated']
+        }
+
+    # Import der JSON-Dateien
+
+    def import_ad_files(self, ad_id: str, output_dir: str = 'output') -> bool:
+        """
+        Übernimmt Anzeige, Analyse und Chat einer Anzeige aus den JSON-Dateien in output/.
+
+        Args:
+            ad_id (str): ID der Anzeige
+            output_dir (str, optional): Ausgabeverzeichnis. Standardmäßig "output".
+
+        Returns:
+            bool: True, falls die Anzeige gefunden wurde
+        """
+        ad_path = os.path.join(output_dir, f'{ad_id}.json')
+        if not os.path.exists(ad_path):
+            return False
+
+        with open(ad_path, 'r', encoding='utf-8') as f:
+            self.save_ad(json.load(f))
+
+        analysis_path = os.path.join(output_dir, f'{ad_id}_analysis.json')
+        if os.path.exists(analysis_path):
+            with open(analysis_path, 'r', encoding='utf-8') as f:
+                self.save_analysis(ad_id, json.load(f))
+
+        chat_path = os.path.join(output_dir, f'{ad_id}_chat.json')
+        if os.path.exists(chat_path):
+            with open(chat_path, 'r', encoding='utf-8') as f:
+                self.save_chat(ad_id, json.load(f))
+
+        return True
+
+    def import_newer_files(self, ad_id: str, output_dir: str = 'output') -> bool:
+        """
+        Übernimmt Anzeige, Analyse und Chat aus den JSON-Dateien, wenn diese neuer sind als die
+        gespeicherten Daten, z.B. nach einem Scraper-Lauf ohne --db. Verglichen werden scraped_at
+        bzw. last_checked_at, analyzed_at und last_updated; gelesen wird eine Datei nur, wenn sich
+        ihre Änderungszeit seit der letzten Prüfung geändert hat.
+
+        Args:
+            ad_id (str): ID der Anzeige
+            output_dir (str, optional): Ausgabeverzeichnis. Standardmäßig "output".
+
+        Returns:
+            bool: True, falls Daten übernommen wurden
+        """
+        conn = self._connection()
+        imported = False
+
+        data = self._read_if_modified(os.path.join(output_dir, f'{ad_id}.json'))
+        if data is not None:
+            row = conn.execute(
+                "SELECT scraped_at, json_extract(extra_json, '$.last_checked_at') AS last_checked_at FROM ads WHERE id = ?",
+                (ad_id,)
+            ).fetchone()
+            if _is_newer(_ad_version(data), _ad_version(dict(row)) if row else None):
+                self.save_ad(data)
+                imported = True
+
+        analysis = self._read_if_modified(os.path.join(output_dir, f'{ad_id}_analysis.json'))
+        if analysis is not None:
+            row = conn.execute('SELECT analyzed_at FROM analyses WHERE ad_id = ?', (ad_id,)).fetchone()
+            if _is_newer(analysis.get('analyzed_at'), row['analyzed_at'] if row else None):
+                self.save_analysis(ad_id, analysis)
+                imported = True
+
+        chat = self._read_if_modified(os.path.join(output_dir, f'{ad_id}_chat.json'))
+        if chat is not None:
+            row = conn.execute('SELECT last_updated FROM chats WHERE ad_id = ?', (ad_id,)).fetchone()
+            if _is_newer(chat.get('last_updated'), row['last_updated'] if row else None):
+                self.save_chat(ad_id, chat)
+                imported = True
+
+        return imported
+
+    def _read_if_modified(self, path: str) -> Optional[Dict[str, Any]]:
+        """Liest eine JSON-Datei, falls sie existiert und seit der letzten Prüfung geändert wurde"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        with self._file_mtimes_lock:
+            if self._file_mtimes.get(path) == mtime:
+                return None
+            self._file_mtimes[path] = mtime
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data if isinstance(data, dict) else None
+
+    def import_directory(self, output_dir: str = 'output') -> int:
+        """
+        Übernimmt alle Anzeigen aus den JSON-Dateien eines Ausgabeverzeichnisses.
+
+        Args:
+            output_dir (str, optional): Ausgabeverzeichnis. Standardmäßig "output".
+
+        Returns:
+            int: Anzahl der übernommenen Anzeigen
+        """
+        count = 0
+        for path in sorted(glob(os.path.join(output_dir, '[0-9]*.json'))):
+            ad_id = os.path.splitext(os.path.basename(path))[0]
+            if ad_id.isdigit() and self.import_ad_files(ad_id, output_dir):
+                count += 1
+        return count
+
+
+def _ad_version(data: Dict[str, Any]) -> Optional[str]:
+    """Zeitpunkt des letzten Scrapens bzw. der letzten Prüfung einer Anzeige (ISO 8601)"""
+    times = [value for value in (data.get('scraped_at'), data.get('last_checked_at')) if value]
+    return max(times) if times else None
+
+
+def _is_newer(version: Optional[str], stored_version: Optional[str]) -> bool:
+    """Gibt an, ob ein Zeitpunkt (ISO 8601) neuer ist als der gespeicherte (fehlend: immer neuer)"""
+    return bool(version) and (not stored_version or version > stored_version)
+
+
+def _dumps(value: Any) -> Optional[str]:
+    """Serialisiert einen Wert als JSON (None bleibt None)"""
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def _loads(value: Optional[str]) -> Any:
+    """Deserialisiert einen JSON-Wert (None bleibt None)"""
+    return None if value is None else json.loads(value)
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Anzeigen-Datenbank verwalten')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Pfad der Datenbank')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='JSON-Dateien aus dem Ausgabeverzeichnis übernehmen')
+    import_parser.add_argument('output_dir', nargs='?', default='output', help='Ausgabeverzeichnis')
+
+    list_parser = subparsers.add_parser('list', help='Gespeicherte Anzeigen auflisten')
+    list_parser.add_argument('--seller', help='Nur Anzeigen dieses Verkäufers (userId)')
+    list_parser.add_argument('--zip', help='Nur Anzeigen mit dieser Postleitzahl')
+    list_parser.add_argument('--limit', type=int, default=50, help='Maximale Anzahl')
+
+    args = parser.parse_args()
+    store = AdStore(args.db)
+
+    if args.command == 'import':
+        started = datetime.now()
+        count = store.import_directory(args.output_dir)
+        print(f"{count} Anzeigen übernommen ({(datetime.now() - started).total_seconds():.1f} s)")
+    else:
+        for ad in store.list_ads(seller_id=args.seller, zip_code=args.zip, limit=args.limit):
+            print(f"{ad['id']}  {ad['scraped_at'] or '':<26}  {ad['zip_code'] or '':<5}  {ad['price'] or '':>10}  {ad['title']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,22 @@ Eine Flask-Anwendung, die den Kleinanzeigen-Scraper mit einer Benutzeroberfläch
 """
 
 import os
-import json
 import re
+import json
+import atexit
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory, send_file, flash, abort, Response, stream_with_context
 from flask_bootstrap import Bootstrap
+from werkzeug.security import safe_join
 from kleinanzeigen_scraper import KleinanzeigenScraper
-from gemini_analyzer import GeminiAnalyzer, save_analysis_result, save_chat_history
+from jobs import JobManager, DONE, FAILED
+from image_derivatives import ImageDerivativeCache, source_hash
+from ad_store import AdStore, DEFAULT_DB_PATH
+import metrics
+from chat_sessions import ChatSession, ChatSessionStore
+from gemini_analyzer import GeminiAnalyzer, save_analysis_result, save_chat_data
 
 # Umgebungsvariablen aus .env-Datei laden
 load_dotenv()
@@ -31,6 +38,13 @@ app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'kleinanzeigen-scraper-
 app.config['UPLOAD_FOLDER'] = 'output'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB max upload size
 app.config['GEMINI_API_KEY'] = os.getenv('GEMINI_API_KEY')  # Gemini API-Schlüssel aus Umgebungsvariable
+app.config['GEMINI_IMAGE_MAX_EDGE'] = int(os.getenv('GEMINI_IMAGE_MAX_EDGE', '768'))  # 0 = Originalbilder senden
+app.config['GEMINI_IMAGE_QUALITY'] = int(os.getenv('GEMINI_IMAGE_QUALITY', '80'))
+app.config['GEMINI_RESPONSE_CACHE'] = os.getenv('GEMINI_RESPONSE_CACHE', 'true').lower() in ('1', 'true', 'yes')
+app.config['GEMINI_RESPONSE_CACHE_MB'] = int(os.getenv('GEMINI_RESPONSE_CACHE_MB', '64'))
+app.config['GEMINI_CHAT_TOKEN_BUDGET'] = int(os.getenv('GEMINI_CHAT_TOKEN_BUDGET', '4000'))
+app.config['CHAT_SESSION_CACHE_SIZE'] = int(os.getenv('CHAT_SESSION_CACHE_SIZE', '128'))  # Aktive Chats im Speicher
+app.config['CHAT_SESSION_FLUSH_SECONDS'] = float(os.getenv('CHAT_SESSION_FLUSH_SECONDS', '2'))  # 0 = sofort speichern
 Bootstrap(app)
 
 # Überprüfen, ob der API-Schlüssel gesetzt ist
@@ -69,6 +83,84 @@ def markdown_filter(text):
 os.makedirs('output', exist_ok=True)
 os.makedirs('output/images', exist_ok=True)
 
+# Verkleinerte Varianten für die Bildergalerie (werden beim ersten Abruf erzeugt)
+IMAGES_DIR = os.path.abspath(os.path.join('output', 'images'))
+IMAGE_CACHE_MAX_AGE = 365 * 24 * 3600  # Versionierte Bild-URLs ändern sich nie
+image_variant_format = 'WEBP' if os.getenv('IMAGE_VARIANTS_WEBP', 'false').lower() in ('1', 'true', 'yes') else 'JPEG'
+image_variants = {
+    'thumb': ImageDerivativeCache(os.path.join('output', 'image_variants'), image_format=image_variant_format,
+                                  max_edge=int(os.getenv('IMAGE_THUMB_EDGE', '200')), quality=75),
+    'medium': ImageDerivativeCache(os.path.join('output', 'image_variants'), image_format=image_variant_format,
+                                   max_edge=int(os.getenv('IMAGE_MEDIUM_EDGE', '1024')), quality=82),
+}
+
+# Datenbank für Anzeigen, Analysen und Chatverläufe (die JSON-Dateien bleiben als Export erhalten)
+ad_store = AdStore(os.getenv('AD_STORE_PATH', DEFAULT_DB_PATH))
+
+# Prozessweiter Scraper, damit alle Anfragen denselben Connection-Pool (Keep-Alive) nutzen
+scraper = KleinanzeigenScraper(
+    output_dir='output',
+    pool_size=int(os.getenv('SCRAPER_POOL_SIZE', '10')),
+    timeout=float(os.getenv('SCRAPER_TIMEOUT', '30')),
+    seller_cache_ttl=float(os.getenv('SCRAPER_SELLER_CACHE_TTL', '86400')),
+    ad_store=ad_store
+)
+
+# Hintergrund-Jobs, damit Scrapen und KI-Analyse keine Webanfrage blockieren
+job_manager = JobManager(max_workers=int(os.getenv('SCRAPE_JOB_WORKERS', '4')))
+analysis_job_manager = JobManager(max_workers=int(os.getenv('ANALYSIS_JOB_WORKERS', '2')))
+
+def create_analyzer():
+    """Erstellt einen GeminiAnalyzer mit den konfigurierten Bildeinstellungen (der genai-Client ist prozessweit geteilt)"""
+    return GeminiAnalyzer(
+        api_key=app.config['GEMINI_API_KEY'],
+        image_max_edge=app.config['GEMINI_IMAGE_MAX_EDGE'],
+        image_quality=app.config['GEMINI_IMAGE_QUALITY'],
+        chat_token_budget=app.config['GEMINI_CHAT_TOKEN_BUDGET'],
+        response_cache=app.config['GEMINI_RESPONSE_CACHE'],
+        response_cache_max_bytes=app.config['GEMINI_RESPONSE_CACHE_MB'] * 2**20
+    )
+
+def load_ad(ad_id):
+    """
+    Lädt eine Anzeige aus der Datenbank. Neuere JSON-Dateien (z.B. von einem Scraper-Lauf ohne --db)
+    werden vorher übernommen, ebenso Anzeigen, die nur als JSON vorliegen.
+    """
+    ad_store.import_newer_files(ad_id, 'output')
+    return ad_store.get_ad(ad_id)
+
+def load_chat_session(ad_id):
+    """Lädt Anzeige, Analyse und Chatverlauf einer Anzeige als aktiven Chat (None ohne Anzeige oder Analyse)"""
+    data = load_ad(ad_id)
+    analysis_data = ad_store.get_analysis(ad_id) if data is not None else None
+    if analysis_data is None:
+        return None
+    chat_data = ad_store.get_chat(ad_id)
+    analyzer = create_analyzer()
+    analyzer.restore_chat(data, analysis_data, chat_data)
+    return ChatSession(ad_id, data, analysis_data, chat_data, analyzer)
+
+def persist_chat(ad_id, chat_data):
+    """Speichert einen Chatverlauf (Datenbank und JSON-Export)"""
+    ad_store.save_chat(ad_id, chat_data)
+    save_chat_data(ad_id, chat_data)
+
+# Aktive Chats im Speicher; geänderte Chats werden im Hintergrund gespeichert (spätestens beim Beenden)
+chat_sessions = ChatSessionStore(load_chat_session, persist_chat,
+                                 max_sessions=app.config['CHAT_SESSION_CACHE_SIZE'],
+                                 flush_interval=app.config['CHAT_SESSION_FLUSH_SECONDS'])
+atexit.register(chat_sessions.close)
+
+def find_job(job_id):
+    """Sucht einen Job in allen Job-Managern"""
+    return job_manager.get(job_id) or analysis_job_manager.get(job_id)
+
+def job_result_url(job):
+    """Liefert die URL, unter der das Ergebnis eines abgeschlossenen Jobs angezeigt wird"""
+    if job.kind == 'analysis':
+        return url_for('analyze', ad_id=job.meta['ad_id'])
+    return url_for('result', ad_id=job.result['id'], job=job.id)
+
 def is_valid_kleinanzeigen_url(url):
     """Überprüft, ob die URL eine gültige Kleinanzeigen-URL ist"""
     pattern = r'^https?://(?:www\.)?kleinanzeigen\.de/s-anzeige/.+/\d+-\d+-\d+$'
@@ -94,39 +186,95 @@ def scrape():
     if not is_valid_kleinanzeigen_url(url):
         return render_template('index.html', error='Bitte geben Sie eine gültige Kleinanzeigen-URL ein.')
 
-    try:
-        # Scraper initialisieren und URL scrapen
-        scraper = KleinanzeigenScraper(output_dir='output')
-        data = scraper.scrape(url)
+    # Scrapen als Hintergrund-Job starten und zur Statusseite weiterleiten
+    job = job_manager.submit('scrape', scraper.scrape, url, meta={'url': url})
+    return redirect(url_for('job_status', job_id=job.id))
 
-        # Zur Ergebnisseite weiterleiten
-        ad_id = data['id']
-        return redirect(url_for('result', ad_id=ad_id))
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Zeigt den Status eines Jobs an und leitet nach Abschluss zum Ergebnis weiter"""
+    job = find_job(job_id)
+    if not job:
+        return render_template('index.html', error='Der Auftrag wurde nicht gefunden oder ist abgelaufen.')
 
-    except Exception as e:
-        return render_template('index.html', error=f'Fehler beim Scrapen: {str(e)}')
+    if job.status == DONE:
+        return redirect(job_result_url(job))
+
+    if job.status == FAILED:
+        if job.kind == 'analysis':
+            flash(f'Fehler bei der Analyse: {job.error}', 'danger')
+            return redirect(url_for('result', ad_id=job.meta['ad_id']))
+        return render_template('index.html', error=f'Fehler beim Scrapen: {job.error}')
+
+    return render_template('job.html', job=job.to_dict())
 
 @app.route('/result/<ad_id>')
 def result(ad_id):
     """Zeigt die Ergebnisse für eine bestimmte Anzeigen-ID an"""
     try:
-        # JSON-Datei lesen
-        json_path = os.path.join('output', f'{ad_id}.json')
-        if not os.path.exists(json_path):
+        # Ergebnis direkt aus dem abgeschlossenen Job übernehmen, falls vorhanden
+        job = job_manager.get(request.args.get('job', ''))
+        if job and job.status == DONE and job.result and job.result.get('id') == ad_id:
+            return render_template('result.html', data=job.result)
+
+        # Anzeige aus der Datenbank laden
+        data = load_ad(ad_id)
+        if data is None:
             return render_template('index.html', error=f'Keine Daten für Anzeigen-ID {ad_id} gefunden.')
 
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
         return render_template('result.html', data=data)
 
     except Exception as e:
         return render_template('index.html', error=f'Fehler beim Laden der Ergebnisse: {str(e)}')
 
+@app.template_global()
+def image_url(filename, variant=None):
+    """Liefert die URL eines Bildes oder einer Variante, versioniert mit dem Hash des Originals"""
+    image_path = safe_join(IMAGES_DIR, filename)
+    version = source_hash(image_path)[:16] if image_path and os.path.isfile(image_path) else None
+    if variant:
+        return url_for('serve_image_variant', variant=variant, filename=filename, v=version)
+    return url_for('serve_image', filename=filename, v=version)
+
+def send_image(path, etag, version, mimetype=None):
+    """Sendet ein Bild mit starkem ETag; versionierte URLs dürfen dauerhaft zwischengespeichert werden"""
+    response = send_file(path, mimetype=mimetype, etag=etag, conditional=True)
+    if request.args.get('v') == version:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMAGE_CACHE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Ohne passende Version muss der Browser per ETag nachfragen
+        response.cache_control.no_cache = True
+    return response
+
 @app.route('/images/<path:filename>')
 def serve_image(filename):
     """Stellt Bilder aus dem Ausgabeverzeichnis bereit"""
-    return send_from_directory('output/images', filename)
+    image_path = safe_join(IMAGES_DIR, filename)
+    if not image_path or not os.path.isfile(image_path):
+        abort(404)
+
+    image_hash = source_hash(image_path)
+    return send_image(image_path, image_hash, image_hash[:16])
+
+@app.route('/variants/<variant>/<path:filename>')
+def serve_image_variant(variant, filename):
+    """Stellt eine verkleinerte Variante (thumb, medium) eines Bildes bereit"""
+    variant_cache = image_variants.get(variant)
+    image_path = safe_join(IMAGES_DIR, filename)
+    if not variant_cache or not image_path or not os.path.isfile(image_path):
+        abort(404)
+
+    try:
+        variant_path = variant_cache.ensure(image_path)
+    except Exception as e:
+        logger.error(f"Fehler beim Erzeugen der Bildvariante {variant} für {filename}: {str(e)}")
+        return serve_image(filename)
+
+    etag = os.path.splitext(os.path.basename(variant_path))[0]
+    return send_image(os.path.abspath(variant_path), etag, source_hash(image_path)[:16], variant_cache.mime_type)
 
 @app.route('/download/<ad_id>')
 def download_json(ad_id):
@@ -142,84 +290,51 @@ def analyze(ad_id):
         return redirect(url_for('result', ad_id=ad_id))
 
     try:
-        # JSON-Datei lesen
-        json_path = os.path.join('output', f'{ad_id}.json')
-        if not os.path.exists(json_path):
+        # Wenn POST-Anfrage mit Frage, dann Folgefrage im aktiven Chat stellen (Anzeige, Analyse und
+        # Chatverlauf werden nur beim ersten Mal geladen)
+        if request.method == 'POST' and 'question' in request.form:
+            session = chat_sessions.get(ad_id)
+            if session is not None:
+                question = request.form.get('question', '').strip()
+
+                if not question:
+                    flash('Bitte geben Sie eine Frage ein.', 'warning')
+                    return redirect(url_for('analyze', ad_id=ad_id))
+
+                # Folgefrage stellen; der Chatverlauf wird im Hintergrund gespeichert
+                with session.lock:
+                    chat_result = session.analyzer.ask_followup_question(question, ad_id)
+                    chat_data = chat_sessions.update(session, chat_result)
+
+                return render_template('analysis.html', data=session.data, analysis=session.analysis, chat=chat_data)
+
+        # Anzeige aus der Datenbank laden
+        data = load_ad(ad_id)
+        if data is None:
             flash('Keine Daten für Anzeigen-ID gefunden.', 'danger')
             return redirect(url_for('index'))
 
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        # Prüfen, ob bereits eine Analyse existiert
-        analysis_path = os.path.join('output', f'{ad_id}_analysis.json')
-        analysis_exists = os.path.exists(analysis_path)
-
-        # Prüfen, ob bereits ein Chat existiert
-        chat_path = os.path.join('output', f'{ad_id}_chat.json')
-        chat_data = None
-        if os.path.exists(chat_path):
-            with open(chat_path, 'r', encoding='utf-8') as f:
-                chat_data = json.load(f)
-
-        # Wenn POST-Anfrage mit Frage, dann Folgefrage stellen
-        if request.method == 'POST' and 'question' in request.form and analysis_exists:
-            question = request.form.get('question', '').strip()
-
-            if not question:
-                flash('Bitte geben Sie eine Frage ein.', 'warning')
-                return redirect(url_for('analyze', ad_id=ad_id))
+        # Vorhandene Analyse und vorhandenen Chat laden (aktive Chats aus dem Speicher, da sie
+        # noch nicht gespeichert sein müssen)
+        analysis_data = ad_store.get_analysis(ad_id)
+        analysis_exists = analysis_data is not None
+        chat_data = chat_sessions.chat(ad_id) or ad_store.get_chat(ad_id)
 
-            # Analyse-Daten laden
-            with open(analysis_path, 'r', encoding='utf-8') as f:
-                analysis_data = json.load(f)
-
-            # Gemini Analyzer initialisieren
-            analyzer = GeminiAnalyzer(api_key=app.config['GEMINI_API_KEY'])
-
-            # Chatverlauf laden, falls vorhanden
-            if chat_data and 'chat_history' in chat_data:
-                analyzer.chat_history = chat_data['chat_history']
-            elif analysis_data and 'chat_history' in analysis_data:
-                analyzer.chat_history = analysis_data['chat_history']
-
-            # Folgefrage stellen
-            chat_result = analyzer.ask_followup_question(question, ad_id)
-
-            # Chatverlauf speichern
-            save_chat_history(ad_id, chat_result)
-
-            # Chat-Daten aktualisieren
-            with open(chat_path, 'r', encoding='utf-8') as f:
-                chat_data = json.load(f)
-
-            return render_template('analysis.html', data=data, analysis=analysis_data, chat=chat_data)
-
-        # Wenn POST-Anfrage ohne Frage, dann Analyse durchführen
-        elif request.method == 'POST' and not analysis_exists:
-            # Bilder für die Analyse sammeln
-            image_paths = []
-            for image in data.get('images', []):
-                if 'filename' in image:
-                    image_path = os.path.join('output', 'images', image['filename'])
-                    if os.path.exists(image_path):
-                        image_paths.append(image_path)
-
-            # Gemini Analyzer initialisieren und Analyse durchführen
-            analyzer = GeminiAnalyzer(api_key=app.config['GEMINI_API_KEY'])
-            analysis_result = analyzer.analyze(data, image_paths)
-
-            # Analyseergebnis speichern
-            save_analysis_result(ad_id, analysis_result)
-
-            return render_template('analysis.html', data=data, analysis=analysis_result, chat=None)
+        # Wenn POST-Anfrage ohne Frage, dann Analyse im Hintergrund starten; gleichzeitige
+        # Anfragen für dieselbe Anzeige hängen sich an die bereits laufende Analyse an
+        if request.method == 'POST' and not analysis_exists:
+            job = submit_analysis(ad_id, data)
+            return redirect(url_for('job_status', job_id=job.id))
 
         # Bei GET-Anfrage und existierender Analyse, Analyse anzeigen
         elif analysis_exists:
-            with open(analysis_path, 'r', encoding='utf-8') as f:
-                analysis_data = json.load(f)
             return render_template('analysis.html', data=data, analysis=analysis_data, chat=chat_data)
 
+        # Bei GET-Anfrage während einer laufenden Analyse, Statusseite anzeigen
+        elif analysis_job_manager.find_active(f'analysis:{ad_id}'):
+            job = analysis_job_manager.find_active(f'analysis:{ad_id}')
+            return redirect(url_for('job_status', job_id=job.id))
+
         # Bei GET-Anfrage ohne existierende Analyse, Formular anzeigen
         else:
             return render_template('analyze_form.html', data=data)
@@ -229,6 +344,144 @@ def analyze(ad_id):
         flash(f'Fehler bei der Analyse: {str(e)}', 'danger')
         return redirect(url_for('result', ad_id=ad_id))
 
+@app.route('/analyze/<ad_id>/stream')
+def analyze_stream(ad_id):
+    """
+    Streamt eine neue Analyse als Server-Sent Events. Die Analyse läuft als Hintergrund-Job unter
+    demselben Schlüssel wie POST /analyze/<ad_id>; weitere Anfragen für dieselbe Anzeige lesen den
+    laufenden Job mit, statt eine zweite Analyse zu starten.
+    """
+    if not app.config.get('GEMINI_AVAILABLE', False):
+        return jsonify({'error': 'Die KI-Analyse-Funktion ist nicht verfügbar.'}), 503
+
+    data = load_ad(ad_id)
+    if data is None:
+        return jsonify({'error': 'Keine Daten für Anzeigen-ID gefunden.'}), 404
+
+    done_payload = {'redirect_url': url_for('analyze', ad_id=ad_id)}
+    analysis_data = ad_store.get_analysis(ad_id)
+    if analysis_data is not None:
+        # Bereits analysiert (z.B. in einem anderen Tab): vorhandene Analyse ausliefern
+        events = iter([{'type': 'chunk', 'text': analysis_data.get('analysis', '')},
+                       {'type': 'done', 'result': analysis_data}])
+        return sse_response(stream_events(events, lambda result: None, done_payload))
+
+    job = submit_analysis(ad_id, data)
+    return sse_response(job_events(job, done_payload))
+
+@app.route('/analyze/<ad_id>/followup/stream')
+def followup_stream(ad_id):
+    """Streamt die Antwort auf eine Folgefrage (?question=...) und speichert danach den Chatverlauf"""
+    if not app.config.get('GEMINI_AVAILABLE', False):
+        return jsonify({'error': 'Die KI-Analyse-Funktion ist nicht verfügbar.'}), 503
+
+    question = request.args.get('question', '').strip()
+    if not question:
+        return jsonify({'error': 'Bitte geben Sie eine Frage ein.'}), 400
+
+    session = chat_sessions.get(ad_id)
+    if session is None:
+        return jsonify({'error': 'Für diese Anzeige liegt noch keine Analyse vor.'}), 404
+
+    events = session_followup_stream(session, question)
+    return sse_response(stream_events(events, lambda result: chat_sessions.update(session, result), {}))
+
+def sse_response(events):
+    """Antwort für einen Stream von Server-Sent Events (ohne Zwischenspeicherung durch Proxys)"""
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def sse_event(event, payload):
+    """Formatiert ein Server-Sent Event mit JSON-Daten"""
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def job_events(job, done_payload):
+    """
+    Leitet die Ausgabe eines Analyse-Jobs als Events "chunk" weiter (von Anfang an, auch wenn der Job
+    schon läuft) und meldet nach seinem Ende "done" bzw. "failed". Trennt der Browser die Verbindung,
+    läuft der Job weiter und speichert die Analyse.
+    """
+    for text in job.output.follow():
+        yield sse_event('chunk', {'text': text})
+
+    result = job.result or {}
+    if job.status == DONE and result.get('success'):
+        yield sse_event('done', done_payload)
+    else:
+        yield sse_event('failed', dict(done_payload, error=job.error or result.get('error')))
+
+def stream_events(events, on_done, done_payload):
+    """
+    Leitet die Textabschnitte eines Gemini-Streams als Events "chunk" weiter. Das Ergebnis wird über
+    on_done gespeichert und als "done" bzw. bei einem Fehler als "failed" gemeldet.
+    """
+    try:
+        for event in events:
+            if event['type'] == 'chunk':
+                yield sse_event('chunk', {'text': event['text']})
+                continue
+
+            result = event['result']
+            on_done(result)
+            if result.get('success'):
+                yield sse_event('done', done_payload)
+            else:
+                yield sse_event('failed', dict(done_payload, error=result.get('error')))
+    except GeneratorExit:
+        # Verbindung vom Browser getrennt: Antwort trotzdem vollständig empfangen und speichern
+        for event in events:
+            if event['type'] == 'done':
+                on_done(event['result'])
+        raise
+
+def collect_image_paths(data):
+    """Sammelt die lokal gespeicherten Bilder einer Anzeige für die Analyse"""
+    image_paths = []
+    for image in data.get('images', []):
+        if 'filename' in image:
+            image_path = os.path.join('output', 'images', image['filename'])
+            if os.path.exists(image_path):
+                image_paths.append(image_path)
+    return image_paths
+
+def session_followup_stream(session, question):
+    """Streamt eine Folgefrage im aktiven Chat; weitere Fragen zum selben Chat warten auf das Ende der Antwort"""
+    with session.lock:
+        yield from session.analyzer.ask_followup_stream(question, session.ad_id)
+
+def store_analysis(ad_id, analysis_result):
+    """Speichert ein Analyseergebnis (Datenbank und JSON-Export)"""
+    save_analysis_result(ad_id, analysis_result)
+    ad_store.save_analysis(ad_id, analysis_result)
+
+def submit_analysis(ad_id, data):
+    """Startet die Analyse einer Anzeige als Hintergrund-Job oder liefert den bereits laufenden Job"""
+    return analysis_job_manager.submit('analysis', run_analysis, ad_id, data,
+                                       meta={'ad_id': ad_id, 'title': data.get('title')},
+                                       key=f'analysis:{ad_id}', stream=True)
+
+def run_analysis(ad_id, data, output=None):
+    """
+    Führt die Gemini-Analyse einer Anzeige aus und speichert das Ergebnis (läuft als Hintergrund-Job).
+    Mit output wird der Text abschnittsweise bereitgestellt, während Gemini ihn erzeugt.
+    """
+    # Gemini Analyzer initialisieren und Analyse durchführen
+    analyzer = create_analyzer()
+    if output is None:
+        analysis_result = analyzer.analyze(data, collect_image_paths(data))
+    else:
+        analysis_result = None
+        for event in analyzer.analyze_stream(data, collect_image_paths(data)):
+            if event['type'] == 'chunk':
+                output.write(event['text'])
+            else:
+                analysis_result = event['result']
+
+    # Analyseergebnis speichern (Datenbank und JSON-Export)
+    store_analysis(ad_id, analysis_result)
+
+    return {'ad_id': ad_id, 'success': analysis_result.get('success', False), 'error': analysis_result.get('error')}
+
 @app.route('/download_analysis/<ad_id>')
 def download_analysis(ad_id):
     """Ermöglicht den Download der Analysedatei"""
@@ -237,6 +490,7 @@ def download_analysis(ad_id):
 @app.route('/download_chat/<ad_id>')
 def download_chat(ad_id):
     """Ermöglicht den Download des Chatverlaufs"""
+    chat_sessions.flush(ad_id)  # Noch nicht gespeicherte Fragen in den Export übernehmen
     return send_from_directory('output', f'{ad_id}_chat.json', as_attachment=True)
 
 @app.route('/api/scrape', methods=['POST'])
@@ -254,15 +508,33 @@ def api_scrape():
     if not is_valid_kleinanzeigen_url(url):
         return jsonify({'error': 'Ungültige Kleinanzeigen-URL'}), 400
 
-    try:
-        # Scraper initialisieren und URL scrapen
-        scraper = KleinanzeigenScraper(output_dir='output')
-        result_data = scraper.scrape(url)
-
-        return jsonify({'success': True, 'data': result_data}), 200
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # Scrapen als Hintergrund-Job starten; der Status ist über /api/jobs/<job_id> abrufbar
+    job = job_manager.submit('scrape', scraper.scrape, url, meta={'url': url})
+    status_url = url_for('api_job_status', job_id=job.id)
+
+    response = jsonify({'success': True, 'job_id': job.id, 'status': job.status, 'status_url': status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """API-Endpunkt für den Status eines Jobs (queued, running, done, failed)"""
+    job = find_job(job_id)
+    if not job:
+        return jsonify({'error': 'Unbekannter Job'}), 404
+
+    status = job.to_dict()
+    if job.status == DONE:
+        status['result_url'] = job_result_url(job)
+        if job.kind == 'scrape':
+            status['data'] = job.result
+
+    return jsonify(status), 200
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Laufzeitkennzahlen von Scraper und Analyse im Prometheus-Textformat"""
+    return Response(metrics.registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark der Massenanalyse
+
+Ersetzt den genai-Client durch einen lokalen Stub mit fester Antwortzeit, der für einige Anzeigen
+einen Fehler meldet. Ein Lauf über --ads synthetische Anzeigen wird nach etwa der Hälfte
+unterbrochen und anschließend fortgesetzt. Geprüft wird:
+
+- höchstens --workers Anfragen gleichzeitig
+- das Budget von --rpm Anfragen pro Minute wird eingehalten
+- der fortgesetzte Lauf analysiert keine Anzeige doppelt und lässt keine aus
+- fehlgeschlagene Analysen werden nicht gespeichert
+- ein neuer Lauf versucht nur die fehlgeschlagenen Anzeigen erneut
+
+Aufruf:
+    python benchmarks/bulk_analysis_benchmark.py [--ads 40] [--workers 4] [--rpm 1200] [--latency 0.3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ad_store import AdStore  # noqa: E402
+from bulk_analysis import BulkAnalyzer  # noqa: E402
+from gemini_analyzer import GeminiAnalyzer  # noqa: E402
+
+FIRST_AD_ID = 8000000000
+
+
+class StubModels:
+    """Ersatz für client.models: feste Antwortzeit, Fehler für jede --fail-every-te Anzeige"""
+
+    def __init__(self, latency, fail_every):
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = []  # (Zeitpunkt, Titel)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents):
+        title = contents[0].split('Titel: ', 1)[1].split('\n', 1)[0]
+        with self._lock:
+            self.calls.append((time.monotonic(), title))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if int(title.rsplit(' ', 1)[-1]) % self.fail_every == 0:
+                raise RuntimeError('429 RESOURCE_EXHAUSTED (Stub)')
+            return type('Response', (), {'text': f"Analyse von {title}"})()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Benchmark der Massenanalyse mit Unterbrechung')
+    parser.add_argument('--ads', type=int, default=40, help='Anzahl der Anzeigen')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='Maximale Anzahl gleichzeitiger Anfragen')
+    parser.add_argument('--rpm', type=float, default=1200, help='Anfragen pro Minute')
+    parser.add_argument('--latency', type=float, default=0.3, help='Antwortzeit des Stub-Modells in Sekunden')
+    parser.add_argument('--fail-every', type=int, default=10, help='Jede n-te Anzeige schlägt fehl')
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as output_dir:
+        store = AdStore(os.path.join(output_dir, 'ads.db'))
+        for i in range(args.ads):
+            store.save_ad({'id': str(FIRST_AD_ID + i), 'title': f'Anzeige {i}', 'price': '50',
+                           'scraped_at': f'2025-01-01T00:{i // 60:02d}:{i % 60:02d}', 'images': []})
+
+        analyzer = GeminiAnalyzer(api_key='stub', image_max_edge=0, response_cache=False)
+        stub = StubModels(args.latency, args.fail_every)
+        analyzer.client = type('StubClient', (), {'models': stub})()
+        checkpoint_path = os.path.join(output_dir, 'checkpoint.json')
+
+        def bulk():
+            return BulkAnalyzer(analyzer, store, output_dir=output_dir, workers=args.workers,
+                                requests_per_minute=args.rpm, checkpoint_path=checkpoint_path)
+
+        # Erster Lauf, nach etwa der Hälfte der Anfragen unterbrochen
+        stop = threading.Event()
+
+        def interrupt():
+            while len(stub.calls) < args.ads // 2:
+                time.sleep(0.01)
+            stop.set()
+
+        threading.Thread(target=interrupt, daemon=True).start()
+        first = bulk().run(stop_event=stop)
+        checkpoint_kept = os.path.exists(checkpoint_path)
+
+        # Fortsetzung
+        second = bulk().run()
+        checkpoint_removed = not os.path.exists(checkpoint_path)
+
+        analyzed = sum(1 for i in range(args.ads) if (store.get_analysis(str(FIRST_AD_ID + i)) or {}).get('success'))
+        stored_failures = sum(1 for i in range(args.ads) if store.get_analysis(str(FIRST_AD_ID + i)) is None)
+
+        # Neuer Lauf: nur die fehlgeschlagenen Anzeigen sind noch offen
+        calls_before = len(stub.calls)
+        third = bulk().run()
+        third_calls = len(stub.calls) - calls_before
+
+    expected_failures = len([i for i in range(args.ads) if i % args.fail_every == 0])
+    duplicates = [title for title, count in Counter(title for _, title in stub.calls[:calls_before]).items() if count > 1]
+    call_times = [t for t, _ in stub.calls[:calls_before]]
+    elapsed = call_times[-1] - call_times[0] if len(call_times) > 1 else 0
+    rate_limit_calls = args.rpm / 60 * elapsed + 1
+
+    print(f"{args.ads} Anzeigen, {args.workers} Worker, Budget {args.rpm:g} Anfragen/min, "
+          f"Antwortzeit {args.latency:g} s")
+    print(f"{'Lauf':<14} {'analysiert':>10} {'Fehler':>7} {'offen':>6} {'Dauer s':>8}")
+    for label, summary in (('unterbrochen', first), ('fortgesetzt', second)):
+        print(f"{label:<14} {summary['done']:>10} {summary['failed']:>7} {summary['remaining']:>6} "
+              f"{summary['elapsed']:>8.2f}")
+    print(f"Gleichzeitige Anfragen: max. {stub.max_in_flight}, Anfragen: {calls_before} "
+          f"(erlaubt: {rate_limit_calls:.0f}), doppelt: {len(duplicates)}")
+
+    if stub.max_in_flight > args.workers:
+        failed = True
+        print("FEHLER: Mehr gleichzeitige Anfragen als Worker")
+    if calls_before > rate_limit_calls:
+        failed = True
+        print("FEHLER: Anfragebudget überschritten")
+    if not first['remaining'] or not checkpoint_kept or not second['resumed'] or not checkpoint_removed:
+        failed = True
+        print("FEHLER: Unterbrochener Lauf wurde nicht über den Checkpoint fortgesetzt")
+    if duplicates or analyzed != args.ads - expected_failures or stored_failures != expected_failures:
+        failed = True
+        print("FEHLER: Anzeigen doppelt, nicht oder mit Fehler gespeichert analysiert")
+    if third['total'] != expected_failures or third_calls != expected_failures:
+        failed = True
+        print(f"FEHLER: Neuer Lauf hat {third_calls} statt {expected_failures} Anzeigen analysiert")
+
+    if failed:
+        sys.exit(1)
+    print("Der unterbrochene Lauf wurde ohne doppelte Analysen fortgesetzt; Budget und Parallelität wurden eingehalten.")
+
+
+if __name__ == "__main__":
+    main()
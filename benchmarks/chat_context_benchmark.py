@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark des Kontexts für Folgefragen
+
+Ersetzt den genai-Client durch einen lokalen Stub, der lange Antworten liefert, und stellt nach
+einer Analyse --questions Folgefragen. Verglichen werden die pro Frage gesendeten (geschätzten)
+Tokens ohne Begrenzung (gesamter Verlauf und Analyse bei jeder Frage) und mit Token-Budget
+(letzte Nachrichten wörtlich, ältere zusammengefasst). Geprüft wird außerdem, dass der Kontext das
+Budget einhält, die Eckdaten genau einmal enthält, von der Gemini-API als Inhalt akzeptiert wird
+und die Zusammenfassung nicht bei jeder Frage neu erstellt wird.
+
+Aufruf:
+    python benchmarks/chat_context_benchmark.py [--questions 20] [--budget 4000] [--answer-words 250]
+"""
+
+import os
+import sys
+import argparse
+
+from google.genai import _transformers
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chat_context import estimate_tokens  # noqa: E402
+from gemini_analyzer import GeminiAnalyzer  # noqa: E402
+
+AD = {
+    'id': '9100000000',
+    'title': 'Trekkingrad 28 Zoll, Rahmenhöhe 56 cm',
+    'price': '450 € VB',
+    'description': 'Gepflegtes Trekkingrad mit Nabendynamo, Gepäckträger und neuen Reifen. ' * 5,
+    'details': {'Art': 'Herren', 'Typ': 'Trekkingrad', 'Zustand': 'Gut'},
+}
+
+
+class StubModels:
+    """Ersatz für client.models: merkt sich die gesendeten Inhalte und antwortet mit festem Text"""
+
+    def __init__(self, answer_words):
+        self.answer_words = answer_words
+        self.requests = []  # (Art, Inhalte)
+
+    def generate_content(self, model, contents):
+        if isinstance(contents, str) and contents.startswith('Fasse'):
+            self.requests.append(('summary', contents))
+            return type('Response', (), {'text': 'Zusammenfassung: ' + 'Kernaussage ' * 80})()
+        kind = 'analysis' if isinstance(contents, list) and isinstance(contents[0], str) else 'followup'
+        self.requests.append((kind, contents))
+        return type('Response', (), {'text': ' '.join(['Antwort'] * self.answer_words)})()
+
+
+def content_tokens(contents):
+    """Geschätzte Tokens der Inhalte einer Folgefrage"""
+    return sum(estimate_tokens(part['text']) for content in contents for part in content['parts'])
+
+
+def run(budget, args):
+    """Analyse und Folgefragen; liefert die Tokens pro Frage, die Anzahl der Zusammenfassungen und den Stub"""
+    analyzer = GeminiAnalyzer(api_key='stub', image_max_edge=0, response_cache=False, chat_token_budget=budget)
+    stub = StubModels(args.answer_words * 2)  # Analyse doppelt so lang wie eine Antwort
+    analyzer.client = type('StubClient', (), {'models': stub})()
+    analyzer.analyze(AD, [])
+    stub.answer_words = args.answer_words
+
+    tokens = []
+    for i in range(args.questions):
+        result = analyzer.ask_followup_question(f"Frage {i + 1}: Was ist bei der Besichtigung zu beachten?", AD['id'])
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        tokens.append(content_tokens(stub.requests[-1][1]))
+    summaries = sum(1 for kind, _ in stub.requests if kind == 'summary')
+    return tokens, summaries, stub
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Benchmark des Token-Budgets für Folgefragen')
+    parser.add_argument('--questions', type=int, default=20, help='Anzahl der Folgefragen')
+    parser.add_argument('--budget', type=int, default=4000, help='Token-Budget des Kontexts')
+    parser.add_argument('--answer-words', type=int, default=250, help='Wörter pro Antwort des Stub-Modells')
+    args = parser.parse_args()
+
+    unbounded, _, _ = run(10 ** 9, args)
+    bounded, summaries, stub = run(args.budget, args)
+
+    print(f"{args.questions} Folgefragen, Antworten mit {args.answer_words} Wörtern, Budget {args.budget} Tokens")
+    print(f"{'Frage':>5} {'ohne Budget':>12} {'mit Budget':>11}")
+    for i in range(0, args.questions, max(1, args.questions // 10)):
+        print(f"{i + 1:>5} {unbounded[i]:>12} {bounded[i]:>11}")
+    print(f"{'Summe':>5} {sum(unbounded):>12} {sum(bounded):>11}")
+    print(f"Zusammenfassungen: {summaries} (bei {args.questions} Fragen)")
+
+    failed = False
+    followups = [contents for kind, contents in stub.requests if kind == 'followup']
+    if max(bounded) > args.budget:
+        failed = True
+        print(f"FEHLER: Kontext mit {max(bounded)} Tokens überschreitet das Budget")
+    for contents in followups:
+        _transformers.t_contents(contents)
+        texts = [part['text'] for content in contents for part in content['parts']]
+        if sum(text.count('Eckdaten der Anzeige') for text in texts) != 1 or AD['title'] not in texts[0]:
+            failed = True
+            print("FEHLER: Eckdaten fehlen oder sind mehrfach enthalten")
+            break
+    if not 0 < summaries < args.questions // 2:
+        failed = True
+        print("FEHLER: Zusammenfassung fehlt oder wird zu oft erstellt")
+
+    if failed:
+        sys.exit(1)
+    print("Der Kontext bleibt innerhalb des Budgets; ältere Nachrichten werden zusammengefasst.")
+
+
+if __name__ == "__main__":
+    main()
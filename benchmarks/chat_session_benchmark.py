@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark der aktiven Chats der Webapp
+
+Ersetzt genai.Client durch einen lokalen Stub und stellt über den Test-Client der Webapp
+--questions Folgefragen (POST /analyze/<ad_id>), verteilt auf --threads gleichzeitige Nutzer und
+--ads Anzeigen. Gezählt werden pro Frage: erzeugte genai-Clients, Modellaufrufe, Lesezugriffe auf
+die Datenbank, geöffnete Dateien und Speichervorgänge. Bisher kostete jede Frage einen neuen
+Client, drei Lesezugriffe (Anzeige, Analyse, Chat), das Lesen und Schreiben von {ad_id}_chat.json
+und einen Schreibzugriff auf die Datenbank.
+
+Geprüft wird außerdem, dass nach dem Beenden alle Fragen und Antworten vollständig und in
+abwechselnder Reihenfolge in Datenbank und JSON-Export stehen, und dass ein langsam ladender Chat
+weder andere Anzeigen blockiert noch für dieselbe Anzeige mehrfach geladen wird.
+
+Aufruf:
+    python benchmarks/chat_session_benchmark.py [--questions 40] [--threads 4] [--ads 2] [--flush 0.5]
+"""
+
+import os
+import sys
+import json
+import time
+import builtins
+import argparse
+import tempfile
+import threading
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+counts = Counter()
+counts_lock = threading.Lock()
+
+
+def count(name):
+    """Erhöht einen Zähler (thread-sicher)"""
+    with counts_lock:
+        counts[name] += 1
+
+
+class StubModels:
+    """Ersatz für client.models mit kurzer fester Antwortzeit"""
+
+    def generate_content(self, model, contents):
+        count('model_calls')
+        time.sleep(0.02)
+        return type('Response', (), {'text': 'Antwort des Stub-Modells.'})()
+
+
+class StubClient:
+    """Ersatz für genai.Client, zählt die erzeugten Clients"""
+
+    def __init__(self, api_key=None):
+        count('clients')
+        self.models = StubModels()
+
+
+def counting(name, function):
+    """Zählt die Aufrufe einer Funktion"""
+    def wrapper(*args, **kwargs):
+        count(name)
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def check_slow_load():
+    """
+    Lädt einen Chat langsam und fragt währenddessen einen anderen Chat ab.
+
+    Returns:
+        tuple: (Wartezeit auf den anderen Chat in Sekunden, Ladevorgänge des langsamen Chats,
+                Anzahl verschiedener zurückgegebener Chats)
+    """
+    from chat_sessions import ChatSession, ChatSessionStore
+
+    loads = Counter()
+
+    def loader(ad_id):
+        loads[ad_id] += 1
+        time.sleep(0.5 if ad_id == 'langsam' else 0)
+        return ChatSession(ad_id, {}, {}, None, None)
+
+    sessions = ChatSessionStore(loader, lambda ad_id, chat: None, flush_interval=0)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(sessions.get('langsam'))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    sessions.get('schnell')
+    waited = time.perf_counter() - started
+    for thread in threads:
+        thread.join()
+    return waited, loads['langsam'], len({id(session) for session in results})
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Benchmark der aktiven Chats der Webapp')
+    parser.add_argument('--questions', type=int, default=40, help='Anzahl der Folgefragen')
+    parser.add_argument('--threads', type=int, default=4, help='Gleichzeitige Nutzer')
+    parser.add_argument('--ads', type=int, default=2, help='Anzahl der Anzeigen')
+    parser.add_argument('--flush', type=float, default=0.5, help='Abstand der Speichervorgänge in Sekunden')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Die Webapp legt Ausgaben relativ zum Arbeitsverzeichnis ab
+        os.chdir(workdir)
+        os.environ['GEMINI_API_KEY'] = 'stub'
+        os.environ['GEMINI_RESPONSE_CACHE'] = 'false'
+        os.environ['GEMINI_IMAGE_MAX_EDGE'] = '0'
+        os.environ['CHAT_SESSION_FLUSH_SECONDS'] = str(args.flush)
+        os.environ['AD_STORE_PATH'] = os.path.join(workdir, 'ads.db')
+        import gemini_analyzer
+        gemini_analyzer.genai.Client = StubClient
+        import app as webapp
+
+        ad_ids = [str(9200000000 + i) for i in range(args.ads)]
+        for ad_id in ad_ids:
+            webapp.ad_store.save_ad({'id': ad_id, 'title': f'Testanzeige {ad_id}', 'price': '100',
+                                     'description': 'Test', 'details': {}, 'images': []})
+            webapp.ad_store.save_analysis(ad_id, {'success': True, 'analysis': 'Analyse', 'model': 'stub'})
+
+        store = webapp.ad_store
+        for name in ('get_ad', 'get_analysis', 'get_chat'):
+            setattr(store, name, counting('db_reads', getattr(store, name)))
+        store.save_chat = counting('db_writes', store.save_chat)
+        original_open = builtins.open
+        builtins.open = counting('file_opens', original_open)
+        original_persist = webapp.chat_sessions._persist
+        webapp.chat_sessions._persist = counting('persists', original_persist)
+
+        def user(index):
+            client = webapp.app.test_client()
+            for i in range(index, args.questions, args.threads):
+                response = client.post(f'/analyze/{ad_ids[i % args.ads]}', data={'question': f'Frage {i}'})
+                if response.status_code != 200:
+                    raise RuntimeError(f'Status {response.status_code}')
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=user, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        during = dict(counts)
+
+        webapp.chat_sessions.close()
+        builtins.open = original_open
+
+        stored = {}
+        for ad_id in ad_ids:
+            with open(os.path.join('output', f'{ad_id}_chat.json'), encoding='utf-8') as f:
+                stored[ad_id] = (store.get_chat(ad_id)['chat_history'], json.load(f)['chat_history'])
+
+    print(f"{args.questions} Folgefragen, {args.threads} gleichzeitige Nutzer, {args.ads} Anzeigen, "
+          f"Speichern alle {args.flush:g} s ({elapsed:.2f} s)")
+    print(f"{'':<22} {'gesamt':>7} {'pro Frage':>10} {'bisher pro Frage':>17}")
+    for name, label, before in (('clients', 'genai-Clients', 1), ('model_calls', 'Modellaufrufe', 1),
+                                ('db_reads', 'Lesen (Datenbank)', 3), ('file_opens', 'Dateien geöffnet', 2),
+                                ('persists', 'Speichervorgänge', 1), ('db_writes', 'Schreiben (Datenbank)', 1)):
+        total = during.get(name, 0)
+        print(f"{label:<22} {total:>7} {total / args.questions:>10.2f} {before:>17}")
+
+    waited, slow_loads, distinct = check_slow_load()
+    print(f"Anderer Chat während eines langsamen Ladevorgangs: {waited * 1000:.1f} ms, "
+          f"{slow_loads} Ladevorgang für 3 gleichzeitige Anfragen")
+
+    failed = False
+    if waited > 0.25 or slow_loads != 1 or distinct != 1:
+        failed = True
+        print("FEHLER: Ein langsamer Ladevorgang blockiert andere Chats oder läuft mehrfach")
+    if during.get('clients', 0) != 1 or during.get('model_calls', 0) != args.questions:
+        failed = True
+        print("FEHLER: Mehr als ein Client oder nicht genau ein Modellaufruf pro Frage")
+    if during.get('db_reads', 0) > 3 * args.ads:
+        failed = True
+        print("FEHLER: Chats werden bei jeder Frage neu geladen")
+    for ad_id, (db_history, file_history) in stored.items():
+        questions = len([i for i in range(args.questions) if ad_ids[i % args.ads] == ad_id])
+        roles = [message['role'] for message in db_history]
+        if db_history != file_history or roles != ['user', 'assistant'] * questions:
+            failed = True
+            print(f"FEHLER: Chatverlauf von {ad_id} unvollständig oder durcheinander")
+
+    if failed:
+        sys.exit(1)
+    print("Ein Client pro Prozess, ein Modellaufruf pro Frage; Chats werden einmal geladen und gesammelt gespeichert.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark für das Crawlen von Such- und Kategorieseiten
+
+Crawlt die synthetischen Ergebnisseiten des lokalen Ersatzservers aus scrape_benchmark.py und
+scrapt die gefundenen Anzeigen mit begrenzter Parallelität. Verglichen wird das Streaming
+(Anzeigen werden gescrapt, während weitere Ergebnisseiten geladen werden) mit dem vorherigen
+Einsammeln aller URLs. Zusätzlich wird geprüft, dass jede Anzeige genau einmal gescrapt wird
+(Top-Anzeigen stehen auf jeder Seite) und dass ein zweiter Durchlauf bekannte Anzeigen überspringt.
+
+Aufruf:
+    python benchmarks/crawl_benchmark.py [--ads 200] [--page-size 25] [--workers 4] [--latency 20]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kleinanzeigen_scraper import KleinanzeigenScraper, scrape_batch, crawl_urls  # noqa: E402
+from scrape_benchmark import StandInServer  # noqa: E402
+
+
+def run(server, urls_for, args):
+    """
+    Scrapt alle Anzeigen der Suche zweimal im selben Ausgabeverzeichnis.
+
+    Returns:
+        list: Pro Durchlauf (Sekunden bis zur ersten Anzeige, Gesamtdauer, gescrapte Anzeigen-IDs, Fehler, Anfragen)
+    """
+    search_url = f"{server.base_url}/s-fahrraeder/c217"
+    passes = []
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = KleinanzeigenScraper(
+            output_dir=output_dir,
+            pool_size=max(10, args.workers * 4),
+            base_url=server.base_url,
+            seller_cache_on_disk=False
+        )
+        with scraper, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for _ in range(2):
+                requests_before = server.requests_served
+                started = time.perf_counter()
+                first_ad = None
+                ad_ids = []
+                errors = 0
+                for url, data, error in scrape_batch(scraper, urls_for(scraper, search_url), args.workers):
+                    if first_ad is None:
+                        first_ad = time.perf_counter() - started
+                    if error is not None:
+                        errors += 1
+                    else:
+                        ad_ids.append(data['id'])
+                elapsed = time.perf_counter() - started
+                passes.append((first_ad, elapsed, ad_ids, errors, server.requests_served - requests_before))
+
+    return passes
+
+
+def streamed_urls(scraper, search_url):
+    """Aktuelles Verfahren: Ergebnisseiten werden erst geladen, wenn URLs benötigt werden"""
+    return crawl_urls(scraper, search_url)
+
+
+def collected_urls(scraper, search_url):
+    """Vergleich: Erst alle Ergebnisseiten laden, dann scrapen"""
+    return iter([url for url in crawl_urls(scraper, search_url)])
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Offline-Benchmark des Crawl-Modus')
+    parser.add_argument('--ads', type=int, default=200, help='Anzahl der Anzeigen in den Suchergebnissen')
+    parser.add_argument('--page-size', type=int, default=25, help='Anzeigen pro Ergebnisseite')
+    parser.add_argument('--top-ads', type=int, default=2, help='Top-Anzeigen, die auf jeder Ergebnisseite stehen')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='Anzahl parallel gescrapter Anzeigen')
+    parser.add_argument('--latency', type=float, default=20, help='Serverlatenz pro Anfrage in Millisekunden')
+    args = parser.parse_args()
+
+    server = StandInServer(latency=args.latency / 1000, listing_ads=args.ads, page_size=args.page_size,
+                           top_ads=args.top_ads)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    print(f"{args.ads} Anzeigen auf {server.listing_pages} Ergebnisseiten, {args.workers} Worker, "
+          f"Latenz {args.latency:.0f} ms")
+    print(f"{'Verfahren':<12} {'Lauf':>5} {'erste s':>8} {'gesamt s':>9} {'Anzeigen':>9} {'Fehler':>7} {'Anfragen':>9}")
+
+    failed = False
+    try:
+        for name, urls_for in (('gesammelt', collected_urls), ('gestreamt', streamed_urls)):
+            for run_index, (first_ad, elapsed, ad_ids, errors, requests) in enumerate(run(server, urls_for, args), 1):
+                print(f"{name:<12} {run_index:>5} {first_ad or 0:>8.2f} {elapsed:>9.2f} "
+                      f"{len(ad_ids):>9} {errors:>7} {requests:>9}")
+
+                expected = args.ads if run_index == 1 else 0
+                if len(ad_ids) != expected or len(set(ad_ids)) != len(ad_ids):
+                    failed = True
+                    print(f"FEHLER: {len(ad_ids)} Anzeigen ({len(set(ad_ids))} verschieden) gescrapt, "
+                          f"erwartet {expected}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if failed:
+        sys.exit(1)
+    print("Jede Anzeige wurde genau einmal gescrapt; bekannte Anzeigen wurden im zweiten Lauf übersprungen.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Extraktions-Benchmark
+
+Vergleicht die Parse- und Extraktionszeit pro Anzeige mit und ohne Extraktionsplan über einen
+Korpus gespeicherter Anzeigenseiten. Ohne Plan wird das vollständige Dokument geparst und jeder
+Selektor einzeln ausgewertet (bisheriges Verfahren); mit Plan werden nur die relevanten
+Seitenbereiche geparst und alle Selektoren in einem Durchlauf ausgewertet. Für jede Seite wird
+geprüft, dass beide Verfahren identische Daten liefern.
+
+Aufruf:
+    python benchmarks/extraction_benchmark.py [--corpus 'seiten/*.html'] [--repeat 10]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from glob import glob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kleinanzeigen_scraper import HTML_PARSERS, LXML_AVAILABLE  # noqa: E402
+from parser_benchmark import create_scraper, extract_offline  # noqa: E402
+
+
+def measure(scraper, pages, repeat):
+    """Misst die Zeit pro Anzeige in Millisekunden für alle Seiten des Korpus"""
+    timings = []
+    for html in pages:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            extract_offline(scraper, html)
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Benchmark des Extraktionsplans')
+    parser.add_argument('--corpus', default=os.path.join(ROOT, 'kleinanzeigen_page.html'),
+                        help='Glob-Muster für gespeicherte Anzeigenseiten')
+    parser.add_argument('--repeat', '-n', type=int, default=10, help='Anzahl der Wiederholungen pro Seite')
+    args = parser.parse_args()
+
+    paths = sorted(glob(args.corpus))
+    if not paths:
+        parser.error(f'Keine Seiten gefunden: {args.corpus}')
+
+    pages = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append(f.read())
+
+    print(f"Korpus: {len(pages)} Seite(n), {args.repeat} Durchläufe pro Seite")
+
+    parsers = [p for p in HTML_PARSERS if p != 'lxml' or LXML_AVAILABLE]
+    failed = False
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for html_parser in parsers:
+            before = create_scraper(html_parser, output_dir, use_extraction_plan=False)
+            after = create_scraper(html_parser, output_dir, use_extraction_plan=True)
+
+            for path, html in zip(paths, pages):
+                if extract_offline(before, html) != extract_offline(after, html):
+                    failed = True
+                    print(f"FEHLER: Extraktionsplan weicht bei {os.path.basename(path)} ab ({html_parser})")
+
+            before_ms = measure(before, pages, args.repeat)
+            after_ms = measure(after, pages, args.repeat)
+            speedup = statistics.median(before_ms) / statistics.median(after_ms)
+
+            print(f"{html_parser:<12} vorher: Median {statistics.median(before_ms):6.1f} ms, "
+                  f"Mittel {statistics.mean(before_ms):6.1f} ms | "
+                  f"nachher: Median {statistics.median(after_ms):6.1f} ms, "
+                  f"Mittel {statistics.mean(after_ms):6.1f} ms | Faktor {speedup:.1f}x")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark der Anfrageschicht (Ratenlimit, Wiederholungen, Circuit Breaker)
+
+Nutzt den lokalen Ersatzserver aus scrape_benchmark.py in zwei Szenarien:
+
+1. Drosselung: Der Server beantwortet mehr als --throttle-rps Anfragen pro Sekunde mit HTTP 429
+   und Retry-After. Ein Batch wird ohne Wiederholungen, mit Wiederholungen und zusätzlich mit
+   Ratenlimit gescrapt; ausgegeben werden fehlgeschlagene Anzeigen, abgewiesene Anfragen und Dauer.
+2. Ausfall: Der Server beantwortet für --outage Sekunden alle Anfragen mit HTTP 503. Verglichen
+   wird, wie viele Anfragen während des Ausfalls mit und ohne Circuit Breaker gestellt werden und
+   ob die Anzeigen mit Circuit Breaker danach erfolgreich gescrapt werden.
+
+Aufruf:
+    python benchmarks/http_client_benchmark.py [--ads 24] [--workers 8] [--throttle-rps 60] [--outage 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kleinanzeigen_scraper import KleinanzeigenScraper, scrape_batch  # noqa: E402
+from http_client import HttpClient  # noqa: E402
+from scrape_benchmark import StandInServer  # noqa: E402
+
+# Fehlerschwelle, die nie erreicht wird (Circuit Breaker praktisch deaktiviert)
+NO_CIRCUIT_BREAKER = 10 ** 9
+
+
+def run_batch(server, args, first_ad_id, configure, max_retries=3, rate_limit=0):
+    """Scrapt einen Batch und liefert (Fehler, Dauer, Zähler der Anfrageschicht)"""
+    urls = [f"{server.base_url}/s-anzeige/http-anzeige/{first_ad_id + i}-217-1234" for i in range(args.ads)]
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = KleinanzeigenScraper(output_dir=output_dir, base_url=server.base_url, seller_cache_on_disk=False,
+                                       pool_size=args.workers * 4, rate_limit=rate_limit, max_retries=max_retries)
+        if configure:
+            configure(scraper)
+        with scraper, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            started = time.perf_counter()
+            errors = sum(1 for _, _, error in scrape_batch(scraper, urls, args.workers) if error is not None)
+            elapsed = time.perf_counter() - started
+        return errors, elapsed, scraper.http.stats()
+
+
+def throttling(args):
+    """Szenario 1: Drosselung durch den Server"""
+    print(f"Drosselung: Server erlaubt {args.throttle_rps} Anfragen/s, {args.ads} Anzeigen, {args.workers} Worker")
+    print(f"{'Verfahren':<22} {'Fehler':>6} {'429':>6} {'Wdh.':>6} {'Dauer s':>8}")
+
+    runs = (
+        ('ohne Wiederholung', 0, 0),
+        ('mit Wiederholung', 3, 0),
+        ('mit Ratenlimit', 3, args.throttle_rps * 0.8),
+    )
+    failed = False
+    for index, (label, max_retries, rate_limit) in enumerate(runs):
+        server = StandInServer(throttle_rps=args.throttle_rps)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            errors, elapsed, stats = run_batch(server, args, 5000000000 + index * 1000, None,
+                                               max_retries=max_retries, rate_limit=rate_limit)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        print(f"{label:<22} {errors:>6} {server.throttled:>6} {stats['retries']:>6} {elapsed:>8.2f}")
+        if max_retries and errors:
+            failed = True
+            print(f"FEHLER: {errors} Anzeigen trotz Wiederholungen fehlgeschlagen")
+    return failed
+
+
+def outage(args):
+    """Szenario 2: Vorübergehender Ausfall des Servers"""
+    print(f"\nAusfall: alle Anfragen für {args.outage:g} s mit HTTP 503 beantwortet")
+    print(f"{'Verfahren':<22} {'Fehler':>6} {'Anfragen im Ausfall':>20} {'Pausen':>7} {'Dauer s':>8}")
+
+    runs = (
+        ('ohne Circuit Breaker', NO_CIRCUIT_BREAKER),
+        ('mit Circuit Breaker', 5),
+    )
+    failed = False
+    for index, (label, failure_threshold) in enumerate(runs):
+        server = StandInServer(error_rate=1.0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        outage_requests = []
+
+        def end_outage():
+            time.sleep(args.outage)
+            outage_requests.append(server.requests_served)
+            server.error_rate = 0.0
+
+        def configure(scraper):
+            # Verkürzte Zeitskala: kurze Pausen, genug Wiederholungen, um den Ausfall zu überstehen
+            scraper.http = HttpClient(scraper.session, timeout=scraper.timeout, max_retries=8, backoff_base=0.2,
+                                      backoff_max=2, failure_threshold=failure_threshold, reset_timeout=0.5,
+                                      max_circuit_wait=args.outage * 4)
+
+        ender = threading.Thread(target=end_outage, daemon=True)
+        ender.start()
+        try:
+            errors, elapsed, stats = run_batch(server, args, 6000000000 + index * 1000, configure)
+            ender.join()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        print(f"{label:<22} {errors:>6} {outage_requests[0]:>20} {stats['circuit_opened']:>7} {elapsed:>8.2f}")
+        # Ohne Circuit Breaker dürfen Anzeigen ihre Wiederholungen während des Ausfalls aufbrauchen
+        if errors and failure_threshold != NO_CIRCUIT_BREAKER:
+            failed = True
+            print(f"FEHLER: {errors} Anzeigen nach dem Ausfall fehlgeschlagen")
+    return failed
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Benchmark von Ratenlimit, Wiederholungen und Circuit Breaker')
+    parser.add_argument('--ads', type=int, default=24, help='Anzahl der Anzeigen pro Durchlauf')
+    parser.add_argument('--workers', '-w', type=int, default=8, help='Anzahl parallel gescrapter Anzeigen')
+    parser.add_argument('--throttle-rps', type=int, default=60, help='Anfragen pro Sekunde, ab denen der Server drosselt')
+    parser.add_argument('--outage', type=float, default=3, help='Dauer des Ausfalls in Sekunden')
+    args = parser.parse_args()
+
+    failed = throttling(args)
+    failed = outage(args) or failed
+
+    if failed:
+        sys.exit(1)
+    print("\nMit Wiederholungen und Circuit Breaker übersteht der Batch Drosselung und Ausfall "
+          "ohne fehlgeschlagene Anzeigen.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Speicher-Benchmark für Bild-Downloads
+
+Vergleicht den Spitzenverbrauch an Python-Speicher (tracemalloc) beim parallelen Herunterladen
+großer Bilder zwischen dem bisherigen Verfahren (Bild vollständig puffern, schreiben und für die
+Bildgröße erneut in BytesIO öffnen) und dem blockweisen Schreiben in den Bildspeicher. Die Bilder
+liefert der lokale Ersatzserver aus scrape_benchmark.py. Zusätzlich wird geprüft, dass beide
+Verfahren dieselbe Dateigröße und dieselben Abmessungen ermitteln.
+
+Aufruf:
+    python benchmarks/image_memory_benchmark.py [--images 8] [--concurrency 1,4,8] [--size 3000x2000]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from io import BytesIO
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kleinanzeigen_scraper import KleinanzeigenScraper  # noqa: E402
+from scrape_benchmark import StandInServer  # noqa: E402
+
+
+def create_images(count, width, height):
+    """Erzeugt verrauschte JPEG-Bilder, die sich kaum komprimieren lassen"""
+    images = []
+    for i in range(count):
+        img = Image.effect_noise((width, height), 64 + i).convert('RGB')
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG', quality=95)
+        images.append(buffer.getvalue())
+    return images
+
+
+def download_buffered(scraper, ad_id, index, img_url):
+    """Bisheriges Verfahren: Bild vollständig puffern, schreiben und Größe über BytesIO lesen"""
+    img_response = scraper.session.get(img_url, timeout=scraper.timeout)
+    filename = f"{ad_id}_{index+1}.jpg"
+    with open(os.path.join(scraper.images_dir, filename), 'wb') as f:
+        f.write(img_response.content)
+    with Image.open(BytesIO(img_response.content)) as img_obj:
+        width, height = img_obj.size
+    return {'filename': filename, 'width': width, 'height': height, 'size_bytes': len(img_response.content)}
+
+
+def download_streamed(scraper, ad_id, index, img_url):
+    """Aktuelles Verfahren des Scrapers"""
+    return scraper._download_image(ad_id, index, img_url)
+
+
+def measure(server, download, concurrency, image_count):
+    """Lädt alle Bilder mit der angegebenen Parallelität und liefert Spitzenverbrauch und Ergebnisse"""
+    urls = [f"{server.base_url}/img/benchmark/{i}.jpg" for i in range(image_count)]
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = KleinanzeigenScraper(output_dir=output_dir, seller_cache_ttl=0, pool_size=max(10, concurrency))
+        with scraper, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(lambda job: download(scraper, '1', *job), enumerate(urls)))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    return peak, results
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Speicherverbrauch gepufferter und gestreamter Bild-Downloads')
+    parser.add_argument('--images', type=int, default=8, help='Anzahl der Bilder pro Durchlauf')
+    parser.add_argument('--concurrency', default='1,4,8', help='Kommagetrennte Parallelitätsstufen')
+    parser.add_argument('--size', default='3000x2000', help='Bildgröße in Pixeln (BreitexHöhe)')
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.lower().split('x'))
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    server = StandInServer()
+    # Große Testbilder statt der Beispielbilder ausliefern (Auswahl anhand der URL)
+    server.images = create_images(args.images, width, height)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    average_kb = sum(len(image) for image in server.images) / len(server.images) / 1024
+    print(f"{args.images} Bilder, {width}x{height} px, durchschnittlich {average_kb:.0f} KB")
+    print(f"{'Parallel':>8} {'gepuffert MB':>13} {'gestreamt MB':>13} {'Faktor':>7}")
+
+    failed = False
+    try:
+        for concurrency in levels:
+            buffered_peak, buffered = measure(server, download_buffered, concurrency, args.images)
+            streamed_peak, streamed = measure(server, download_streamed, concurrency, args.images)
+            print(f"{concurrency:>8} {buffered_peak / 2**20:>13.1f} {streamed_peak / 2**20:>13.1f} "
+                  f"{buffered_peak / max(1, streamed_peak):>7.1f}")
+
+            for before, after in zip(buffered, streamed):
+                fields = [k for k in ('width', 'height', 'size_bytes') if before[k] != (after or {}).get(k)]
+                if fields:
+                    failed = True
+                    print(f"FEHLER: {before['filename']} weicht ab: {', '.join(fields)}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if failed:
+        sys.exit(1)
+    print("Dateigröße und Abmessungen sind bei beiden Verfahren identisch.")
+
+
+if __name__ == "__main__":
+    main()
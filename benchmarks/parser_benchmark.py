@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Parser-Benchmark
+
+Misst die Parse- und Extraktionszeit pro Anzeige für alle verfügbaren HTML-Parser und den
+JSON-LD-Modus und prüft, dass jeder Parser exakt dieselben Daten liefert wie html.parser.
+Zusätzlich werden die Ergebnisse mit den gespeicherten Beispielanzeigen in output/ verglichen,
+sofern deren HTML-Seite vorliegt.
+
+Aufruf:
+    python benchmarks/parser_benchmark.py [--repeat 10]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+from glob import glob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kleinanzeigen_scraper import KleinanzeigenScraper, HTML_PARSERS, LXML_AVAILABLE  # noqa: E402
+
+FIXTURE = os.path.join(ROOT, 'kleinanzeigen_page.html')
+SAMPLE_DIR = os.path.join(ROOT, 'output')
+
+
+def create_scraper(html_parser, output_dir, **options):
+    """Erstellt einen Scraper, der keine Netzwerkanfragen stellt"""
+    scraper = KleinanzeigenScraper(output_dir=output_dir, seller_cache_ttl=0, html_parser=html_parser, **options)
+    # Verkäuferprofil nicht abrufen, nur die Angaben der Anzeigenseite auswerten
+    scraper._get_seller_profile = lambda user_id, profile_url: {}
+    return scraper
+
+
+def extract_offline(scraper, html):
+    """Extrahiert alle Felder einer Anzeigenseite ohne Netzwerkzugriff"""
+    soup, fields = scraper._extract_fields(html)
+    return {
+        'title': fields['title'],
+        'price': fields['price'],
+        'description': fields['description'],
+        'details': fields['details'],
+        'location': fields['location'],
+        'seller': scraper._extract_seller_info(soup),
+        'image_urls': [url for _, url in fields['image_urls']]
+    }
+
+
+def compare_with_sample(extracted, sample):
+    """Vergleicht extrahierte Felder mit einer gespeicherten Anzeige und liefert die Abweichungen"""
+    differences = []
+
+    for field in ('title', 'price', 'description', 'details', 'location'):
+        if extracted[field] != sample.get(field):
+            differences.append(field)
+
+    # Profilangaben stammen von der Profilseite und liegen offline nicht vor
+    sample_seller = {k: v for k, v in sample.get('seller', {}).items() if k != 'profile'}
+    if extracted['seller'] != sample_seller:
+        differences.append('seller')
+
+    sample_urls = [image['original_url'] for image in sample.get('images', [])]
+    if extracted['image_urls'] != sample_urls:
+        differences.append('images')
+
+    return differences
+
+
+def time_extraction(scraper, html, repeat):
+    """Misst die durchschnittliche Zeit für Parsen und Extraktion in Millisekunden"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        extract_offline(scraper, html)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Benchmark und Paritätsprüfung der HTML-Parser')
+    parser.add_argument('--repeat', '-n', type=int, default=10, help='Anzahl der Wiederholungen pro Parser')
+    args = parser.parse_args()
+
+    with open(FIXTURE, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    parsers = [p for p in HTML_PARSERS if p != 'lxml' or LXML_AVAILABLE]
+    if not LXML_AVAILABLE:
+        print("lxml ist nicht installiert, es wird nur html.parser geprüft")
+
+    failed = False
+    with tempfile.TemporaryDirectory() as output_dir:
+        results = {}
+        for html_parser in parsers:
+            scraper = create_scraper(html_parser, output_dir)
+            results[html_parser] = extract_offline(scraper, html)
+            avg_ms = time_extraction(scraper, html, args.repeat)
+            print(f"{html_parser:<12} {avg_ms:8.1f} ms pro Anzeige ({len(html) / 1024:.0f} KB, {args.repeat} Durchläufe)")
+
+        # Parität zwischen den Parsern
+        reference = results['html.parser']
+        for html_parser, extracted in results.items():
+            if extracted != reference:
+                failed = True
+                fields = [k for k in reference if reference[k] != extracted[k]]
+                print(f"FEHLER: {html_parser} weicht von html.parser ab: {', '.join(fields)}")
+
+        # JSON-LD-Modus: gleiche Felder einschließlich der Bild-URLs
+        scraper = create_scraper(parsers[0], output_dir, use_json_ld=True)
+        extracted = extract_offline(scraper, html)
+        avg_ms = time_extraction(scraper, html, args.repeat)
+        print(f"{parsers[0] + ' + JSON-LD':<12} {avg_ms:8.1f} ms pro Anzeige")
+        fields = [k for k in reference if reference[k] != extracted[k]]
+        if fields:
+            failed = True
+            print(f"FEHLER: JSON-LD-Modus weicht von html.parser ab: {', '.join(fields)}")
+
+        # Vergleich mit den gespeicherten Beispielanzeigen
+        match = re.search(r'<meta property="og:url" content="[^"]*/(\d+)-', html)
+        fixture_id = match.group(1) if match else None
+        for sample_path in sorted(glob(os.path.join(SAMPLE_DIR, '[0-9]*.json'))):
+            with open(sample_path, 'r', encoding='utf-8') as f:
+                sample = json.load(f)
+
+            if sample.get('id') != fixture_id:
+                print(f"Beispielanzeige {sample.get('id')}: keine HTML-Seite vorhanden, übersprungen")
+                continue
+
+            for html_parser, extracted in results.items():
+                differences = compare_with_sample(extracted, sample)
+                if differences:
+                    failed = True
+                    print(f"FEHLER: {html_parser} weicht von Beispielanzeige {sample['id']} ab: {', '.join(differences)}")
+                else:
+                    print(f"Beispielanzeige {sample['id']}: {html_parser} identisch")
+
+    if failed:
+        sys.exit(1)
+    print("Alle Parser liefern identische Ergebnisse.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark des Antwort-Caches der Gemini-Analyse
+
+Ersetzt den genai-Client durch einen lokalen Stub mit fester Antwortzeit und analysiert synthetische
+Anzeigen in mehreren Durchläufen:
+
+1. erste Analyse aller Anzeigen (nur Fehlschläge)
+2. erneute Analyse nach erneutem Scrapen (Treffer im Speicher)
+3. wiedereingestellte Anzeigen unter neuer ID, neuer Prozess (Treffer auf der Festplatte)
+4. geänderter Preis (Fehlschläge, neuer Modellaufruf)
+
+Zusätzlich wird geprüft, dass die Dateien des Caches die konfigurierte Größe nicht überschreiten.
+
+Aufruf:
+    python benchmarks/response_cache_benchmark.py [--ads 20] [--latency 0.2] [--max-kb 16]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gemini_analyzer import GeminiAnalyzer  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+class StubModels:
+    """Ersatz für client.models mit fester Antwortzeit"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, model, contents):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        prompt = contents[0]
+        return type('Response', (), {'text': f"Analyse ({len(contents) - 1} Bilder): " + prompt[:400] * 2})()
+
+
+class StubClient:
+    """Ersatz für genai.Client"""
+
+    def __init__(self, latency):
+        self.models = StubModels(latency)
+
+
+def make_ads(count, image_dir, price='120'):
+    """Erzeugt synthetische Anzeigen mit je zwei Bildern"""
+    ads = []
+    for i in range(count):
+        paths = []
+        for j in range(2):
+            path = os.path.join(image_dir, f"{i}_{j}.jpg")
+            if not os.path.exists(path):
+                Image.new('RGB', (640, 480), ((i * 37) % 256, j * 90, 120)).save(path, quality=85)
+            paths.append(path)
+        data = {
+            'id': str(7000000000 + i),
+            'title': f'Fahrrad Nummer {i}',
+            'price': price,
+            'description': f'Gut erhaltenes Fahrrad {i}, wenig gefahren.',
+            'details': {'Art': 'Herren', 'Typ': 'Trekkingrad'},
+        }
+        ads.append((data, paths))
+    return ads
+
+
+def run(analyzer, ads):
+    """Analysiert alle Anzeigen und liefert (Modellaufrufe, Cache-Treffer, Dauer)"""
+    calls_before = analyzer.client.models.calls
+    started = time.perf_counter()
+    cached = sum(1 for data, paths in ads if analyzer.analyze(data, paths).get('cached'))
+    return analyzer.client.models.calls - calls_before, cached, time.perf_counter() - started
+
+
+def create_analyzer(cache, latency):
+    """Erstellt einen GeminiAnalyzer mit Stub-Client und vorgegebenem Cache"""
+    analyzer = GeminiAnalyzer(api_key='stub', response_cache=False, image_max_edge=0)
+    analyzer.client = StubClient(latency)
+    analyzer.response_cache = cache
+    return analyzer
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Benchmark des Antwort-Caches der Gemini-Analyse')
+    parser.add_argument('--ads', type=int, default=20, help='Anzahl der Anzeigen')
+    parser.add_argument('--latency', type=float, default=0.2, help='Antwortzeit des Stub-Modells in Sekunden')
+    parser.add_argument('--max-kb', type=int, default=16, help='Maximale Größe des Caches auf der Festplatte in KB')
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        image_dir = os.path.join(tmp, 'images')
+        cache_dir = os.path.join(tmp, 'response_cache')
+        os.makedirs(image_dir)
+        ads = make_ads(args.ads, image_dir)
+
+        reposted = []
+        for data, paths in ads:
+            data = dict(data, id=str(int(data['id']) + 500000000))
+            reposted.append((data, paths))
+        price_changed = make_ads(args.ads, image_dir, price='99')
+
+        analyzer = create_analyzer(ResponseCache(cache_dir, max_bytes=10 * 2**20), args.latency)
+        runs = [
+            ('erste Analyse', analyzer, ads, 0),
+            ('erneut gescrapt', analyzer, ads, args.ads),
+        ]
+        # Neuer Prozess: leerer Speicher, dieselben Dateien
+        restarted = create_analyzer(ResponseCache(cache_dir, max_bytes=10 * 2**20), args.latency)
+        runs.append(('wiedereingestellt', restarted, reposted, args.ads))
+        runs.append(('Preis geändert', restarted, price_changed, 0))
+
+        print(f"{args.ads} Anzeigen mit je 2 Bildern, Modell-Antwortzeit {args.latency:g} s")
+        print(f"{'Durchlauf':<20} {'Modellaufrufe':>13} {'Treffer':>8} {'Dauer s':>8}")
+        for label, current, run_ads, expected_hits in runs:
+            calls, hits, elapsed = run(current, run_ads)
+            print(f"{label:<20} {calls:>13} {hits:>8} {elapsed:>8.2f}")
+            if hits != expected_hits or calls != args.ads - expected_hits:
+                failed = True
+                print(f"FEHLER: {expected_hits} Treffer erwartet")
+
+        # Größenbegrenzung auf der Festplatte
+        small = ResponseCache(os.path.join(tmp, 'small_cache'), max_bytes=args.max_kb * 1024)
+        run(create_analyzer(small, 0), ads)
+        stats = small.stats()
+        disk_bytes = sum(os.path.getsize(os.path.join(small.cache_dir, name)) for name in os.listdir(small.cache_dir))
+        print(f"\nGrößenbegrenzung {args.max_kb} KB: {disk_bytes // 1024} KB belegt, "
+              f"{stats['evictions']} Einträge gelöscht")
+        if disk_bytes > args.max_kb * 1024:
+            failed = True
+            print("FEHLER: Cache überschreitet die konfigurierte Größe")
+
+    if failed:
+        sys.exit(1)
+    print("Unveränderte Inhalte wurden ohne Modellaufruf beantwortet.")
+
+
+if __name__ == "__main__":
+    main()
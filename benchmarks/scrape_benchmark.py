@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+End-to-End-Benchmark für KleinanzeigenScraper.scrape()
+
+Startet einen lokalen HTTP-Server als Ersatz für kleinanzeigen.de, der die gespeicherte
+Anzeigenseite (kleinanzeigen_page.html), eine synthetische Verkäuferprofilseite, synthetische
+Ergebnisseiten einer Suche und die Bilder aus output/images ausliefert. Latenz und Fehlerquote des Servers sind konfigurierbar. Für jede
+Parallelitätsstufe werden Latenz-Perzentile pro Anzeige, der Durchsatz (Anzeigen/s) und die
+übertragene Bildmenge ausgegeben. Mit --rescrape werden die Anzeigen vor der Messung einmal
+gescrapt, sodass der gemessene Durchlauf einem erneuten Scrapen bekannter Anzeigen entspricht.
+
+Aufruf:
+    python benchmarks/scrape_benchmark.py [--ads 20] [--concurrency 1,4,8] [--latency 20] [--error-rate 0.05] [--rescrape]
+"""
+
+import os
+import re
+import math
+import hashlib
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+from glob import glob
+from collections import deque
+from contextlib import redirect_stdout
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from kleinanzeigen_scraper import KleinanzeigenScraper, scrape_batch  # noqa: E402
+
+FIXTURE = os.path.join(ROOT, 'kleinanzeigen_page.html')
+IMAGES_DIR = os.path.join(ROOT, 'output', 'images')
+FIXTURE_USER_ID = '37736795'
+FIXTURE_PRICE = '5.100 € VB'
+
+SELLER_PROFILE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>Anzeigen von Verkäufer {user_id} - {ads_count} Anzeigen</title></head>
+<body>
+<div class="userprofile-details"><span class="userprofile-details-text">Privater Nutzer</span></div>
+<div class="userprofile-details"><span class="userprofile-details-text">Aktiv seit 14.03.2016</span></div>
+<div class="userprofile-details"><span class="userprofile-details-text">Antwortet in der Regel innerhalb von 12 Stunden</span></div>
+<div class="userprofile-details"><span class="userprofile-details-text">{followers} Follower</span></div>
+<a id="poster-other-ads-link" href="/s-bestandsliste.html?userId={user_id}">{ads_count} Anzeigen online</a>
+</body>
+</html>
+"""
+
+LISTING_ITEM_TEMPLATE = """<li class="ad-listitem">
+<article class="aditem" data-adid="{ad_id}" data-href="/s-anzeige/benchmark-anzeige-{ad_id}/{ad_id}-217-1234">
+<div class="aditem-main"><h2 class="text-module-begin"><a class="ellipsis" href="/s-anzeige/benchmark-anzeige-{ad_id}/{ad_id}-217-1234">Anzeige {ad_id}</a></h2></div>
+</article>
+</li>
+"""
+
+LISTING_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>Fahrräder | kleinanzeigen.de</title></head>
+<body>
+<ul id="srchrslt-adtable" class="itemlist">
+{items}</ul>
+<div class="pagination">{pagination}</div>
+</body>
+</html>
+"""
+
+# Erste ID der Anzeigen auf den Ergebnisseiten
+LISTING_FIRST_AD_ID = 3000000000
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Lokaler Ersatz für kleinanzeigen.de mit konfigurierbarer Latenz und Fehlerquote"""
+
+    daemon_threads = True
+    # Genug Platz in der Verbindungswarteschlange für hohe Parallelität (Standard: 5)
+    request_queue_size = 128
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, sellers=1000,
+                 listing_ads=100, page_size=25, top_ads=2, retry_after=None, throttle_rps=0):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.retry_after = retry_after
+        self.throttle_rps = throttle_rps
+        self.throttled = 0
+        self._recent = deque()  # Zeitpunkte der Anfragen der letzten Sekunde
+        self.sellers = max(1, sellers)
+        self.listing_ads = listing_ads
+        self.page_size = max(1, page_size)
+        self.top_ads = top_ads
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.requests_served = 0
+        self.errors_injected = 0
+        self.image_bytes = 0
+        self.prices = {}  # Anzeigen-ID -> Preistext, überschreibt den Preis der Beispielseite
+        self.removed_ads = set()  # Anzeigen-IDs, die mit HTTP 410 beantwortet werden
+        self._lock = threading.Lock()
+
+        with open(FIXTURE, 'r', encoding='utf-8') as f:
+            page = f.read()
+        # Bilder auf den lokalen Server umleiten
+        self.ad_page = page.replace('https://img.kleinanzeigen.de/', f'{self.base_url}/img/')
+
+        self.images = []
+        for path in sorted(glob(os.path.join(IMAGES_DIR, '*.jpg'))):
+            with open(path, 'rb') as f:
+                self.images.append(f.read())
+
+    def handle_error(self, request, client_address):
+        # Vom Client abgebrochene Verbindungen (z.B. verworfene Fehlerantworten) sind erwartet
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+    def count(self, error):
+        with self._lock:
+            self.requests_served += 1
+            if error:
+                self.errors_injected += 1
+
+    def throttle(self):
+        """Gibt an, ob eine Anfrage wegen Überschreitung von throttle_rps mit HTTP 429 abgewiesen wird"""
+        if not self.throttle_rps:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and self._recent[0] <= now - 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.throttle_rps:
+                self.throttled += 1
+                return True
+            self._recent.append(now)
+            return False
+
+    def count_image_bytes(self, size):
+        with self._lock:
+            self.image_bytes += size
+
+    @property
+    def listing_pages(self):
+        """Anzahl der Ergebnisseiten der Suche"""
+        return max(1, math.ceil(self.listing_ads / self.page_size))
+
+    def listing_page(self, page):
+        """
+        Erzeugt eine Ergebnisseite unter /s-fahrraeder/seite:{page}/c217.
+
+        Wie auf kleinanzeigen.de stehen die Top-Anzeigen (die ersten top_ads Anzeigen) auf jeder Seite.
+        """
+        start = (page - 1) * self.page_size
+        ad_ids = [LISTING_FIRST_AD_ID + i for i in range(start, min(start + self.page_size, self.listing_ads))]
+        top_ids = [LISTING_FIRST_AD_ID + i for i in range(min(self.top_ads, self.listing_ads))]
+        items = ''.join(LISTING_ITEM_TEMPLATE.format(ad_id=ad_id) for ad_id in top_ids + ad_ids)
+
+        pagination = ''
+        if page < self.listing_pages:
+            pagination = f'<a class="pagination-next" href="/s-fahrraeder/seite:{page + 1}/c217">Nächste</a>'
+        return LISTING_PAGE_TEMPLATE.format(items=items, pagination=pagination)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Beantwortet Anfragen für Anzeigenseiten, Ergebnisseiten, Verkäuferprofile und Bilder"""
+
+    # Keep-Alive, damit der Connection-Pool des Scrapers wie im Betrieb wirkt
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if server.throttle():
+            self._send(429, b'Too Many Requests', 'text/plain', {'Retry-After': '1'})
+            return
+
+        inject_error = random.random() < server.error_rate
+        server.count(inject_error)
+        if inject_error:
+            headers = {'Retry-After': str(server.retry_after)} if server.retry_after is not None else None
+            self._send(503, b'Service Unavailable', 'text/plain', headers)
+            return
+
+        parts = urlsplit(self.path)
+        if parts.path.startswith('/s-anzeige/'):
+            ad_match = re.search(r'/(\d+)-', parts.path)
+            # Anzeigen auf eine feste Anzahl von Verkäufern verteilen
+            user_id = str(int(ad_match.group(1)) % server.sellers + 1) if ad_match else FIXTURE_USER_ID
+            ad_id = ad_match.group(1) if ad_match else None
+            if ad_id in server.removed_ads:
+                self._send(410, b'Gone', 'text/plain')
+                return
+            body = server.ad_page.replace(f'userId={FIXTURE_USER_ID}', f'userId={user_id}')
+            if ad_id in server.prices:
+                body = body.replace(FIXTURE_PRICE, server.prices[ad_id])
+            self._send(200, body.encode('utf-8'), 'text/html; charset=utf-8')
+        elif parts.path == '/s-bestandsliste.html':
+            user_id = parse_qs(parts.query).get('userId', ['0'])[0]
+            body = SELLER_PROFILE_TEMPLATE.format(user_id=user_id, ads_count=3, followers=int(user_id) % 50)
+            self._send(200, body.encode('utf-8'), 'text/html; charset=utf-8')
+        elif parts.path.startswith('/s-fahrraeder/'):
+            page_match = re.search(r'/seite:(\d+)/', parts.path)
+            page = int(page_match.group(1)) if page_match else 1
+            if page > server.listing_pages:
+                self._send(404, b'Not Found', 'text/plain')
+            else:
+                self._send(200, server.listing_page(page).encode('utf-8'), 'text/html; charset=utf-8')
+        elif parts.path.startswith('/img/') and server.images:
+            image = server.images[sum(self.path.encode('utf-8')) % len(server.images)]
+            etag = '"' + hashlib.md5(image).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send(304, b'', 'image/jpeg', {'ETag': etag})
+            else:
+                server.count_image_bytes(len(image))
+                self._send(200, image, 'image/jpeg', {'ETag': etag})
+        else:
+            self._send(404, b'Not Found', 'text/plain')
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TimedScraper:
+    """Misst die Dauer jedes scrape()-Aufrufs"""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def scrape(self, url):
+        started = time.perf_counter()
+        try:
+            return self.scraper.scrape(url)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.latencies.append(elapsed_ms)
+
+
+def percentile(values, p):
+    """Perzentil nach dem Nearest-Rank-Verfahren"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run_level(server, concurrency, args):
+    """Führt einen Durchlauf mit der angegebenen Parallelität aus"""
+    ad_urls = [
+        f"{server.base_url}/s-anzeige/benchmark-anzeige/{1000000 + i}-305-2050"
+        for i in range(args.ads)
+    ]
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = KleinanzeigenScraper(
+            output_dir=output_dir,
+            image_workers=args.image_workers,
+            pool_size=max(10, concurrency * args.image_workers),
+            base_url=server.base_url,
+            seller_cache_on_disk=False,
+            use_json_ld=args.json_ld,
+            max_retries=args.max_retries
+        )
+        timed = TimedScraper(scraper)
+        errors = 0
+
+        with scraper, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            if args.rescrape:
+                for _ in scrape_batch(scraper, ad_urls, workers=concurrency):
+                    pass
+
+            image_bytes_before = server.image_bytes
+            started = time.perf_counter()
+            for _, _, error in scrape_batch(timed, ad_urls, workers=concurrency):
+                if error is not None:
+                    errors += 1
+            elapsed = time.perf_counter() - started
+            image_bytes = server.image_bytes - image_bytes_before
+            retries = scraper.http.retries
+
+    return {
+        'concurrency': concurrency,
+        'ads': len(ad_urls),
+        'errors': errors,
+        'ads_per_second': len(ad_urls) / elapsed if elapsed > 0 else 0.0,
+        'p50': percentile(timed.latencies, 50),
+        'p90': percentile(timed.latencies, 90),
+        'p99': percentile(timed.latencies, 99),
+        'max': max(timed.latencies) if timed.latencies else 0.0,
+        'image_kb': image_bytes / 1024,
+        'retries': retries,
+    }
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Offline-End-to-End-Benchmark des Scrapers')
+    parser.add_argument('--ads', type=int, default=20, help='Anzahl der Anzeigen pro Parallelitätsstufe')
+    parser.add_argument('--concurrency', default='1,4,8', help='Kommagetrennte Parallelitätsstufen')
+    parser.add_argument('--image-workers', type=int, default=4, help='Anzahl paralleler Bild-Downloads pro Anzeige')
+    parser.add_argument('--latency', type=float, default=20, help='Serverlatenz pro Anfrage in Millisekunden')
+    parser.add_argument('--jitter', type=float, default=0, help='Zusätzliche zufällige Latenz in Millisekunden')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Anteil der Anfragen, die mit HTTP 503 beantwortet werden')
+    parser.add_argument('--retry-after', type=int, default=None, help='Retry-After-Header (Sekunden) bei Fehlerantworten')
+    parser.add_argument('--max-retries', type=int, default=3, help='Wiederholungen des Scrapers bei HTTP 429/5xx')
+    parser.add_argument('--sellers', type=int, default=1000, help='Anzahl verschiedener Verkäufer, auf die die Anzeigen verteilt werden')
+    parser.add_argument('--json-ld', action='store_true', help='Scraper im JSON-LD-Modus betreiben')
+    parser.add_argument('--rescrape', action='store_true', help='Anzeigen vor der Messung einmal scrapen (erneutes Scrapen messen)')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    server = StandInServer(latency=args.latency / 1000, jitter=args.jitter / 1000, error_rate=args.error_rate,
+                           sellers=args.sellers, retry_after=args.retry_after)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    print(f"Server: {server.base_url} (Latenz {args.latency:.0f} ms, Jitter {args.jitter:.0f} ms, "
+          f"Fehlerquote {args.error_rate:.0%}, {len(server.images)} Bilder)")
+    print(f"{'Parallel':>8} {'Anzeigen':>8} {'Fehler':>6} {'Anz./s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'Bild-KB':>9} {'Wdh.':>5}")
+
+    try:
+        for concurrency in levels:
+            result = run_level(server, concurrency, args)
+            print(f"{result['concurrency']:>8} {result['ads']:>8} {result['errors']:>6} "
+                  f"{result['ads_per_second']:>8.2f} {result['p50']:>8.0f} {result['p90']:>8.0f} "
+                  f"{result['p99']:>8.0f} {result['max']:>8.0f} {result['image_kb']:>9.0f} {result['retries']:>5}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"Anfragen gesamt: {server.requests_served}, davon {server.errors_injected} mit Fehler beantwortet")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark der gestreamten Gemini-Antworten
+
+Ersetzt den genai-Client durch einen lokalen Stub, der die Antwort nach einer Wartezeit bis zum
+ersten Abschnitt (--first-chunk) in --chunks Abschnitten mit je --chunk-delay Sekunden Abstand
+liefert. Über den Test-Client der Webapp wird verglichen, wann der erste Text im Browser ankommt:
+
+- bisher: Hintergrund-Job, die Statusseite fragt den Job jede Sekunde ab und leitet nach Abschluss
+  zur fertigen Analyse weiter (erster Text = Weiterleitung nach Abschluss)
+- Stream: /analyze/<ad_id>/stream liefert die Abschnitte als Server-Sent Events
+
+Zusätzlich wird geprüft, dass die gestreamte Analyse und die Antwort auf eine Folgefrage nach dem
+Stream gespeichert sind und dass zwei gleichzeitige Streams und ein Formular-POST für dieselbe
+Anzeige nur eine Analyse (einen Modellaufruf) auslösen und alle den vollständigen Text erhalten.
+
+Aufruf:
+    python benchmarks/streaming_benchmark.py [--first-chunk 0.5] [--chunks 30] [--chunk-delay 0.1]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Statusseite: Abstand der Abfragen in templates/job.html
+POLL_INTERVAL = 1.0
+
+
+class StubModels:
+    """Ersatz für client.models mit verzögertem ersten Abschnitt"""
+
+    calls = 0  # Modellaufrufe aller Instanzen
+
+    def __init__(self, args):
+        self.args = args
+
+    def _chunks(self):
+        StubModels.calls += 1
+        time.sleep(self.args.first_chunk)
+        for i in range(self.args.chunks):
+            if i:
+                time.sleep(self.args.chunk_delay)
+            yield type('Response', (), {'text': f"Abschnitt {i + 1} der Analyse. "})()
+
+    def generate_content_stream(self, model, contents):
+        return self._chunks()
+
+    def generate_content(self, model, contents):
+        text = ''.join(chunk.text for chunk in self._chunks())
+        return type('Response', (), {'text': text})()
+
+
+def read_events(response):
+    """Liest Server-Sent Events und liefert (Event, Daten, Zeitpunkt)"""
+    buffer = ''
+    for data in response.response:
+        buffer += data.decode('utf-8') if isinstance(data, bytes) else data
+        while '\n\n' in buffer:
+            block, buffer = buffer.split('\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in block.split('\n'))
+            yield fields['event'], json.loads(fields['data']), time.perf_counter()
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Benchmark der gestreamten Gemini-Antworten')
+    parser.add_argument('--first-chunk', type=float, default=0.5, help='Wartezeit bis zum ersten Abschnitt in Sekunden')
+    parser.add_argument('--chunks', type=int, default=30, help='Anzahl der Abschnitte')
+    parser.add_argument('--chunk-delay', type=float, default=0.1, help='Abstand der Abschnitte in Sekunden')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Die Webapp legt Ausgaben relativ zum Arbeitsverzeichnis ab
+        os.chdir(workdir)
+        os.environ['GEMINI_API_KEY'] = 'stub'
+        os.environ['GEMINI_RESPONSE_CACHE'] = 'false'
+        os.environ['AD_STORE_PATH'] = os.path.join(workdir, 'ads.db')
+        import app as webapp
+
+        original_create_analyzer = webapp.create_analyzer
+
+        def create_analyzer():
+            analyzer = original_create_analyzer()
+            analyzer.client = type('StubClient', (), {'models': StubModels(args)})()
+            return analyzer
+
+        webapp.create_analyzer = create_analyzer
+        client = webapp.app.test_client()
+
+        ads = {}
+        for ad_id in ('9000000001', '9000000002', '9000000003'):
+            ads[ad_id] = {'id': ad_id, 'title': f'Testanzeige {ad_id}', 'price': '100', 'description': 'Test',
+                          'details': {}, 'images': []}
+            webapp.ad_store.save_ad(ads[ad_id])
+
+        # Bisher: Hintergrund-Job mit Statusseite
+        started = time.perf_counter()
+        response = client.post('/analyze/9000000001')
+        job_id = response.headers['Location'].rsplit('/', 1)[-1]
+        while True:
+            time.sleep(POLL_INTERVAL)
+            if client.get(f'/api/jobs/{job_id}').get_json()['status'] in ('done', 'failed'):
+                break
+        job_first_text = time.perf_counter() - started
+
+        # Stream
+        started = time.perf_counter()
+        response = client.get('/analyze/9000000002/stream', buffered=False)
+        events = list(read_events(response))
+        stream_first_text = next(t for event, _, t in events if event == 'chunk') - started
+        stream_total = events[-1][2] - started
+        stored = webapp.ad_store.get_analysis('9000000002')
+
+        # Folgefrage als Stream
+        response = client.get('/analyze/9000000002/followup/stream?question=Ist+der+Preis+angemessen%3F',
+                              buffered=False)
+        followup_events = list(read_events(response))
+        webapp.chat_sessions.flush()  # Chatverläufe werden verzögert gespeichert
+        chat = webapp.ad_store.get_chat('9000000002')
+
+        # Zwei Tabs und ein Formular-POST für dieselbe Anzeige
+        calls_before = StubModels.calls
+        shared = {}
+
+        def tab(name):
+            response = webapp.app.test_client().get('/analyze/9000000003/stream', buffered=False)
+            shared[name] = list(read_events(response))
+
+        tabs = [threading.Thread(target=tab, args=(name,)) for name in ('a', 'b')]
+        tabs[0].start()
+        time.sleep(args.first_chunk / 2)
+        tabs[1].start()
+        client.post('/analyze/9000000003')
+        for thread in tabs:
+            thread.join()
+        shared_calls = StubModels.calls - calls_before
+        shared_texts = [''.join(data['text'] for event, data, _ in events if event == 'chunk')
+                        for events in shared.values()]
+
+    print(f"Stub-Modell: erster Abschnitt nach {args.first_chunk:g} s, {args.chunks} Abschnitte "
+          f"im Abstand von {args.chunk_delay:g} s")
+    print(f"{'Verfahren':<22} {'erster Text s':>14} {'vollständig s':>14}")
+    print(f"{'Hintergrund-Job':<22} {job_first_text:>14.2f} {job_first_text:>14.2f}")
+    print(f"{'Server-Sent Events':<22} {stream_first_text:>14.2f} {stream_total:>14.2f}")
+    print(f"Zwei Streams und ein POST für dieselbe Anzeige: {shared_calls} Modellaufruf(e)")
+
+    failed = False
+    if events[-1][0] != 'done' or not stored or stored.get('analysis', '').count('Abschnitt') != args.chunks:
+        failed = True
+        print("FEHLER: Gestreamte Analyse wurde nicht vollständig gespeichert")
+    if followup_events[-1][0] != 'done' or not chat or chat['chat_history'][-1]['role'] != 'assistant':
+        failed = True
+        print("FEHLER: Antwort auf die Folgefrage wurde nicht gespeichert")
+    if shared_calls != 1 or any(text.count('Abschnitt') != args.chunks for text in shared_texts) \
+            or any(events[-1][0] != 'done' for events in shared.values()):
+        failed = True
+        print(f"FEHLER: Gleichzeitige Anfragen lösten {shared_calls} Analysen aus oder erhielten nicht den vollständigen Text")
+    if stream_first_text >= job_first_text:
+        failed = True
+        print("FEHLER: Der Stream liefert den ersten Text nicht früher")
+
+    if failed:
+        sys.exit(1)
+    print("Der erste Text erscheint nach der Wartezeit des Modells statt nach der vollständigen Antwort.")
+
+
+if __name__ == "__main__":
+    main()
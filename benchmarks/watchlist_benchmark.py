@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Simulation des Watchlist-Planers
+
+Beobachtet Anzeigen auf dem lokalen Ersatzserver aus scrape_benchmark.py. Nur bei wenigen
+("heißen") Anzeigen ändert sich regelmäßig der Preis, die übrigen bleiben unverändert; eine
+Anzeige wird nach einem Drittel der Laufzeit entfernt. Verglichen werden festes Abrufintervall und
+adaptive Intervalle: Anzahl der Prüfungen und HTTP-Anfragen, gemeldete Preisänderungen und
+die Verzögerung bis zur Meldung. Ein dritter Durchlauf prüft, dass das globale Anfragebudget
+eingehalten wird. Die Zeitskala ist verkürzt (Sekunden statt Stunden).
+
+Aufruf:
+    python benchmarks/watchlist_benchmark.py [--ads 20] [--hot 3] [--duration 10] [--interval 1]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kleinanzeigen_scraper import KleinanzeigenScraper, scrape_batch  # noqa: E402
+from watchlist import WatchlistScheduler, RequestBudget  # noqa: E402
+from scrape_benchmark import StandInServer  # noqa: E402
+
+FIRST_AD_ID = 4000000000
+
+
+def simulate(server, args, label, min_interval, max_interval, requests_per_hour=0):
+    """Führt einen Durchlauf aus und liefert die Kennzahlen"""
+    ad_ids = [str(FIRST_AD_ID + i) for i in range(args.ads)]
+    urls = {ad_id: f"{server.base_url}/s-anzeige/watch-anzeige/{ad_id}-217-1234" for ad_id in ad_ids}
+    hot_ids = ad_ids[:args.hot]
+    removed_id = ad_ids[-1]
+    server.prices.clear()
+    server.removed_ads.clear()
+
+    change_times = {ad_id: [] for ad_id in hot_ids}
+    events = []
+    stop = threading.Event()
+
+    def change_prices():
+        """Ändert regelmäßig die Preise der heißen Anzeigen und entfernt nach einem Drittel der Laufzeit eine Anzeige"""
+        started = time.monotonic()
+        price = 5000
+        while not stop.wait(args.change_every):
+            price -= 50
+            for ad_id in hot_ids:
+                server.prices[ad_id] = f'{price} € VB'
+                change_times[ad_id].append(time.monotonic())
+            if time.monotonic() - started >= args.duration / 3:
+                server.removed_ads.add(removed_id)
+
+    def on_event(event):
+        events.append((time.monotonic(), event))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        scraper = KleinanzeigenScraper(output_dir=output_dir, base_url=server.base_url,
+                                       seller_cache_on_disk=False, incremental=True)
+        with scraper, open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            # Anzeigen einmal vollständig scrapen (Bilder, Verkäufer), wie bei einer bestehenden Sammlung
+            for _ in scrape_batch(scraper, urls.values(), workers=4):
+                pass
+
+            scheduler = WatchlistScheduler(scraper, path=None, on_event=on_event,
+                                           min_interval=min_interval, max_interval=max_interval,
+                                           initial_interval=args.interval, requests_per_hour=requests_per_hour)
+            if requests_per_hour:
+                # Verkürzte Zeitskala: höchstens eine Sekunde Budget ansparen statt einer Minute
+                scheduler.budget = RequestBudget(requests_per_hour, burst=requests_per_hour / 3600)
+            for url in urls.values():
+                scheduler.add(url)
+
+            changer = threading.Thread(target=change_prices, daemon=True)
+            runner = threading.Thread(target=scheduler.run, args=(stop,), daemon=True)
+            started = time.monotonic()
+            changer.start()
+            runner.start()
+            time.sleep(args.duration)
+            stop.set()
+            runner.join()
+            changer.join()
+            elapsed = time.monotonic() - started
+
+    # Verzögerung: Zeit von der ersten noch nicht gemeldeten Änderung bis zur Meldung
+    delays = []
+    reported = {ad_id: 0 for ad_id in hot_ids}
+    for event_time, event in events:
+        ad_id = event['url'].rsplit('/', 1)[-1].split('-')[0]
+        if event['type'] != 'price_changed' or ad_id not in change_times:
+            continue
+        pending = [t for t in change_times[ad_id][reported[ad_id]:] if t <= event_time]
+        if pending:
+            delays.append(event_time - pending[0])
+            reported[ad_id] += len(pending)
+
+    removed = any(event['type'] == 'removed' for _, event in events)
+    return {
+        'label': label,
+        'checks': scheduler.checks,
+        'requests': scheduler.requests,
+        'requests_per_second': scheduler.requests / elapsed,
+        'price_events': len(delays),
+        'changes': sum(len(times) for times in change_times.values()),
+        'mean_delay': sum(delays) / len(delays) if delays else 0.0,
+        'max_delay': max(delays) if delays else 0.0,
+        'removed': removed,
+        'capacity': scheduler.budget.capacity,
+        'elapsed': elapsed,
+    }
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Simulation fester und adaptiver Abrufintervalle')
+    parser.add_argument('--ads', type=int, default=20, help='Anzahl beobachteter Anzeigen')
+    parser.add_argument('--hot', type=int, default=3, help='Anzahl der Anzeigen mit regelmäßigen Preisänderungen')
+    parser.add_argument('--duration', type=float, default=10, help='Laufzeit pro Durchlauf in Sekunden')
+    parser.add_argument('--interval', type=float, default=1, help='Festes bzw. anfängliches Abrufintervall in Sekunden')
+    parser.add_argument('--change-every', type=float, default=1, help='Abstand der Preisänderungen in Sekunden')
+    parser.add_argument('--budget', type=float, default=20, help='Anfragen pro Sekunde im Budget-Durchlauf')
+    args = parser.parse_args()
+
+    server = StandInServer()
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    print(f"{args.ads} Anzeigen, davon {args.hot} mit Preisänderung alle {args.change_every:g} s, "
+          f"Laufzeit {args.duration:g} s")
+    print(f"{'Verfahren':<10} {'Prüfungen':>9} {'Anfragen':>9} {'Anfr./s':>8} {'Meldungen':>10} "
+          f"{'Änderungen':>11} {'Ø Verz. s':>10} {'max s':>6} {'entfernt':>9}")
+
+    failed = False
+    try:
+        runs = (
+            ('fest', args.interval, args.interval, 0),
+            ('adaptiv', args.interval / 4, args.interval * 8, 0),
+            ('budget', args.interval / 4, args.interval * 8, args.budget * 3600),
+        )
+        for label, min_interval, max_interval, requests_per_hour in runs:
+            result = simulate(server, args, label, min_interval, max_interval, requests_per_hour)
+            print(f"{label:<10} {result['checks']:>9} {result['requests']:>9} {result['requests_per_second']:>8.1f} "
+                  f"{result['price_events']:>10} {result['changes']:>11} {result['mean_delay']:>10.2f} "
+                  f"{result['max_delay']:>6.2f} {'ja' if result['removed'] else 'nein':>9}")
+
+            if not result['removed'] or not result['price_events']:
+                failed = True
+                print("FEHLER: Preisänderungen bzw. entfernte Anzeige nicht gemeldet")
+            # Eine Prüfung kann das Budget um ihre eigenen Anfragen überziehen (geänderte Anzeige: Seite und Bilder)
+            allowed = args.budget * result['elapsed'] + result['capacity'] + len(server.images) + 2
+            if requests_per_hour and result['requests'] > allowed:
+                failed = True
+                print(f"FEHLER: {result['requests']} Anfragen überschreiten das Budget ({allowed:.0f})")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    if failed:
+        sys.exit(1)
+    print("Änderungen und entfernte Anzeigen wurden gemeldet; das Anfragebudget wurde eingehalten.")
+
+
+if __name__ == "__main__":
+    main()
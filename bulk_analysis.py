@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bulk Analysis Module
+
+Dieses Modul analysiert alle gespeicherten Anzeigen ohne Analyse mit Gemini, z.B. über Nacht nach
+einem Crawl. Gleichzeitig laufende Anfragen und Anfragen pro Minute sind begrenzt. Der Fortschritt
+wird in einer Checkpoint-Datei festgehalten, sodass ein unterbrochener Lauf dort fortgesetzt wird,
+wo er aufgehört hat.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from ad_store import AdStore, DEFAULT_DB_PATH
+from gemini_analyzer import GeminiAnalyzer, save_analysis_result
+from http_client import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = os.path.join('output', 'bulk_analysis_checkpoint.json')
+
+
+class BulkAnalyzer:
+    """Analysiert viele Anzeigen mit begrenzter Parallelität, Anfragebudget und Checkpoint."""
+
+    def __init__(self, analyzer: GeminiAnalyzer, ad_store: AdStore, output_dir: str = 'output', workers: int = 4,
+                 requests_per_minute: float = 10, checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT_PATH):
+        """
+        Initialisiert den Lauf.
+
+        Args:
+            analyzer (GeminiAnalyzer): Von allen Workern gemeinsam genutzter Analyzer
+            ad_store (AdStore): Datenbank mit den Anzeigen; Analysen werden dort gespeichert
+            output_dir (str, optional): Ausgabeverzeichnis (Bilder und JSON-Export). Standardmäßig "output".
+            workers (int, optional): Maximale Anzahl gleichzeitiger Anfragen. Standardmäßig 4.
+            requests_per_minute (float, optional): Maximale Anfragen pro Minute (0 = unbegrenzt). Standardmäßig 10.
+            checkpoint_path (str, optional): Checkpoint-Datei (None: kein Checkpoint).
+                                             Standardmäßig "output/bulk_analysis_checkpoint.json".
+        """
+        self.analyzer = analyzer
+        self.ad_store = ad_store
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.budget = TokenBucket(requests_per_minute / 60) if requests_per_minute > 0 else None
+        self.checkpoint_path = checkpoint_path
+
+        self._checkpoint = None
+        self._lock = threading.Lock()
+
+    def run(self, ad_ids: Optional[List[str]] = None, retry_failed: bool = False, since: Optional[str] = None,
+            limit: Optional[int] = None, stop_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Analysiert die Anzeigen eines Laufs. Existiert ein Checkpoint, wird dessen Lauf fortgesetzt;
+        nach vollständigem Abschluss wird der Checkpoint gelöscht.
+
+        Args:
+            ad_ids (List[str], optional): Zu analysierende Anzeigen. Standardmäßig alle ohne Analyse.
+            retry_failed (bool, optional): Auch Anzeigen mit fehlgeschlagener Analyse erneut analysieren
+            since (str, optional): Nur Anzeigen, die ab diesem Zeitpunkt (ISO 8601) gescrapt wurden
+            limit (int, optional): Maximale Anzahl der Anzeigen eines neuen Laufs
+            stop_event (threading.Event, optional): Beendet den Lauf nach den laufenden Anfragen
+
+        Returns:
+            Dict[str, Any]: total, done, failed, skipped, remaining, resumed und elapsed
+        """
+        checkpoint = self._load_checkpoint()
+        resumed = checkpoint is not None
+        if checkpoint is None:
+            if ad_ids is None:
+                ad_ids = self.ad_store.list_unanalyzed(include_failed=retry_failed, since=since, limit=limit)
+            checkpoint = {
+                'ad_ids': list(ad_ids),
+                'retry_failed': retry_failed,
+                'done': [],
+                'failed': {},
+                'skipped': [],
+                'started_at': datetime.now().isoformat(),
+            }
+        else:
+            logger.info(f"Setze Lauf vom {checkpoint['started_at']} fort")
+        self._checkpoint = checkpoint
+
+        finished = set(checkpoint['done']) | set(checkpoint['failed']) | set(checkpoint['skipped'])
+        queue = iter([ad_id for ad_id in checkpoint['ad_ids'] if ad_id not in finished])
+        logger.info(f"{len(checkpoint['ad_ids']) - len(finished)} von {len(checkpoint['ad_ids'])} Anzeigen offen")
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {}
+            try:
+                while True:
+                    # Höchstens so viele Anfragen gleichzeitig wie Worker
+                    while len(pending) < self.workers and not (stop_event and stop_event.is_set()):
+                        ad_id = next(queue, None)
+                        if ad_id is None:
+                            break
+                        data = self._pending_ad(ad_id, checkpoint['retry_failed'])
+                        if data is None:
+                            self._record(ad_id, 'skipped')
+                            continue
+                        if self.budget:
+                            self.budget.acquire()
+                        pending[executor.submit(self._analyze, ad_id, data)] = ad_id
+
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._collect(pending.pop(future), future)
+            except KeyboardInterrupt:
+                logger.warning("Abbruch angefordert, warte auf laufende Anfragen")
+                for future in list(pending):
+                    self._collect(pending.pop(future), future)
+                raise
+            finally:
+                remaining = len(checkpoint['ad_ids']) - len(checkpoint['done']) - len(checkpoint['failed']) \
+                    - len(checkpoint['skipped'])
+                if remaining == 0:
+                    self._remove_checkpoint()
+
+        return {
+            'total': len(checkpoint['ad_ids']),
+            'done': len(checkpoint['done']),
+            'failed': len(checkpoint['failed']),
+            'skipped': len(checkpoint['skipped']),
+            'remaining': remaining,
+            'resumed': resumed,
+            'elapsed': time.monotonic() - started,
+        }
+
+    def _pending_ad(self, ad_id: str, retry_failed: bool) -> Optional[Dict[str, Any]]:
+        """Liefert die Daten einer Anzeige oder None, falls sie fehlt oder inzwischen analysiert wurde"""
+        analysis = self.ad_store.get_analysis(ad_id)
+        if analysis is not None and (analysis.get('success') or not retry_failed):
+            return None
+        return self.ad_store.get_ad(ad_id)
+
+    def _analyze(self, ad_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analysiert eine Anzeige und speichert ein erfolgreiches Ergebnis (läuft im Worker)"""
+        image_paths = []
+        for image in data.get('images') or []:
+            if image.get('filename'):
+                image_path = os.path.join(self.output_dir, 'images', image['filename'])
+                if os.path.exists(image_path):
+                    image_paths.append(image_path)
+
+        result = self.analyzer.analyze(data, image_paths)
+        # Fehlgeschlagene Analysen (z.B. Kontingent erschöpft) nicht speichern, damit die Webapp sie
+        # nicht als vorhanden anzeigt und ein späterer Lauf sie erneut versucht
+        if result.get('success'):
+            save_analysis_result(ad_id, result, self.output_dir)
+            self.ad_store.save_analysis(ad_id, result)
+        return result
+
+    def _collect(self, ad_id: str, future) -> None:
+        """Übernimmt das Ergebnis eines Workers in den Checkpoint"""
+        try:
+            result = future.result()
+            error = None if result.get('success') else result.get('error', 'Unbekannter Fehler')
+        except Exception as e:
+            error = str(e)
+
+        if error is None:
+            logger.info(f"Analysiert: {ad_id}")
+            self._record(ad_id, 'done')
+        else:
+            logger.error(f"Analyse von {ad_id} fehlgeschlagen: {error}")
+            self._record(ad_id, 'failed', error)
+
+    def _record(self, ad_id: str, outcome: str, error: Optional[str] = None) -> None:
+        """Vermerkt das Ergebnis einer Anzeige und schreibt den Checkpoint"""
+        with self._lock:
+            if outcome == 'failed':
+                self._checkpoint['failed'][ad_id] = error
+            else:
+                self._checkpoint[outcome].append(ad_id)
+            self._checkpoint['updated_at'] = datetime.now().isoformat()
+            self._save_checkpoint()
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Lädt den Checkpoint eines unterbrochenen Laufs"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Fehler beim Laden des Checkpoints {self.checkpoint_path}: {str(e)}")
+            return None
+
+    def _save_checkpoint(self) -> None:
+        """Schreibt den Checkpoint atomar (Aufrufer hält die Sperre)"""
+        if not self.checkpoint_path:
+            return
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._checkpoint, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _remove_checkpoint(self) -> None:
+        """Löscht den Checkpoint nach einem vollständigen Lauf"""
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Gespeicherte Anzeigen ohne Analyse mit Gemini analysieren')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Pfad der Anzeigen-Datenbank')
+    parser.add_argument('--output', '-o', default='output', help='Ausgabeverzeichnis (Bilder und JSON-Export)')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='Maximale Anzahl gleichzeitiger Anfragen')
+    parser.add_argument('--rpm', type=float, default=10, help='Maximale Anfragen pro Minute (0 = unbegrenzt)')
+    parser.add_argument('--since', help='Nur Anzeigen, die ab diesem Zeitpunkt gescrapt wurden (z.B. 2025-01-31)')
+    parser.add_argument('--limit', type=int, help='Maximale Anzahl der Anzeigen eines neuen Laufs')
+    parser.add_argument('--retry-failed', action='store_true', help='Auch fehlgeschlagene Analysen wiederholen')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_PATH, help='Checkpoint-Datei')
+    parser.add_argument('--restart', action='store_true', help='Vorhandenen Checkpoint verwerfen und neu beginnen')
+    parser.add_argument('--model', default='gemini-2.0-flash', help='Name des Gemini-Modells')
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        print("GEMINI_API_KEY ist nicht gesetzt.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    analyzer = GeminiAnalyzer(
+        api_key=api_key,
+        model_name=args.model,
+        image_max_edge=int(os.getenv('GEMINI_IMAGE_MAX_EDGE', '768')),
+        image_quality=int(os.getenv('GEMINI_IMAGE_QUALITY', '80'))
+    )
+    bulk = BulkAnalyzer(analyzer, AdStore(args.db), output_dir=args.output, workers=args.workers,
+                        requests_per_minute=args.rpm, checkpoint_path=args.checkpoint)
+    try:
+        summary = bulk.run(retry_failed=args.retry_failed, since=args.since, limit=args.limit)
+    except KeyboardInterrupt:
+        print(f"Abgebrochen; der Lauf wird beim nächsten Aufruf fortgesetzt ({args.checkpoint}).", file=sys.stderr)
+        sys.exit(130)
+
+    print(f"{summary['done']} analysiert, {summary['failed']} fehlgeschlagen, {summary['skipped']} übersprungen "
+          f"von {summary['total']} Anzeigen in {summary['elapsed']:.1f} s"
+          f"{' (fortgesetzt)' if summary['resumed'] else ''}")
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Chat Context Module
+
+Dieses Modul stellt den Kontext für Folgefragen an Gemini zusammen, ohne den Token-Verbrauch mit
+jeder Frage wachsen zu lassen: Die Eckdaten der Anzeige stehen einmal am Anfang, die letzten
+Nachrichten (einschließlich der Analyse, solange sie zu den letzten gehört) werden wörtlich
+übernommen und ältere Nachrichten durch eine fortlaufende Zusammenfassung ersetzt. Die
+Zusammenfassung wird gespeichert und nur aktualisiert, wenn weitere Nachrichten aus dem
+Token-Budget fallen.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Grobe Schätzung ohne Tokenizer (deutscher Text: etwa 4 Zeichen pro Token)
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TOKEN_BUDGET = 4000
+
+# Zusammenfassung: (bisherige Zusammenfassung oder None, neu zusammenzufassende Nachrichten) -> Text
+Summarizer = Callable[[Optional[str], List[Dict[str, str]]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Schätzt die Anzahl der Tokens eines Textes.
+
+    Args:
+        text (str): Text
+
+    Returns:
+        int: Geschätzte Anzahl der Tokens
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def ad_facts(data: Dict[str, Any]) -> str:
+    """
+    Fasst die Eckdaten einer Anzeige (Titel, Preis, Details) kompakt zusammen.
+
+    Args:
+        data (Dict[str, Any]): Die Kleinanzeigen-Daten
+
+    Returns:
+        str: Eckdaten, eine Angabe pro Zeile
+    """
+    lines = [f"Titel: {data.get('title') or 'Nicht angegeben'}",
+             f"Preis: {data.get('price') or 'Nicht angegeben'}"]
+    for key, value in (data.get('details') or {}).items():
+        lines.append(f"{key}: {value}")
+    return '\n'.join(lines)
+
+
+def to_contents(messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Wandelt Chatnachrichten ({"role": "user"/"assistant", "content": ...}) in Inhalte für die Gemini-API um.
+
+    Args:
+        messages (List[Dict[str, str]]): Nachrichten im Format des Chatverlaufs
+
+    Returns:
+        List[Dict[str, Any]]: Inhalte mit den Rollen "user" und "model"
+    """
+    return [{"role": "model" if message.get("role") == "assistant" else "user",
+             "parts": [{"text": message.get("content") or ""}]}
+            for message in messages]
+
+
+class ChatContext:
+    """Stellt den Kontext einer Folgefrage innerhalb eines Token-Budgets zusammen."""
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, summary_tokens: Optional[int] = None,
+                 min_recent: int = 2, summarizer: Optional[Summarizer] = None):
+        """
+        Initialisiert die Zusammenstellung.
+
+        Args:
+            token_budget (int, optional): Geschätzte Tokens für den gesamten Kontext. Standardmäßig 4000.
+            summary_tokens (int, optional): Für die Zusammenfassung reservierte Tokens.
+                                            Standardmäßig ein Viertel des Budgets.
+            min_recent (int, optional): Nachrichten, die immer wörtlich übernommen werden (auch über
+                                        dem Budget), einschließlich der aktuellen Frage. Standardmäßig 2.
+            summarizer (Summarizer, optional): Erstellt die Zusammenfassung älterer Nachrichten. Ohne
+                                               Summarizer werden ältere Nachrichten weggelassen.
+        """
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens if summary_tokens is not None else token_budget // 4
+        self.min_recent = max(1, min_recent)
+        self.summarizer = summarizer
+
+    def build(self, messages: List[Dict[str, str]], preamble: str,
+              summary: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Stellt den Kontext zusammen.
+
+        Passen nicht mehr alle noch nicht zusammengefassten Nachrichten ins Budget, werden die ältesten
+        in die Zusammenfassung übernommen, und zwar so viele, dass die wörtlichen Nachrichten danach nur
+        noch die Hälfte des verfügbaren Budgets belegen. So wird die Zusammenfassung nicht bei jeder
+        Frage, sondern nur nach mehreren Fragen neu erstellt.
+
+        Args:
+            messages (List[Dict[str, str]]): Gesamter Verlauf, die aktuelle Frage zuletzt
+            preamble (str): Einleitung mit den Eckdaten der Anzeige (steht einmal am Anfang)
+            summary (Dict[str, Any], optional): Bisherige Zusammenfassung {"text": ..., "turns": n},
+                                                n = Anzahl der zusammengefassten Nachrichten
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]: Inhalte für die Gemini-API und
+                die (ggf. aktualisierte) Zusammenfassung
+        """
+        covered = min(summary['turns'], len(messages) - 1) if summary else 0
+        available = max(0, self.token_budget - estimate_tokens(preamble) - self.summary_tokens)
+
+        start = self._window_start(messages, covered, available)
+        if start > covered:
+            start = self._window_start(messages, covered, available // 2)
+            summary = self._fold(summary, messages[covered:start], start)
+
+        opening = preamble
+        if summary and summary.get('text'):
+            opening += f"\n\nZusammenfassung des bisherigen Gesprächs:\n{summary['text']}"
+        return to_contents([{"role": "user", "content": opening}, *messages[start:]]), summary
+
+    def _window_start(self, messages: List[Dict[str, str]], covered: int, available: int) -> int:
+        """Index der ältesten wörtlich übernommenen Nachricht (neueste zuerst, solange das Budget reicht)"""
+        start = len(messages)
+        used = 0
+        while start > covered:
+            tokens = estimate_tokens(messages[start - 1].get('content') or '')
+            if len(messages) - start >= self.min_recent and used + tokens > available:
+                break
+            used += tokens
+            start -= 1
+        return start
+
+    def _fold(self, summary: Optional[Dict[str, Any]], messages: List[Dict[str, str]],
+              turns: int) -> Optional[Dict[str, Any]]:
+        """Übernimmt Nachrichten in die Zusammenfassung; ohne Summarizer oder bei Fehlern entfallen sie"""
+        previous = summary.get('text') if summary else None
+        if self.summarizer is None:
+            return {'text': previous, 'turns': turns}
+        try:
+            return {'text': self.summarizer(previous, messages), 'turns': turns}
+        except Exception as e:
+            logger.error(f"Fehler beim Zusammenfassen des Chatverlaufs: {str(e)}")
+            return {'text': previous, 'turns': turns}
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Chat Sessions Module
+
+Dieses Modul hält die aktiven Chats der Webapp im Speicher: Pro Anzeige einen GeminiAnalyzer mit
+wiederhergestelltem Chatverlauf, die Anzeige und die Analyse. Eine Folgefrage kommt damit ohne
+erneutes Laden aus Datenbank und JSON-Dateien aus. Geänderte Chats werden verzögert gespeichert
+(write-behind): ein Hintergrund-Thread schreibt sie in festen Abständen, außerdem beim Verdrängen
+aus dem LRU-Speicher und beim Beenden. Mehrere Fragen innerhalb eines Intervalls werden dabei zu
+einem Schreibvorgang zusammengefasst.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """Aktiver Chat einer Anzeige."""
+
+    def __init__(self, ad_id: str, data: Dict[str, Any], analysis: Dict[str, Any],
+                 chat: Optional[Dict[str, Any]], analyzer: Any):
+        """
+        Initialisiert den Chat.
+
+        Args:
+            ad_id (str): Die ID der Anzeige
+            data (Dict[str, Any]): Die Kleinanzeigen-Daten
+            analysis (Dict[str, Any]): Gespeichertes Analyseergebnis
+            chat (Dict[str, Any], optional): Gespeicherter Chat in der Struktur der Datei {ad_id}_chat.json
+            analyzer (GeminiAnalyzer): Analyzer mit wiederhergestelltem Chatverlauf (siehe restore_chat)
+        """
+        self.ad_id = ad_id
+        self.data = data
+        self.analysis = analysis
+        self.chat = chat
+        self.analyzer = analyzer
+        # Nur eine Folgefrage pro Chat gleichzeitig (der Analyzer ändert seinen Chatverlauf)
+        self.lock = threading.Lock()
+        self.dirty = False
+        self._flush_lock = threading.Lock()
+
+
+# Lädt einen Chat (None: Anzeige oder Analyse fehlt)
+Loader = Callable[[str], Optional[ChatSession]]
+# Speichert einen Chat: (ad_id, Chat in der Struktur der Datei {ad_id}_chat.json)
+Persister = Callable[[str, Dict[str, Any]], None]
+
+
+class ChatSessionStore:
+    """LRU-Speicher der aktiven Chats mit verzögertem Speichern."""
+
+    def __init__(self, loader: Loader, persist: Persister, max_sessions: int = 128, flush_interval: float = 2.0):
+        """
+        Initialisiert den Speicher.
+
+        Args:
+            loader (Loader): Lädt einen Chat, der noch nicht im Speicher ist
+            persist (Persister): Speichert einen geänderten Chat (Datenbank und JSON-Export)
+            max_sessions (int, optional): Maximale Anzahl der Chats im Speicher. Standardmäßig 128.
+            flush_interval (float, optional): Abstand der Speichervorgänge in Sekunden; Werte <= 0
+                                              speichern jede Änderung sofort. Standardmäßig 2.
+        """
+        self.max_sessions = max(1, max_sessions)
+        self.flush_interval = flush_interval
+        self._loader = loader
+        self._persist = persist
+        self._sessions: 'OrderedDict[str, ChatSession]' = OrderedDict()
+        self._loading: Dict[str, Future] = {}  # ad_id -> laufender Ladevorgang
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+        if flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, name='chat-session-flush', daemon=True)
+            self._thread.start()
+
+    def get(self, ad_id: str) -> Optional[ChatSession]:
+        """
+        Liefert den Chat einer Anzeige und lädt ihn bei Bedarf. Geladen wird außerhalb der Sperre
+        des Speichers, sodass ein langsamer Ladevorgang keine anderen Chats blockiert; gleichzeitige
+        Anfragen für dieselbe Anzeige warten auf denselben Ladevorgang.
+
+        Args:
+            ad_id (str): Die ID der Anzeige
+
+        Returns:
+            Optional[ChatSession]: Der Chat oder None, wenn Anzeige oder Analyse fehlen
+        """
+        with self._lock:
+            session = self._sessions.get(ad_id)
+            if session is not None:
+                self._sessions.move_to_end(ad_id)
+                metrics.inc('chat_sessions_total', result='hit')
+                return session
+
+            loading = self._loading.get(ad_id)
+            if loading is not None:
+                waiting = True
+            else:
+                waiting = False
+                loading = self._loading[ad_id] = Future()
+
+        if waiting:
+            return loading.result()
+
+        try:
+            session = self._loader(ad_id)
+        except Exception as e:
+            with self._lock:
+                del self._loading[ad_id]
+            loading.set_exception(e)
+            raise
+
+        evicted = []
+        with self._lock:
+            del self._loading[ad_id]
+            if session is not None:
+                metrics.inc('chat_sessions_total', result='load')
+                self._sessions[ad_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    evicted.append(self._sessions.popitem(last=False)[1])
+        loading.set_result(session)
+
+        for old in evicted:
+            self._flush_session(old)
+        return session
+
+    def chat(self, ad_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Liefert den aktuellen Stand eines Chats im Speicher (auch wenn er noch nicht gespeichert ist).
+
+        Args:
+            ad_id (str): Die ID der Anzeige
+
+        Returns:
+            Optional[Dict[str, Any]]: Der Chat oder None, wenn er nicht im Speicher ist
+        """
+        with self._lock:
+            session = self._sessions.get(ad_id)
+            return session.chat if session is not None else None
+
+    def update(self, session: ChatSession, chat_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Übernimmt das Ergebnis einer Folgefrage in den Chat und merkt ihn zum Speichern vor.
+
+        Args:
+            session (ChatSession): Der Chat
+            chat_result (Dict[str, Any]): Das Ergebnis von ask_followup_question
+
+        Returns:
+            Dict[str, Any]: Der Chat in der Struktur der Datei {ad_id}_chat.json
+        """
+        previous = session.chat
+        chat = {
+            'ad_id': session.ad_id,
+            'model': previous['model'] if previous else chat_result.get('model'),
+            # Kopie, damit der Speichervorgang einen festen Stand schreibt
+            'chat_history': list(chat_result.get('chat_history') or session.analyzer.chat_history),
+            'summary': chat_result.get('summary', previous.get('summary') if previous else None),
+            'created_at': previous['created_at'] if previous else chat_result.get('asked_at'),
+            'last_updated': chat_result.get('asked_at')
+        }
+
+        with self._lock:
+            session.chat = chat
+            session.dirty = True
+            # Bereits verdrängte Chats werden sofort gespeichert
+            pending = self._thread is not None and self._sessions.get(session.ad_id) is session
+
+        if not pending:
+            self._flush_session(session)
+        return chat
+
+    def flush(self, ad_id: Optional[str] = None) -> int:
+        """
+        Speichert geänderte Chats sofort.
+
+        Args:
+            ad_id (str, optional): Nur den Chat dieser Anzeige speichern
+
+        Returns:
+            int: Anzahl der gespeicherten Chats
+        """
+        with self._lock:
+            if ad_id is not None:
+                sessions = [self._sessions[ad_id]] if ad_id in self._sessions else []
+            else:
+                sessions = list(self._sessions.values())
+        return sum(1 for session in sessions if self._flush_session(session))
+
+    def close(self) -> None:
+        """Beendet den Hintergrund-Thread und speichert alle geänderten Chats"""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Liefert Kennzahlen des Speichers.
+
+        Returns:
+            Dict[str, int]: Anzahl der Chats im Speicher und der noch nicht gespeicherten Chats
+        """
+        with self._lock:
+            sessions: List[ChatSession] = list(self._sessions.values())
+        return {'sessions': len(sessions), 'dirty': sum(1 for session in sessions if session.dirty)}
+
+    def _run(self) -> None:
+        """Hintergrund-Thread: speichert geänderte Chats im Abstand von flush_interval"""
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Fehler beim Speichern der Chats: {str(e)}")
+
+    def _flush_session(self, session: ChatSession) -> bool:
+        """Speichert einen Chat, falls er geändert wurde; liefert True, wenn gespeichert wurde"""
+        # Verhindert, dass ein älterer Stand nach einem neueren geschrieben wird
+        with session._flush_lock:
+            with self._lock:
+                if not session.dirty:
+                    return False
+                chat = session.chat
+                session.dirty = False
+
+            try:
+                with metrics.span('chat', 'persist'):
+                    self._persist(session.ad_id, chat)
+                return True
+            except Exception as e:
+                logger.error(f"Fehler beim Speichern des Chats für Anzeige {session.ad_id}: {str(e)}")
+                with self._lock:
+                    session.dirty = True
+                return False
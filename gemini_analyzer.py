@@ -10,29 +10,88 @@ Dieses Modul stellt Funktionen zur Analyse von Kleinanzeigen-Daten mit dem Gemin
 import os
 import json
 import base64
+import time
+import hashlib
+import threading
 from google import genai
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 import logging
 
+import metrics
+
+from image_derivatives import ImageDerivativeCache, DEFAULT_CACHE_DIR
+from response_cache import ResponseCache, response_key, get_response_cache, DEFAULT_RESPONSE_CACHE_DIR
+from chat_context import ChatContext, ad_facts, DEFAULT_TOKEN_BUDGET
+
 # Logging konfigurieren
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Prozessweite genai-Clients (einer pro API-Schlüssel)
+_shared_clients: Dict[str, Any] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str) -> Any:
+    """
+    Liefert den prozessweiten genai-Client für einen API-Schlüssel, damit kurzlebige
+    GeminiAnalyzer-Instanzen (eine pro Webanfrage) keinen neuen Client aufbauen müssen.
+
+    Args:
+        api_key (str): Der API-Schlüssel für die Gemini API
+
+    Returns:
+        genai.Client: Gemeinsamer Client
+    """
+    with _shared_clients_lock:
+        client = _shared_clients.get(api_key)
+        if client is None:
+            client = _shared_clients[api_key] = genai.Client(api_key=api_key)
+        return client
+
+
 class GeminiAnalyzer:
     """Klasse zur Analyse von Kleinanzeigen-Daten mit dem Gemini 2.5 Pro Modell."""
 
-    def __init__(self, api_key: str, model_name: str = "gemini-2.0-flash"):
+    def __init__(self, api_key: str, model_name: str = "gemini-2.0-flash", image_max_edge: int = 768,
+                 image_quality: int = 80, image_cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                 response_cache: bool = True, response_cache_dir: Optional[str] = DEFAULT_RESPONSE_CACHE_DIR,
+                 response_cache_max_bytes: int = 64 * 2**20, chat_token_budget: int = DEFAULT_TOKEN_BUDGET):
         """
         Initialisiert den Gemini Analyzer.
 
         Args:
             api_key (str): Der API-Schlüssel für die Gemini API
             model_name (str, optional): Der Name des zu verwendenden Modells. Standardmäßig "gemini-2.0-flash".
+            image_max_edge (int, optional): Maximale Kantenlänge der an Gemini gesendeten Bilder in Pixeln.
+                                            Werte <= 0 senden die Originalbilder. Standardmäßig 768.
+            image_quality (int, optional): JPEG-Qualität der verkleinerten Bilder. Standardmäßig 80.
+            image_cache_dir (str, optional): Verzeichnis für die verkleinerten Bilder.
+                                             Standardmäßig "output/image_derivatives".
+            response_cache (bool, optional): Antworten inhaltsbasiert zwischenspeichern. Standardmäßig True.
+            response_cache_dir (str, optional): Verzeichnis des Antwort-Caches (None: nur im Speicher).
+                                                Standardmäßig "output/response_cache".
+            response_cache_max_bytes (int, optional): Maximale Größe des Antwort-Caches auf der Festplatte.
+                                                      Standardmäßig 64 MB.
+            chat_token_budget (int, optional): Geschätzte Tokens für den Kontext einer Folgefrage; ältere
+                                               Nachrichten werden zusammengefasst. Standardmäßig 4000.
         """
         self.api_key = api_key
         self.model_name = model_name
-        self.client = genai.Client(api_key=api_key)
+        self.client = get_client(api_key)
+        self.image_derivatives = None
+        if image_max_edge > 0:
+            self.image_derivatives = ImageDerivativeCache(image_cache_dir, image_max_edge, image_quality)
+        # Prozessweit geteilt, damit auch kurzlebige Instanzen (eine pro Webanfrage) den Speicher nutzen
+        self.response_cache: Optional[ResponseCache] = None
+        if response_cache:
+            self.response_cache = get_response_cache(response_cache_dir, max_bytes=response_cache_max_bytes)
         self.chat_history = []  # Speichert den Chatverlauf für Folgefragen
+        # Kontext der Folgefragen: Eckdaten der Anzeige, Analyse und Zusammenfassung älterer Nachrichten
+        self.chat_context = ChatContext(chat_token_budget, summarizer=self._summarize_chat)
+        self.ad_facts = None
+        self.analysis_text = None
+        self.chat_summary = None
         logger.info(f"GeminiAnalyzer initialisiert mit Modell: {model_name}")
 
     def _encode_image(self, image_path: str) -> str:
@@ -121,98 +180,236 @@ class GeminiAnalyzer:
             # Andere Analysetypen können hier implementiert werden
             return "Bitte analysiere diese Kleinanzeige."
 
-    def analyze(self, data: Dict[str, Any], image_paths: List[str], analysis_type: str = "standard") -> Dict[str, Any]:
+    def analyze(self, data: Dict[str, Any], image_paths: List[str], analysis_type: str = "standard",
+                use_cache: bool = True) -> Dict[str, Any]:
         """
         Analysiert die Kleinanzeigen-Daten mit dem Gemini-Modell.
 
+        Ist der Antwort-Cache aktiv, wird eine Anfrage mit identischem Modell, Analysetyp, Prompt und
+        identischen Bilddaten nicht erneut an das Modell gesendet.
+
         Args:
             data (Dict[str, Any]): Die Kleinanzeigen-Daten
             image_paths (List[str]): Liste der Pfade zu den Bildern
             analysis_type (str, optional): Der Typ der Analyse. Standardmäßig "standard".
+            use_cache (bool, optional): False erzwingt einen neuen Modellaufruf. Standardmäßig True.
 
         Returns:
-            Dict[str, Any]: Das Analyseergebnis
+            Dict[str, Any]: Das Analyseergebnis ("cached" gibt an, ob es aus dem Cache stammt)
+        """
+        try:
+            contents, cache_key, cached = self._prepare_analysis(data, image_paths, analysis_type, use_cache)
+            if cached:
+                return self._cached_analysis_result(data, cached)
+
+            # Anfrage an Gemini senden gemäß der aktuellen API-Dokumentation
+            with metrics.span('gemini', 'generate'):
+                response = self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=contents
+                )
+
+            return self._finish_analysis(data, analysis_type, cache_key,
+                                         self._response_text(response, "Keine Analyseergebnisse verfügbar."))
+
+        except Exception as e:
+            logger.error(f"Fehler bei der Analyse: {str(e)}")
+            return self._analysis_error(e)
+
+    def analyze_stream(self, data: Dict[str, Any], image_paths: List[str], analysis_type: str = "standard",
+                       use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Analysiert die Kleinanzeigen-Daten wie analyze, liefert den Text aber abschnittsweise, sobald das
+        Modell ihn erzeugt. Eine Antwort aus dem Cache wird als ein einziger Abschnitt geliefert.
+
+        Args:
+            data (Dict[str, Any]): Die Kleinanzeigen-Daten
+            image_paths (List[str]): Liste der Pfade zu den Bildern
+            analysis_type (str, optional): Der Typ der Analyse. Standardmäßig "standard".
+            use_cache (bool, optional): False erzwingt einen neuen Modellaufruf. Standardmäßig True.
+
+        Yields:
+            Dict[str, Any]: {"type": "chunk", "text": ...} für jeden Textabschnitt, zum Schluss
+                            {"type": "done", "result": ...} mit dem Analyseergebnis wie bei analyze
         """
         try:
-            # Prompt vorbereiten
+            contents, cache_key, cached = self._prepare_analysis(data, image_paths, analysis_type, use_cache)
+            if cached:
+                yield {"type": "chunk", "text": cached['analysis']}
+                yield {"type": "done", "result": self._cached_analysis_result(data, cached)}
+                return
+
+            parts = []
+            for text in self._stream_text(contents, 'generate'):
+                parts.append(text)
+                yield {"type": "chunk", "text": text}
+
+            analysis_text = ''.join(parts) or "Keine Analyseergebnisse verfügbar."
+            yield {"type": "done", "result": self._finish_analysis(data, analysis_type, cache_key, analysis_text)}
+
+        except Exception as e:
+            logger.error(f"Fehler bei der Analyse: {str(e)}")
+            yield {"type": "done", "result": self._analysis_error(e)}
+
+    def _prepare_analysis(self, data: Dict[str, Any], image_paths: List[str], analysis_type: str,
+                          use_cache: bool) -> Tuple[List[Any], Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Bereitet Prompt und Bilder einer Analyse vor und sucht die Anfrage im Antwort-Cache.
+
+        Returns:
+            Tuple[List[Any], Optional[str], Optional[Dict[str, Any]]]: Inhalte der Anfrage,
+                Cache-Schlüssel (None ohne Cache) und gespeicherte Antwort (None ohne Treffer)
+        """
+        # Prompt vorbereiten
+        with metrics.span('gemini', 'prompt'):
             prompt = self._prepare_prompt(data, analysis_type)
 
-            # Inhalte für die Anfrage vorbereiten
-            contents = [prompt]
+        # Inhalte für die Anfrage vorbereiten
+        contents = [prompt]
+        image_hashes = []
 
-            # Bilder hinzufügen (maximal 3 Bilder, um die Anfragegröße zu begrenzen)
-            from google.genai import types
+        # Bilder hinzufügen (maximal 3 Bilder, um die Anfragegröße zu begrenzen)
+        from google.genai import types
 
+        with metrics.span('gemini', 'images'):
             for i, img_path in enumerate(image_paths[:3]):  # Begrenze auf 3 Bilder
                 try:
-                    with open(img_path, 'rb') as f:
-                        image_bytes = f.read()
+                    image_bytes, mime_type = self._load_image(img_path)
 
                     image_part = types.Part.from_bytes(
                         data=image_bytes,
-                        mime_type=self._get_mime_type(img_path)
+                        mime_type=mime_type
                     )
 
                     contents.append(image_part)
+                    image_hashes.append(hashlib.sha256(image_bytes).hexdigest())
                     logger.info(f"Bild hinzugefügt: {img_path}")
                 except Exception as e:
                     logger.error(f"Fehler beim Hinzufügen des Bildes {img_path}: {str(e)}")
 
-            # Anfrage an Gemini senden gemäß der aktuellen API-Dokumentation
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=contents
-            )
+        # Gleiche Anfrage bereits beantwortet? (z.B. erneut gescrapte oder wiedereingestellte Anzeige)
+        if not (self.response_cache and use_cache):
+            return contents, None, None
+        cache_key = response_key(self.model_name, analysis_type, prompt, image_hashes)
+        return contents, cache_key, self.response_cache.get(cache_key)
+
+    def _finish_analysis(self, data: Dict[str, Any], analysis_type: str, cache_key: Optional[str],
+                         analysis_text: str) -> Dict[str, Any]:
+        """Bereinigt den Text einer neuen Analyse, legt ihn im Antwort-Cache ab und erstellt das Ergebnis"""
+        from datetime import datetime
+
+        # Entfernen von HTML-Tags am Anfang und Ende, falls vorhanden
+        analysis_text = analysis_text.strip()
+        if analysis_text.startswith("<p>") and analysis_text.endswith("</p>"):
+            # Wenn der Text bereits HTML-formatiert ist, belassen wir ihn so
+            pass
+        else:
+            # Ansonsten formatieren wir den Text als Markdown
+            # Wir ersetzen doppelte Zeilenumbrüche durch Markdown-Absätze
+            analysis_text = analysis_text.replace("\n\n", "\n\n")
 
-            # Antwort verarbeiten
-            from datetime import datetime
+        analyzed_at = datetime.now().isoformat()
+        if cache_key:
+            self.response_cache.set(cache_key, {
+                "analysis": analysis_text,
+                "model": self.model_name,
+                "analysis_type": analysis_type,
+                "analyzed_at": analyzed_at,
+            })
+
+        logger.info(f"Analyse-Text erfolgreich extrahiert, Länge: {len(analysis_text)} Zeichen")
+        return self._analysis_result(data, analysis_text, analyzed_at, cached=False)
+
+    def _cached_analysis_result(self, data: Dict[str, Any], cached: Dict[str, Any]) -> Dict[str, Any]:
+        """Erstellt das Ergebnis aus einer Antwort des Caches"""
+        from datetime import datetime
+
+        logger.info("Analyse aus dem Antwort-Cache geladen")
+        return self._analysis_result(data, cached['analysis'], cached.get('analyzed_at') or datetime.now().isoformat(),
+                                     cached=True)
+
+    def _analysis_result(self, data: Dict[str, Any], analysis_text: str, analyzed_at: str,
+                         cached: bool) -> Dict[str, Any]:
+        """Initialisiert den Chatverlauf und erstellt das Analyseergebnis"""
+        # Chatverlauf initialisieren - wir speichern nur die Anfrage,
+        # da die Analyse bereits als erste Nachricht im Chat-Interface angezeigt wird.
+        # Lokale Variable, damit parallele Analysen mit derselben Instanz ihren eigenen Verlauf erhalten
+        chat_history = [
+            {"role": "user", "content": f"Analysiere diese Kleinanzeige: {data.get('title', 'Unbekannte Anzeige')}"}
+        ]
+        self.chat_history = chat_history
+        self.ad_facts = ad_facts(data)
+        self.analysis_text = analysis_text
+        self.chat_summary = None
+
+        result = {
+            "success": True,
+            "analysis": analysis_text,
+            "model": self.model_name,
+            "analyzed_at": analyzed_at,
+            "cached": cached,
+            "chat_history": chat_history
+        }
 
-            # Prüfen, ob die Antwort erfolgreich war
-            if hasattr(response, 'text'):
-                analysis_text = response.text
-            elif hasattr(response, 'candidates') and response.candidates:
-                analysis_text = response.candidates[0].content.parts[0].text
-            else:
-                analysis_text = "Keine Analyseergebnisse verfügbar."
+        logger.info("Analyse erfolgreich abgeschlossen")
+        return result
+
+    def _analysis_error(self, error: Exception) -> Dict[str, Any]:
+        """Erstellt das Ergebnis einer fehlgeschlagenen Analyse"""
+        from datetime import datetime
+        return {
+            "success": False,
+            "error": str(error),
+            "model": self.model_name,
+            "analyzed_at": datetime.now().isoformat(),
+        }
 
-            # Entfernen von HTML-Tags am Anfang und Ende, falls vorhanden
-            analysis_text = analysis_text.strip()
-            if analysis_text.startswith("<p>") and analysis_text.endswith("</p>"):
-                # Wenn der Text bereits HTML-formatiert ist, belassen wir ihn so
-                pass
-            else:
-                # Ansonsten formatieren wir den Text als Markdown
-                # Wir ersetzen doppelte Zeilenumbrüche durch Markdown-Absätze
-                analysis_text = analysis_text.replace("\n\n", "\n\n")
+    def _response_text(self, response: Any, fallback: str) -> Optional[str]:
+        """Extrahiert den Text einer Modellantwort"""
+        # Prüfen, ob die Antwort erfolgreich war
+        if hasattr(response, 'text'):
+            return response.text
+        elif hasattr(response, 'candidates') and response.candidates:
+            return response.candidates[0].content.parts[0].text
+        return fallback
 
-            logger.info(f"Analyse-Text erfolgreich extrahiert, Länge: {len(analysis_text)} Zeichen")
+    def _stream_text(self, contents: List[Any], phase: str) -> Iterator[str]:
+        """
+        Sendet eine Anfrage mit gestreamter Antwort und liefert die Textabschnitte.
 
-            # Chatverlauf initialisieren - wir speichern nur die Anfrage,
-            # da die Analyse bereits als erste Nachricht im Chat-Interface angezeigt wird
-            self.chat_history = [
-                {"role": "user", "content": f"Analysiere diese Kleinanzeige: {data.get('title', 'Unbekannte Anzeige')}"}
-            ]
+        Die Zeit bis zum ersten Abschnitt wird zusätzlich als Phase "<phase>_first_chunk" erfasst.
+        """
+        started = time.perf_counter()
+        first_chunk = True
+        with metrics.span('gemini', phase):
+            for response in self.client.models.generate_content_stream(
+                model=self.model_name,
+                contents=contents
+            ):
+                text = self._response_text(response, '')
+                if not text:
+                    continue
+                if first_chunk:
+                    first_chunk = False
+                    metrics.registry.observe('phase_seconds', time.perf_counter() - started,
+                                             component='gemini', phase=f'{phase}_first_chunk')
+                yield text
+
+    def _load_image(self, image_path: str) -> Tuple[bytes, str]:
+        """
+        Lädt ein Bild für die Anfrage, nach Möglichkeit als verkleinerte Variante aus dem Cache.
 
-            result = {
-                "success": True,
-                "analysis": analysis_text,
-                "model": self.model_name,
-                "analyzed_at": datetime.now().isoformat(),
-                "chat_history": self.chat_history
-            }
+        Args:
+            image_path (str): Der Pfad zum Bild
 
-            logger.info("Analyse erfolgreich abgeschlossen")
-            return result
+        Returns:
+            Tuple[bytes, str]: Die Bilddaten und ihr MIME-Typ
+        """
+        if self.image_derivatives:
+            return self.image_derivatives.load(image_path), self.image_derivatives.mime_type
 
-        except Exception as e:
-            logger.error(f"Fehler bei der Analyse: {str(e)}")
-            from datetime import datetime
-            return {
-                "success": False,
-                "error": str(e),
-                "model": self.model_name,
-                "analyzed_at": datetime.now().isoformat(),
-            }
+        with open(image_path, 'rb') as f:
+            return f.read(), self._get_mime_type(image_path)
 
     def _get_mime_type(self, file_path: str) -> str:
         """
@@ -247,89 +444,142 @@ class GeminiAnalyzer:
             Dict[str, Any]: Das Ergebnis der Folgefrage
         """
         try:
-            # Frage zum Chatverlauf hinzufügen
-            self.chat_history.append({"role": "user", "content": question})
+            contents = self._prepare_followup(question, ad_id)
 
-            # Anfrage an Gemini senden
-            # Wir fügen die Analyse als Kontext hinzu, falls sie nicht im Chatverlauf ist
-            has_analysis_in_history = any(msg.get("role") == "assistant" for msg in self.chat_history)
+            with metrics.span('gemini', 'followup'):
+                response = self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=contents
+                )
 
-            if not has_analysis_in_history:
-                # Analyse-Datei lesen, um den Analysetext zu erhalten
-                try:
-                    import os
-                    import json
-                    analysis_path = os.path.join('output', f'{ad_id}_analysis.json')
-                    if os.path.exists(analysis_path):
-                        with open(analysis_path, 'r', encoding='utf-8') as f:
-                            analysis_data = json.load(f)
-                            analysis_text = analysis_data.get('analysis', '')
-
-                            # Analyse als erste Assistenten-Nachricht hinzufügen
-                            contents = [
-                                {"role": "user", "content": f"Ich stelle dir Fragen zu einer Kleinanzeige mit der ID {ad_id}. Du hast bereits eine Analyse erstellt. Bitte beantworte meine Fragen basierend auf dieser Analyse und deinem Wissen."},
-                                {"role": "assistant", "content": analysis_text},
-                                *self.chat_history
-                            ]
-                    else:
-                        contents = [
-                            {"role": "user", "content": f"Ich stelle dir Fragen zu einer Kleinanzeige mit der ID {ad_id}. Bitte beantworte meine Fragen basierend auf den Informationen, die du bereits über diese Anzeige hast."},
-                            *self.chat_history
-                        ]
-                except Exception as e:
-                    logger.error(f"Fehler beim Laden der Analyse: {str(e)}")
-                    contents = [
-                        {"role": "user", "content": f"Ich stelle dir Fragen zu einer Kleinanzeige mit der ID {ad_id}. Bitte beantworte meine Fragen basierend auf den Informationen, die du bereits über diese Anzeige hast."},
-                        *self.chat_history
-                    ]
-            else:
-                contents = [
-                    {"role": "user", "content": f"Ich stelle dir Fragen zu einer Kleinanzeige mit der ID {ad_id}. Bitte beantworte meine Fragen basierend auf den Informationen, die du bereits über diese Anzeige hast."},
-                    *self.chat_history
-                ]
+            return self._finish_followup(question, self._response_text(response, "Keine Antwort verfügbar."))
 
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=contents
-            )
+        except Exception as e:
+            logger.error(f"Fehler bei der Beantwortung der Folgefrage: {str(e)}")
+            return self._followup_error(question, e)
 
-            # Antwort verarbeiten
-            from datetime import datetime
+    def ask_followup_stream(self, question: str, ad_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stellt eine Folgefrage wie ask_followup_question, liefert die Antwort aber abschnittsweise.
 
-            # Prüfen, ob die Antwort erfolgreich war
-            if hasattr(response, 'text'):
-                answer_text = response.text
-            elif hasattr(response, 'candidates') and response.candidates:
-                answer_text = response.candidates[0].content.parts[0].text
-            else:
-                answer_text = "Keine Antwort verfügbar."
+        Args:
+            question (str): Die Folgefrage des Benutzers
+            ad_id (str): Die ID der Anzeige, auf die sich die Frage bezieht
 
-            # Antwort zum Chatverlauf hinzufügen
-            self.chat_history.append({"role": "assistant", "content": answer_text})
+        Yields:
+            Dict[str, Any]: {"type": "chunk", "text": ...} für jeden Textabschnitt, zum Schluss
+                            {"type": "done", "result": ...} mit dem Ergebnis wie bei ask_followup_question
+        """
+        try:
+            contents = self._prepare_followup(question, ad_id)
 
-            # Ergebnis zurückgeben
-            result = {
-                "success": True,
-                "question": question,
-                "answer": answer_text,
-                "model": self.model_name,
-                "asked_at": datetime.now().isoformat(),
-                "chat_history": self.chat_history
-            }
+            parts = []
+            for text in self._stream_text(contents, 'followup'):
+                parts.append(text)
+                yield {"type": "chunk", "text": text}
 
-            logger.info(f"Folgefrage erfolgreich beantwortet, Länge der Antwort: {len(answer_text)} Zeichen")
-            return result
+            yield {"type": "done", "result": self._finish_followup(question, ''.join(parts) or "Keine Antwort verfügbar.")}
 
         except Exception as e:
             logger.error(f"Fehler bei der Beantwortung der Folgefrage: {str(e)}")
-            from datetime import datetime
-            return {
-                "success": False,
-                "question": question,
-                "error": str(e),
-                "model": self.model_name,
-                "asked_at": datetime.now().isoformat()
-            }
+            yield {"type": "done", "result": self._followup_error(question, e)}
+
+    def restore_chat(self, data: Optional[Dict[str, Any]], analysis: Optional[Dict[str, Any]],
+                     chat: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Stellt den Zustand eines Chats für Folgefragen wieder her.
+
+        Args:
+            data (Dict[str, Any], optional): Die Kleinanzeigen-Daten (für die Eckdaten)
+            analysis (Dict[str, Any], optional): Gespeichertes Analyseergebnis
+            chat (Dict[str, Any], optional): Gespeicherter Chat mit chat_history und summary
+        """
+        self.ad_facts = ad_facts(data) if data else None
+        self.analysis_text = analysis.get('analysis') if analysis and analysis.get('success') else None
+        self.chat_summary = chat.get('summary') if chat else None
+
+        # Chatverlauf laden, falls vorhanden (als Kopie, die gespeicherten Daten bleiben unverändert)
+        if chat and 'chat_history' in chat:
+            self.chat_history = list(chat['chat_history'])
+        elif analysis and 'chat_history' in analysis:
+            self.chat_history = list(analysis['chat_history'])
+
+    def _prepare_followup(self, question: str, ad_id: str) -> List[Dict[str, Any]]:
+        """
+        Fügt die Frage zum Chatverlauf hinzu und stellt die Inhalte der Anfrage innerhalb des
+        Token-Budgets zusammen (siehe ChatContext); ältere Nachrichten werden dabei ggf. zusammengefasst.
+        """
+        # Frage zum Chatverlauf hinzufügen
+        self.chat_history.append({"role": "user", "content": question})
+
+        # Gespräch: Auftrag zur Analyse, die Analyse selbst (wird im Chat-Interface als erste Antwort
+        # angezeigt, steht aber nicht im Chatverlauf) und die Folgefragen mit ihren Antworten
+        messages = list(self.chat_history)
+        if self.analysis_text:
+            messages.insert(1 if len(messages) > 1 else 0, {"role": "assistant", "content": self.analysis_text})
+            preamble = f"Ich stelle dir Fragen zu einer Kleinanzeige mit der ID {ad_id}. Du hast bereits eine Analyse erstellt. Bitte beantworte meine Fragen basierend auf dieser Analyse und deinem Wissen."
+        else:
+            preamble = f"Ich stelle dir Fragen zu einer Kleinanzeige mit der ID {ad_id}. Bitte beantworte meine Fragen basierend auf den Informationen, die du bereits über diese Anzeige hast."
+        if self.ad_facts:
+            preamble += f"\n\nEckdaten der Anzeige:\n{self.ad_facts}"
+
+        contents, self.chat_summary = self.chat_context.build(messages, preamble, self.chat_summary)
+        return contents
+
+    def _summarize_chat(self, previous: Optional[str], messages: List[Dict[str, str]]) -> str:
+        """Fasst ältere Nachrichten des Chats zusammen und ergänzt dabei die bisherige Zusammenfassung"""
+        transcript = "\n\n".join(
+            f"{'Assistent' if message.get('role') == 'assistant' else 'Nutzer'}: {message.get('content')}"
+            for message in messages
+        )
+        prompt = (
+            "Fasse den folgenden Ausschnitt eines Gesprächs über eine Kleinanzeige knapp zusammen. "
+            "Behalte Fakten, Zahlen, Einschätzungen und offene Fragen bei. "
+            f"Antworte nur mit der Zusammenfassung in höchstens {self.chat_context.summary_tokens // 2} Wörtern.\n\n"
+        )
+        if previous:
+            prompt += f"Bisherige Zusammenfassung:\n{previous}\n\n"
+        prompt += f"Neue Nachrichten:\n{transcript}"
+
+        with metrics.span('gemini', 'summarize'):
+            response = self.client.models.generate_content(
+                model=self.model_name,
+                contents=prompt
+            )
+        logger.info(f"Chatverlauf zusammengefasst ({len(messages)} Nachrichten)")
+        return (self._response_text(response, previous or '') or '').strip()
+
+    def _finish_followup(self, question: str, answer_text: str) -> Dict[str, Any]:
+        """Fügt die Antwort zum Chatverlauf hinzu und erstellt das Ergebnis der Folgefrage"""
+        from datetime import datetime
+
+        # Antwort zum Chatverlauf hinzufügen
+        self.chat_history.append({"role": "assistant", "content": answer_text})
+
+        # Ergebnis zurückgeben
+        result = {
+            "success": True,
+            "question": question,
+            "answer": answer_text,
+            "model": self.model_name,
+            "asked_at": datetime.now().isoformat(),
+            "chat_history": self.chat_history,
+            "summary": self.chat_summary
+        }
+
+        logger.info(f"Folgefrage erfolgreich beantwortet, Länge der Antwort: {len(answer_text)} Zeichen")
+        return result
+
+    def _followup_error(self, question: str, error: Exception) -> Dict[str, Any]:
+        """Erstellt das Ergebnis einer fehlgeschlagenen Folgefrage"""
+        from datetime import datetime
+        return {
+            "success": False,
+            "question": question,
+            "error": str(error),
+            "model": self.model_name,
+            "asked_at": datetime.now().isoformat()
+        }
 
 
 # Hilfsfunktion zum Speichern der Analyseergebnisse
@@ -368,9 +618,7 @@ def save_chat_history(ad_id: str, chat_result: Dict[str, Any], output_dir: str =
     Returns:
         str: Der Pfad zur gespeicherten Datei
     """
-    os.makedirs(output_dir, exist_ok=True)
-    filename = f"{ad_id}_chat.json"
-    filepath = os.path.join(output_dir, filename)
+    filepath = os.path.join(output_dir, f"{ad_id}_chat.json")
 
     # Prüfen, ob bereits ein Chat existiert
     if os.path.exists(filepath):
@@ -379,6 +627,7 @@ def save_chat_history(ad_id: str, chat_result: Dict[str, Any], output_dir: str =
 
         # Neuen Chat-Eintrag hinzufügen
         chat_data['chat_history'] = chat_result.get('chat_history', [])
+        chat_data['summary'] = chat_result.get('summary')
         chat_data['last_updated'] = chat_result.get('asked_at')
     else:
         # Neue Chat-Datei erstellen
@@ -386,10 +635,30 @@ def save_chat_history(ad_id: str, chat_result: Dict[str, Any], output_dir: str =
             'ad_id': ad_id,
             'model': chat_result.get('model'),
             'chat_history': chat_result.get('chat_history', []),
+            'summary': chat_result.get('summary'),
             'created_at': chat_result.get('asked_at'),
             'last_updated': chat_result.get('asked_at')
         }
 
+    return save_chat_data(ad_id, chat_data, output_dir)
+
+# Hilfsfunktion zum Speichern eines vollständigen Chats (ohne die vorhandene Datei zu lesen)
+def save_chat_data(ad_id: str, chat_data: Dict[str, Any], output_dir: str = "output") -> str:
+    """
+    Speichert einen Chat in der Struktur der Datei {ad_id}_chat.json.
+
+    Args:
+        ad_id (str): Die ID der Anzeige
+        chat_data (Dict[str, Any]): Der Chat mit chat_history, summary, created_at und last_updated
+        output_dir (str, optional): Das Ausgabeverzeichnis. Standardmäßig "output".
+
+    Returns:
+        str: Der Pfad zur gespeicherten Datei
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{ad_id}_chat.json"
+    filepath = os.path.join(output_dir, filename)
+
     # Datei speichern
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(chat_data, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTTP Client Module
+
+Dieses Modul stellt die Anfrageschicht des Scrapers bereit. Sie liegt über der gemeinsamen
+requests-Session und sorgt pro Host für ein Ratenlimit (Token-Bucket), wiederholt Anfragen bei
+vorübergehenden Fehlern (429, 5xx, Verbindungsfehler) mit exponentiellem Backoff und Jitter unter
+Beachtung von Retry-After und pausiert einen Host über einen Circuit Breaker, wenn er wiederholt
+mit Serverfehlern antwortet oder nicht erreichbar ist. Wiederholungen, Drosselungen und
+Wartezeiten werden gezählt.
+"""
+
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+
+# Statuscodes, bei denen eine Anfrage wiederholt wird
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Statuscodes, mit denen ein Server drosselt
+THROTTLE_STATUSES = (429, 503)
+
+
+class CircuitOpenError(Exception):
+    """Der Host ist wegen wiederholter Fehler pausiert und wird innerhalb der Wartezeit nicht wieder frei"""
+
+
+class TokenBucket:
+    """Thread-sicherer Token-Bucket; wartende Anfragen reservieren ihr Token und werden gestaffelt."""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Initialisiert den Token-Bucket.
+
+        Args:
+            rate (float): Anfragen pro Sekunde
+            capacity (float, optional): Maximal angesparte Anfragen; standardmäßig 1, d.h. die
+                                        Anfragen werden gleichmäßig verteilt statt in Schüben gesendet
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else 1.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Wartet, bis eine Anfrage erlaubt ist.
+
+        Returns:
+            float: Gewartete Sekunden
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Circuit Breaker für einen Host.
+
+    Nach failure_threshold aufeinanderfolgenden Fehlern wird der Host für reset_timeout Sekunden
+    pausiert. Danach darf genau eine Probeanfrage durch; schlägt sie fehl, verdoppelt sich die
+    Pause (höchstens max_reset_timeout), andernfalls ist der Host wieder frei. Die Probeanfrage
+    erhält von acquire() ein Token; nur ihr Ergebnis entscheidet über das Ende der Pause, nicht das
+    von Anfragen, die schon vor der Pause gestartet wurden.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, max_reset_timeout=300):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.failures = 0
+        self.open_until = None
+        self._cooldown = reset_timeout
+        self._probe = None  # Token der laufenden Probeanfrage
+        self._condition = threading.Condition()
+
+    def acquire(self, max_wait):
+        """
+        Wartet, solange der Host pausiert ist.
+
+        Args:
+            max_wait (float): Maximale Wartezeit in Sekunden
+
+        Returns:
+            tuple: (gewartete Sekunden, Token der Probeanfrage oder None); das Token wird an
+                   record_success() bzw. record_failure() übergeben
+
+        Raises:
+            CircuitOpenError: Falls der Host nicht innerhalb von max_wait wieder frei wird
+        """
+        started = time.monotonic()
+        deadline = started + max_wait
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self.open_until is None:
+                    return now - started, None
+                if now >= self.open_until and self._probe is None:
+                    # Pause abgelaufen: diese Anfrage ist die Probeanfrage
+                    self._probe = object()
+                    return now - started, self._probe
+
+                # Bis zum Ende der Pause bzw. bis zum Ergebnis der Probeanfrage warten
+                wait = self.open_until - now if now < self.open_until else deadline - now
+                if now + wait > deadline or deadline <= now:
+                    raise CircuitOpenError(f"Host pausiert nach {self.failures} Fehlern in Folge")
+                self._condition.wait(wait)
+
+    def record_success(self, probe=None):
+        """
+        Meldet eine erfolgreiche Anfrage. Während einer Pause gibt nur die Probeanfrage den Host frei.
+
+        Args:
+            probe (object, optional): Token der Probeanfrage aus acquire()
+        """
+        with self._condition:
+            if probe is not None and probe is self._probe:
+                self.open_until = None
+                self._cooldown = self.reset_timeout
+                self._probe = None
+                self._condition.notify_all()
+            if self.open_until is None:
+                self.failures = 0
+
+    def record_failure(self, probe=None):
+        """
+        Meldet eine fehlgeschlagene Anfrage.
+
+        Args:
+            probe (object, optional): Token der Probeanfrage aus acquire()
+
+        Returns:
+            bool: True, falls der Host dadurch pausiert wurde
+        """
+        with self._condition:
+            self.failures += 1
+            if probe is not None and probe is self._probe:
+                # Probeanfrage fehlgeschlagen: erneut und länger pausieren
+                self._probe = None
+                self._cooldown = min(self.max_reset_timeout, self._cooldown * 2)
+                self.open_until = time.monotonic() + self._cooldown
+                self._condition.notify_all()
+                return True
+            if self.open_until is None and self.failures >= self.failure_threshold:
+                self.open_until = time.monotonic() + self._cooldown
+                return True
+            return False
+
+
+class HttpClient:
+    """Anfrageschicht mit Ratenlimit, Wiederholungen und Circuit Breaker pro Host."""
+
+    def __init__(self, session, timeout=(5, 30), requests_per_second=0, host_limits=None,
+                 max_retries=3, backoff_base=0.5, backoff_max=30, failure_threshold=5,
+                 reset_timeout=30, max_circuit_wait=60):
+        """
+        Initialisiert die Anfrageschicht.
+
+        Args:
+            session (requests.Session): Session mit Connection-Pool
+            timeout (float|tuple): Standard-Timeout in Sekunden (Verbindung, Lesen)
+            requests_per_second (float): Ratenlimit pro Host (0 deaktiviert das Limit)
+            host_limits (dict, optional): Abweichende Ratenlimits pro Host, z.B. {"img.kleinanzeigen.de": 20}
+            max_retries (int): Maximale Anzahl an Wiederholungen pro Anfrage
+            backoff_base (float): Basis des exponentiellen Backoffs in Sekunden
+            backoff_max (float): Längste Wartezeit vor einer Wiederholung; längere Retry-After-Angaben
+                                 werden nicht abgewartet, sondern die Antwort wird zurückgegeben
+            failure_threshold (int): Fehler in Folge, nach denen ein Host pausiert wird
+            reset_timeout (float): Dauer der ersten Pause in Sekunden
+            max_circuit_wait (float): Maximale Wartezeit einer Anfrage auf einen pausierten Host
+        """
+        self.session = session
+        self.timeout = timeout
+        self.requests_per_second = requests_per_second
+        self.host_limits = dict(host_limits or {})
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_circuit_wait = max_circuit_wait
+
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.rate_limit_wait = 0.0
+        self.backoff_wait = 0.0
+        self.circuit_wait = 0.0
+        self.circuit_opened = 0
+        self.circuit_rejected = 0
+
+        self._buckets = {}  # Host -> TokenBucket (None ohne Limit)
+        self._breakers = {}  # Host -> CircuitBreaker
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        """Führt eine GET-Anfrage aus (siehe request())"""
+        return self.request('GET', url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        """
+        Führt eine Anfrage mit Ratenlimit, Wiederholungen und Circuit Breaker aus.
+
+        Antworten mit anderen als den wiederholbaren Statuscodes werden unverändert zurückgegeben.
+        Sind alle Wiederholungen erschöpft, wird die letzte Antwort zurückgegeben bzw. der letzte
+        Verbindungsfehler ausgelöst.
+
+        Args:
+            method (str): HTTP-Methode
+            url (str): URL
+            **kwargs: Weitere Argumente für requests.Session.request (headers, stream, timeout, ...)
+
+        Returns:
+            requests.Response: Antwort des Servers
+
+        Raises:
+            CircuitOpenError: Falls der Host pausiert ist und nicht rechtzeitig frei wird
+            requests.RequestException: Bei Verbindungsfehlern nach der letzten Wiederholung
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        breaker = self._breaker(host)
+        bucket = self._bucket(host)
+        attempt = 0
+
+        while True:
+            try:
+                waited, probe = breaker.acquire(self.max_circuit_wait)
+            except CircuitOpenError:
+                self._count('circuit_rejected')
+                raise
+            if waited:
+                self._count('circuit_wait', waited)
+            if bucket is not None:
+                self._count('rate_limit_wait', bucket.acquire())
+            self._count('requests')
+
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record_failure(breaker, host, probe)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"Verbindungsfehler bei {url} ({str(e)}), neuer Versuch in {delay:.1f} s")
+            except Exception:
+                # Nicht wiederholbare Fehler (z.B. zu viele Weiterleitungen) gelten ebenfalls als Fehlschlag
+                self._record_failure(breaker, host, probe)
+                raise
+            else:
+                metrics.inc('http_responses_total', host=host, status=str(response.status_code))
+                if not kwargs.get('stream'):
+                    # Gestreamte Antworten (Bilder) zählt der Aufrufer beim Lesen
+                    metrics.inc('http_downloaded_bytes_total', len(response.content), host=host)
+
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success(probe)
+                    return response
+
+                # 429 ist eine Drosselung durch einen erreichbaren Host und wird über Backoff und
+                # Retry-After behandelt; nur Serverfehler zählen für den Circuit Breaker
+                if response.status_code == 429:
+                    breaker.record_success(probe)
+                else:
+                    self._record_failure(breaker, host, probe)
+                if response.status_code in THROTTLE_STATUSES:
+                    self._count('throttled')
+
+                retry_after = self._retry_after(response)
+                if attempt >= self.max_retries or (retry_after is not None and retry_after > self.backoff_max):
+                    return response
+
+                delay = retry_after if retry_after is not None else self._backoff(attempt)
+                response.close()
+                print(f"HTTP {response.status_code} bei {url}, neuer Versuch in {delay:.1f} s")
+
+            attempt += 1
+            self._count('retries')
+            metrics.inc('http_retries_total', host=host)
+            self._count('backoff_wait', delay)
+            time.sleep(delay)
+
+    def stats(self):
+        """
+        Liefert die Zähler der Anfrageschicht.
+
+        Returns:
+            dict: Anfragen, Wiederholungen, Drosselungen (429/503), Fehler, Wartezeiten in Sekunden
+                  und Circuit-Breaker-Ereignisse
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'failures': self.failures,
+                'rate_limit_wait': round(self.rate_limit_wait, 3),
+                'backoff_wait': round(self.backoff_wait, 3),
+                'circuit_wait': round(self.circuit_wait, 3),
+                'circuit_opened': self.circuit_opened,
+                'circuit_rejected': self.circuit_rejected,
+            }
+
+    def _bucket(self, host):
+        """Token-Bucket eines Hosts oder None, falls für ihn kein Limit gilt"""
+        with self._lock:
+            if host not in self._buckets:
+                rate = self.host_limits.get(host, self.requests_per_second)
+                self._buckets[host] = TokenBucket(rate) if rate and rate > 0 else None
+            return self._buckets[host]
+
+    def _breaker(self, host):
+        """Circuit Breaker eines Hosts"""
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[host] = breaker
+            return breaker
+
+    def _record_failure(self, breaker, host, probe=None):
+        """Zählt einen Fehler und meldet ihn dem Circuit Breaker"""
+        self._count('failures')
+        if breaker.record_failure(probe):
+            self._count('circuit_opened')
+            print(f"Host {host} nach {breaker.failures} Fehlern in Folge pausiert")
+
+    def _backoff(self, attempt):
+        """Exponentieller Backoff mit vollem Jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _retry_after(self, response):
+        """Liest den Retry-After-Header (Sekunden oder HTTP-Datum) oder liefert None"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def _count(self, name, amount=1):
+        """Erhöht einen Zähler"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Image Derivatives Module
+
+Dieses Modul erzeugt verkleinerte, neu kodierte Varianten der Anzeigenbilder (für die Anfragen an
+Gemini und die Vorschaubilder der Webapp). Die Varianten werden auf der Festplatte zwischengespeichert
+und über den Hash des Originalbilds und die Einstellungen adressiert, sodass sie ohne erneute
+Umrechnung wiederverwendet werden.
+"""
+
+import os
+import io
+import hashlib
+import logging
+import threading
+from typing import Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join('output', 'image_derivatives')
+
+# Unterstützte Ausgabeformate und ihre Dateierweiterungen
+IMAGE_FORMATS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+_source_hashes = {}  # (Pfad, Größe, Änderungszeit) -> SHA-256 des Originals
+_source_hashes_lock = threading.Lock()
+
+
+def source_hash(image_path: str) -> str:
+    """
+    Liefert den SHA-256 eines Bildes; solange sich die Datei nicht ändert, wird er nur einmal berechnet.
+
+    Args:
+        image_path (str): Pfad zum Bild
+
+    Returns:
+        str: Hexadezimaler SHA-256 des Dateiinhalts
+    """
+    stat = os.stat(image_path)
+    key = (os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns)
+
+    with _source_hashes_lock:
+        digest_hex = _source_hashes.get(key)
+    if digest_hex:
+        return digest_hex
+
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    digest_hex = digest.hexdigest()
+
+    with _source_hashes_lock:
+        _source_hashes[key] = digest_hex
+    return digest_hex
+
+
+class ImageDerivativeCache:
+    """Erzeugt und speichert verkleinerte JPEG- oder WebP-Varianten von Bildern."""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, max_edge: int = 768, quality: int = 80,
+                 image_format: str = 'JPEG'):
+        """
+        Initialisiert den Cache.
+
+        Args:
+            cache_dir (str, optional): Verzeichnis für die Varianten. None deaktiviert die Ablage auf der Festplatte.
+            max_edge (int, optional): Maximale Kantenlänge in Pixeln. Standardmäßig 768.
+            quality (int, optional): Qualität der Varianten (1-95). Standardmäßig 80.
+            image_format (str, optional): Ausgabeformat ("JPEG" oder "WEBP"). Standardmäßig "JPEG".
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Nicht unterstütztes Bildformat: {image_format} (erlaubt: {', '.join(IMAGE_FORMATS)})")
+
+        self.cache_dir = cache_dir
+        self.max_edge = max(1, max_edge)
+        self.quality = max(1, min(95, quality))
+        self.image_format = image_format
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def mime_type(self) -> str:
+        """MIME-Typ der erzeugten Varianten"""
+        return f"image/{self.image_format.lower()}"
+
+    def load(self, image_path: str) -> bytes:
+        """
+        Liefert die Variante eines Bildes.
+
+        Wäre die Variante größer als ein Original im selben Format, wird stattdessen das Original verwendet.
+
+        Args:
+            image_path (str): Pfad zum Originalbild
+
+        Returns:
+            bytes: Bilddaten im Ausgabeformat
+        """
+        derivative_path = self.derivative_path(image_path) if self.cache_dir else None
+        if derivative_path and os.path.exists(derivative_path):
+            with self._lock:
+                self.hits += 1
+            with open(derivative_path, 'rb') as f:
+                return f.read()
+
+        with self._lock:
+            self.misses += 1
+
+        with open(image_path, 'rb') as f:
+            original = f.read()
+
+        derivative, source_format = self._render(original)
+        if source_format == self.image_format and len(derivative) >= len(original):
+            # Kleine Originale nicht durch eine größere Neukodierung ersetzen
+            derivative = original
+
+        if derivative_path:
+            self._write(derivative_path, derivative)
+
+        logger.info(f"Bildvariante erzeugt: {image_path} ({len(original) // 1024} KB -> {len(derivative) // 1024} KB)")
+        return derivative
+
+    def ensure(self, image_path: str) -> str:
+        """
+        Erzeugt die Variante eines Bildes bei Bedarf und liefert ihren Pfad.
+
+        Args:
+            image_path (str): Pfad zum Originalbild
+
+        Returns:
+            str: Pfad der Variante im Cache-Verzeichnis
+        """
+        derivative_path = self.derivative_path(image_path)
+        if os.path.exists(derivative_path):
+            with self._lock:
+                self.hits += 1
+        else:
+            self.load(image_path)
+        return derivative_path
+
+    def derivative_path(self, image_path: str) -> str:
+        """
+        Pfad der Variante, adressiert über den Hash des Originals und die Einstellungen.
+
+        Args:
+            image_path (str): Pfad zum Originalbild
+
+        Returns:
+            str: Pfad der Variante im Cache-Verzeichnis
+        """
+        extension = IMAGE_FORMATS[self.image_format]
+        return os.path.join(self.cache_dir, f"{source_hash(image_path)}_{self.max_edge}_q{self.quality}{extension}")
+
+    def _render(self, original: bytes) -> Tuple[bytes, str]:
+        """Verkleinert ein Bild auf die maximale Kantenlänge, kodiert es neu und liefert auch das Quellformat"""
+        with Image.open(io.BytesIO(original)) as img:
+            source_format = img.format
+            img.draft('RGB', (self.max_edge, self.max_edge))
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+
+            buffer = io.BytesIO()
+            if self.image_format == 'WEBP':
+                img.save(buffer, format='WEBP', quality=self.quality, method=4)
+            else:
+                img.save(buffer, format='JPEG', quality=self.quality, optimize=True)
+            return buffer.getvalue(), source_format
+
+    def _write(self, derivative_path: str, data: bytes) -> None:
+        """Schreibt eine Variante atomar auf die Festplatte"""
+        tmp_path = f"{derivative_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, derivative_path)
+        except OSError as e:
+            logger.error(f"Fehler beim Speichern der Bildvariante {derivative_path}: {str(e)}")
+
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Image Store Module
+
+Dieses Modul stellt einen inhaltsadressierten Bildspeicher bereit. Jedes Bild wird genau einmal
+unter dem SHA-256 seines Inhalts abgelegt; die Dateien pro Anzeige ({ad_id}_{n}.jpg) sind
+Verweise (Hardlinks) auf diese Blobs. Zu jeder Bild-URL werden ETag und Last-Modified gespeichert,
+damit erneute Abrufe als bedingte Anfragen gestellt werden können.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+from io import BytesIO
+from PIL import Image
+
+# Höchstens so viele Bytes vom Anfang eines Bildes werden gepuffert, um Breite und Höhe zu lesen
+PROBE_LIMIT = 256 * 1024
+
+
+class ImageStore:
+    """Inhaltsadressierter Bildspeicher mit URL-Index für bedingte Anfragen."""
+
+    def __init__(self, images_dir):
+        """
+        Initialisiert den Bildspeicher.
+
+        Args:
+            images_dir (str): Verzeichnis der Anzeigenbilder; Blobs und Index liegen unter images_dir/store
+        """
+        self.images_dir = images_dir
+        self.blobs_dir = os.path.join(images_dir, "store", "blobs")
+        self.urls_dir = os.path.join(images_dir, "store", "urls")
+        self.downloads = 0
+        self.not_modified = 0
+        self.deduplicated = 0
+
+        self._entries = {}  # URL -> Indexeintrag
+        self._lock = threading.Lock()
+
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.urls_dir, exist_ok=True)
+
+    def lookup(self, url):
+        """
+        Liefert den Indexeintrag einer Bild-URL, sofern der zugehörige Blob noch existiert.
+
+        Args:
+            url (str): URL des Bildes
+
+        Returns:
+            dict: Eintrag mit sha256, extension, etag, last_modified, width, height und size_bytes oder None
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+
+        if entry is None:
+            entry = self._read_entry(url)
+            if entry is None:
+                return None
+            with self._lock:
+                self._entries[url] = entry
+
+        if not os.path.exists(self._blob_path(entry['sha256'], entry['extension'])):
+            return None
+        return dict(entry)
+
+    def conditional_headers(self, entry):
+        """
+        Erzeugt die Header für eine bedingte Anfrage.
+
+        Args:
+            entry (dict): Indexeintrag aus lookup()
+
+        Returns:
+            dict: If-None-Match und/oder If-Modified-Since
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put_stream(self, url, chunks, extension, etag=None, last_modified=None):
+        """
+        Schreibt ein Bild blockweise in den Speicher und aktualisiert den Index der URL.
+
+        Das Bild wird nie vollständig im Speicher gehalten: Die Blöcke werden direkt in eine
+        temporäre Datei geschrieben und dabei gehasht; Breite und Höhe werden aus den ersten
+        Bytes gelesen. Ist ein Blob mit gleichem Inhalt bereits vorhanden, wird die temporäre
+        Datei verworfen.
+
+        Args:
+            url (str): URL des Bildes
+            chunks (iterable): Blöcke der Bilddaten (bytes)
+            extension (str): Dateierweiterung inklusive Punkt
+            etag (str, optional): ETag-Header der Antwort
+            last_modified (str, optional): Last-Modified-Header der Antwort
+
+        Returns:
+            dict: Der neue Indexeintrag
+        """
+        digest = hashlib.sha256()
+        size_bytes = 0
+        head = bytearray()
+        probing = True
+        dimensions = None
+        tmp_path = os.path.join(self.blobs_dir, f"{threading.get_ident()}.tmp")
+
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size_bytes += len(chunk)
+
+                    # Bildgröße aus dem Dateikopf lesen, sobald genug Bytes vorliegen
+                    if probing:
+                        head += chunk
+                        dimensions = self._probe_dimensions(head)
+                        if dimensions is not None or len(head) >= PROBE_LIMIT:
+                            probing = False
+                            head = bytearray()
+
+            if dimensions is None:
+                # Kopf größer als PROBE_LIMIT: Bildgröße aus der Datei lesen (nur der Kopf wird gelesen)
+                with Image.open(tmp_path) as img:
+                    dimensions = img.size
+
+            sha256 = digest.hexdigest()
+            blob_path = self._blob_path(sha256, extension)
+            if os.path.exists(blob_path):
+                os.remove(tmp_path)
+                with self._lock:
+                    self.deduplicated += 1
+            else:
+                os.replace(tmp_path, blob_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        entry = {
+            'url': url,
+            'sha256': sha256,
+            'extension': extension,
+            'etag': etag,
+            'last_modified': last_modified,
+            'width': dimensions[0],
+            'height': dimensions[1],
+            'size_bytes': size_bytes
+        }
+        with self._lock:
+            self._entries[url] = entry
+            self.downloads += 1
+        self._write_atomic(self._entry_path(url), json.dumps(entry, ensure_ascii=False, indent=2), 'w')
+        return dict(entry)
+
+    def mark_not_modified(self):
+        """Zählt eine mit HTTP 304 beantwortete Anfrage"""
+        with self._lock:
+            self.not_modified += 1
+
+    def link(self, entry, filename):
+        """
+        Verweist eine Datei im Bildverzeichnis auf den Blob eines Eintrags.
+
+        Args:
+            entry (dict): Indexeintrag
+            filename (str): Dateiname im Bildverzeichnis (z.B. "123_1.jpg")
+
+        Returns:
+            str: Pfad der verknüpften Datei
+        """
+        blob_path = self._blob_path(entry['sha256'], entry['extension'])
+        filepath = os.path.join(self.images_dir, filename)
+
+        if os.path.exists(filepath) and os.path.samefile(filepath, blob_path):
+            return filepath
+
+        tmp_path = f"{filepath}.{threading.get_ident()}.tmp"
+        try:
+            os.link(blob_path, tmp_path)
+        except OSError:
+            # Dateisysteme ohne Hardlinks: Blob kopieren
+            shutil.copyfile(blob_path, tmp_path)
+        os.replace(tmp_path, filepath)
+        return filepath
+
+    def _probe_dimensions(self, head):
+        """Liest Breite und Höhe aus dem Anfang eines Bildes oder liefert None, falls er noch nicht reicht"""
+        try:
+            with Image.open(BytesIO(head)) as img:
+                return img.size
+        except Exception:
+            return None
+
+    def _blob_path(self, sha256, extension):
+        """Pfad eines Blobs"""
+        return os.path.join(self.blobs_dir, f"{sha256}{extension}")
+
+    def _entry_path(self, url):
+        """Pfad des Indexeintrags einer URL"""
+        return os.path.join(self.urls_dir, f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json")
+
+    def _read_entry(self, url):
+        """Liest den Indexeintrag einer URL von der Festplatte"""
+        filepath = self._entry_path(url)
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry if entry.get('url') == url else None
+        except (OSError, ValueError) as e:
+            print(f"Fehler beim Lesen des Bildindex {filepath}: {str(e)}")
+            return None
+
+    def _write_atomic(self, filepath, data, mode):
+        """Schreibt eine Datei atomar"""
+        tmp_path = f"{filepath}.{threading.get_ident()}.tmp"
+        encoding = 'utf-8' if 'b' not in mode else None
+        with open(tmp_path, mode, encoding=encoding) as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Jobs Module
+
+Dieses Modul stellt einen einfachen Hintergrund-Job-Manager mit begrenztem Worker-Pool bereit,
+damit lang laufende Aufgaben (z.B. das Scrapen oder Analysieren einer Anzeige) die Webanfragen
+nicht blockieren. Jobs mit gleichem Schlüssel werden dabei nur einmal gleichzeitig ausgeführt.
+Jobs können ihre Ausgabe fortlaufend bereitstellen (JobOutput), sodass mehrere Anfragen den
+Text eines laufenden Jobs von Anfang an mitlesen können.
+"""
+
+import uuid
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Statuswerte eines Jobs
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobOutput:
+    """Fortlaufende Textausgabe eines Jobs, die beliebig viele Leser von Anfang an mitlesen können."""
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def write(self, text: str) -> None:
+        """Hängt einen Textabschnitt an und weckt wartende Leser"""
+        with self._condition:
+            self._chunks.append(text)
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """Beendet die Ausgabe (der Job ist abgeschlossen)"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def follow(self) -> Iterator[str]:
+        """
+        Liefert alle bisherigen und künftigen Textabschnitte, bis die Ausgabe beendet ist.
+
+        Yields:
+            str: Textabschnitt
+        """
+        position = 0
+        while True:
+            with self._condition:
+                while position >= len(self._chunks) and not self._closed:
+                    self._condition.wait()
+                chunks = self._chunks[position:]
+                closed = self._closed
+            for text in chunks:
+                yield text
+            position += len(chunks)
+            if closed and not chunks:
+                return
+
+
+class Job:
+    """Ein Hintergrund-Job mit Status und Ergebnis."""
+
+    def __init__(self, kind: str, meta: Optional[Dict[str, Any]] = None, key: Optional[str] = None,
+                 stream: bool = False):
+        """
+        Initialisiert den Job.
+
+        Args:
+            kind (str): Art des Jobs (z.B. "scrape")
+            meta (Dict[str, Any], optional): Zusätzliche Angaben zum Job (z.B. die URL)
+            key (str, optional): Schlüssel zur Deduplizierung gleichartiger Jobs
+            stream (bool, optional): Der Job stellt seine Ausgabe fortlaufend bereit (output)
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.meta = meta or {}
+        self.output: Optional[JobOutput] = JobOutput() if stream else None
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        """Gibt an, ob der Job abgeschlossen ist (erfolgreich oder fehlgeschlagen)"""
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Liefert den Status des Jobs als Dictionary (ohne Ergebnis).
+
+        Returns:
+            Dict[str, Any]: Statusinformationen
+        """
+        status = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        status.update(self.meta)
+        if self.error:
+            status['error'] = self.error
+        return status
+
+
+class JobManager:
+    """Führt Jobs in einem begrenzten Worker-Pool aus und merkt sich ihren Status."""
+
+    def __init__(self, max_workers: int = 4, max_jobs: int = 1000):
+        """
+        Initialisiert den Job-Manager.
+
+        Args:
+            max_workers (int, optional): Anzahl gleichzeitig laufender Jobs. Standardmäßig 4.
+            max_jobs (int, optional): Maximale Anzahl gespeicherter Jobs; abgeschlossene Jobs werden
+                                      darüber hinaus in Reihenfolge ihres Alters verworfen. Standardmäßig 1000.
+        """
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._active = {}  # Schlüssel -> laufender oder wartender Job
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[..., Any], *args: Any,
+               meta: Optional[Dict[str, Any]] = None, key: Optional[str] = None, stream: bool = False,
+               **kwargs: Any) -> Job:
+        """
+        Reiht eine Funktion als Job ein.
+
+        Ist bereits ein unvollendeter Job mit demselben Schlüssel vorhanden, wird kein neuer Job
+        angelegt, sondern der vorhandene zurückgegeben.
+
+        Args:
+            kind (str): Art des Jobs
+            func (Callable[..., Any]): Auszuführende Funktion
+            meta (Dict[str, Any], optional): Zusätzliche Angaben zum Job
+            key (str, optional): Schlüssel zur Deduplizierung (z.B. "analysis:<ad_id>")
+            stream (bool, optional): Der Job erhält eine fortlaufende Ausgabe (job.output), die der
+                                     Funktion als Argument output übergeben wird
+            *args, **kwargs: Argumente für die Funktion
+
+        Returns:
+            Job: Der eingereihte oder bereits laufende Job
+        """
+        with self._lock:
+            if key is not None and key in self._active:
+                job = self._active[key]
+                logger.info(f"Job {job.id} ({kind}) läuft bereits für {key}, Anfrage wird angehängt")
+                return job
+
+            job = Job(kind, meta, key, stream)
+            if job.output is not None:
+                kwargs['output'] = job.output
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active[key] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        logger.info(f"Job {job.id} ({kind}) eingereiht")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Liefert einen Job anhand seiner ID.
+
+        Args:
+            job_id (str): ID des Jobs
+
+        Returns:
+            Optional[Job]: Der Job oder None, falls er nicht (mehr) bekannt ist
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find_active(self, key: str) -> Optional[Job]:
+        """
+        Liefert den unvollendeten Job zu einem Schlüssel.
+
+        Args:
+            key (str): Schlüssel des Jobs
+
+        Returns:
+            Optional[Job]: Der wartende oder laufende Job oder None
+        """
+        with self._lock:
+            return self._active.get(key)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Beendet den Worker-Pool"""
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> None:
+        """Führt einen Job aus und speichert Ergebnis bzw. Fehler"""
+        job.status = RUNNING
+        job.started_at = datetime.now().isoformat()
+
+        try:
+            job.result = func(*args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) fehlgeschlagen: {str(e)}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            if job.key is not None:
+                with self._lock:
+                    if self._active.get(job.key) is job:
+                        del self._active[job.key]
+            # Erst nach Status und Ergebnis beenden, damit Leser das Ergebnis vorfinden
+            if job.output is not None:
+                job.output.close()
+
+    def _prune(self) -> None:
+        """Verwirft die ältesten abgeschlossenen Jobs, wenn zu viele gespeichert sind"""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:excess]:
+            del self._jobs[job_id]
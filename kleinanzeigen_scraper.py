@@ -15,36 +15,304 @@ inklusive Bilder, und speichert diese strukturiert ab.
 
 import os
 import re
+import html
 import json
+import difflib
+import hashlib
+import time
 import argparse
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import redirect_stdout
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+from collections import defaultdict
+from urllib.parse import urljoin, urlsplit
 from datetime import datetime
-from PIL import Image
-from io import BytesIO
+from seller_cache import SellerProfileCache
+from image_store import ImageStore
+from http_client import HttpClient
+import metrics
+from ad_store import AdStore, DEFAULT_DB_PATH
+
+# lxml ist optional; ohne lxml wird der in Python implementierte html.parser verwendet
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+HTML_PARSERS = ('lxml', 'html.parser')
+DEFAULT_HTML_PARSER = 'lxml' if LXML_AVAILABLE else 'html.parser'
+
+# Muster für die Suche im rohen HTML (JSON-LD-Modus), damit kein Dokumentbaum nötig ist
+JSON_LD_PATTERN = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I)
+RAW_PRICE_PATTERN = re.compile(r'<h2[^>]*id="viewad-price"[^>]*>(.*?)</h2>', re.S)
+RAW_LOCALITY_PATTERN = re.compile(r'<span[^>]*id="viewad-locality"[^>]*>(.*?)</span>', re.S)
+RAW_TAG_PATTERN = re.compile(r'<[^>]+>')
+# JSON-LD verweist auf die JPG-Variante der Bilder, die Galerie auf AUTO (gleiche Bilder, gleiche URL wie ohne JSON-LD)
+JSON_LD_IMAGE_RULE_PATTERN = re.compile(r'(rule=\$_\d+)\.(?:JPE?G|PNG|WEBP)$', re.I)
+
+# Blockgröße beim Herunterladen von Bildern
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+# Seitenbereiche der Anzeigenseite, die für die Extraktion relevant sind
+# (Galerie, Titel/Preis/Standort, Details, Beschreibung, Verkäuferbox)
+AD_PAGE_REGIONS = ('viewad-product', 'viewad-main-info', 'viewad-details', 'viewad-description', 'viewad-sidebar')
+
+# Alle Selektoren, die die _extract_*-Methoden auf der Anzeigenseite verwenden
+AD_PAGE_SELECTORS = (
+    'h1.boxedarticle--title',
+    'h2.boxedarticle--price',
+    'p#viewad-description-text',
+    'div.addetailslist',
+    'span#viewad-locality',
+    '.userprofile-vip',
+    '.userprofile-vip-details-text',
+    '.userprofile-vip-badges',
+    '.userbadges--badge',
+    '#poster-other-ads-link',
+    'a[href*="/s-bestandsliste.html?userId="]',
+    'div.galleryimage-element img',
+)
+
+
+class ExtractionPlan:
+    """
+    Kompilierter Extraktionsplan für die Anzeigenseite.
+
+    Der Plan parst nur die relevanten Seitenbereiche und ermittelt die Treffer aller Selektoren
+    in einem einzigen Durchlauf über den Dokumentbaum. Jeder Selektor wird dazu anhand seines
+    letzten ID-, Klassen- oder Tag-Bestandteils einem Schlüssel zugeordnet, sodass pro Element nur
+    die passenden Selektoren geprüft werden.
+    """
+
+    def __init__(self, selectors, regions):
+        """
+        Initialisiert den Plan.
+
+        Args:
+            selectors (iterable): CSS-Selektoren, deren Treffer gesammelt werden
+            regions (iterable): IDs der Seitenbereiche, die geparst werden
+        """
+        self.selectors = tuple(selectors)
+        self.strainer = SoupStrainer(id=list(regions))
+        self._dispatch = defaultdict(list)
+
+        for selector in self.selectors:
+            self._dispatch[self._dispatch_key(selector)].append((selector, soupsieve.compile(selector)))
+
+    def _dispatch_key(self, selector):
+        """Ermittelt den Schlüssel (id, class oder tag) des letzten Selektor-Bestandteils"""
+        compound = re.sub(r'\[.*?\]', '', selector.split()[-1])
+
+        id_match = re.search(r'#([\w-]+)', compound)
+        if id_match:
+            return ('id', id_match.group(1))
+
+        class_match = re.search(r'\.([\w-]+)', compound)
+        if class_match:
+            return ('class', class_match.group(1))
+
+        return ('tag', compound or '*')
+
+    def parse(self, html_text, html_parser):
+        """
+        Parst die relevanten Seitenbereiche.
+
+        Enthält die Seite keinen der Bereiche (z.B. nach einer Layoutänderung), wird das
+        vollständige Dokument geparst.
+
+        Returns:
+            BeautifulSoup: Geparste Seitenbereiche
+        """
+        soup = BeautifulSoup(html_text, html_parser, parse_only=self.strainer)
+        if soup.find(True) is None:
+            soup = BeautifulSoup(html_text, html_parser)
+        return soup
+
+    def run(self, soup):
+        """
+        Sammelt die Treffer aller Selektoren in einem Durchlauf.
+
+        Returns:
+            PlannedPage: Seite mit vorberechneten Treffern
+        """
+        matches = {selector: [] for selector in self.selectors}
+        dispatch = self._dispatch
+
+        for tag in soup.find_all(True):
+            candidates = list(dispatch.get(('tag', tag.name), ()))
+            tag_id = tag.get('id')
+            if tag_id:
+                candidates.extend(dispatch.get(('id', tag_id), ()))
+            for class_name in tag.get('class', ()):
+                candidates.extend(dispatch.get(('class', class_name), ()))
+
+            for selector, compiled in candidates:
+                if compiled.match(tag):
+                    matches[selector].append(tag)
+
+        return PlannedPage(soup, matches)
+
+
+class PlannedPage:
+    """
+    Ergebnis eines Extraktionsplans.
+
+    Bietet select/select_one wie BeautifulSoup, beantwortet die Selektoren des Plans aber aus den
+    vorberechneten Treffern. Andere Selektoren werden an das geparste Dokument weitergereicht.
+    """
+
+    def __init__(self, soup, matches):
+        self.soup = soup
+        self._matches = matches
+
+    def select_one(self, selector):
+        if selector in self._matches:
+            found = self._matches[selector]
+            return found[0] if found else None
+        return self.soup.select_one(selector)
+
+    def select(self, selector):
+        if selector in self._matches:
+            return list(self._matches[selector])
+        return self.soup.select(selector)
+
+
+AD_PAGE_PLAN = ExtractionPlan(AD_PAGE_SELECTORS, AD_PAGE_REGIONS)
+
+# Felder, die der JSON-LD-Modus ohne Dokumentbaum liest
+JSON_LD_FIELDS = ('title', 'price', 'description', 'location', 'image_urls')
+
+# Liefert JSON-LD alle diese Felder, werden nur noch Details und Verkäuferbox geparst
+AD_PAGE_REST_PLAN = ExtractionPlan(
+    [selector for selector in AD_PAGE_SELECTORS
+     if selector not in ('h1.boxedarticle--title', 'h2.boxedarticle--price', 'p#viewad-description-text',
+                         'span#viewad-locality', 'div.galleryimage-element img')],
+    ('viewad-details', 'viewad-sidebar')
+)
+
+
+class AdNotFoundError(Exception):
+    """Die Anzeige existiert nicht (mehr) (HTTP 404 oder 410)"""
+
 
 class KleinanzeigenScraper:
     """Scraper für Kleinanzeigen.de"""
 
-    def __init__(self, output_dir="output"):
+    def __init__(self, output_dir="output", image_workers=4, pool_size=10, timeout=(5, 30),
+                 seller_cache_ttl=86400, seller_cache_size=1024, seller_cache_on_disk=True,
+                 html_parser=None, use_json_ld=False, use_extraction_plan=True,
+                 base_url="https://www.kleinanzeigen.de", ad_store=None, incremental=False,
+                 rate_limit=0, max_retries=3):
         """
         Initialisiert den Scraper.
 
         Args:
             output_dir (str): Verzeichnis für die Ausgabe der Daten
+            image_workers (int): Anzahl paralleler Bild-Downloads
+            pool_size (int): Maximale Anzahl offener Verbindungen pro Host
+            timeout (float|tuple): Timeout für HTTP-Anfragen in Sekunden (Verbindung, Lesen)
+            seller_cache_ttl (float): Gültigkeitsdauer zwischengespeicherter Verkäuferprofile in Sekunden (0 deaktiviert den Cache)
+            seller_cache_size (int): Maximale Anzahl der Verkäuferprofile im Speicher
+            seller_cache_on_disk (bool): Verkäuferprofile zusätzlich unter output/seller_profiles ablegen
+            html_parser (str, optional): HTML-Parser ('lxml' oder 'html.parser'), standardmäßig der schnellste verfügbare
+            use_json_ld (bool): Titel, Beschreibung, Bilder, Preis und Standort zuerst aus JSON-LD bzw. dem rohen HTML lesen
+            use_extraction_plan (bool): Nur die relevanten Seitenbereiche parsen und alle Selektoren in einem Durchlauf auswerten
+            base_url (str): Basis-URL für relative Links (Verkäuferprofil, Bilder)
+            ad_store (AdStore, optional): Datenbank, in der gescrapte Anzeigen zusätzlich zur JSON-Datei abgelegt werden
+            incremental (bool): Bereits bekannte Anzeigen ohne inhaltliche Änderung nicht erneut verarbeiten
+                                (keine Bilder, kein Verkäuferprofil, keine neue JSON-Datei)
+            rate_limit (float): Maximale Anfragen pro Sekunde und Host (0 = unbegrenzt)
+            max_retries (int): Wiederholungen bei HTTP 429/5xx und Verbindungsfehlern
         """
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7',
         }
         self.output_dir = output_dir
+        self.base_url = base_url
         self.images_dir = os.path.join(output_dir, "images")
+        self.image_workers = max(1, image_workers)
+        self.timeout = timeout
+        self.html_parser = self._resolve_html_parser(html_parser)
+        self.use_json_ld = use_json_ld
+        self.use_extraction_plan = use_extraction_plan
+        self.ad_store = ad_store
+        self.incremental = incremental
+
+        # Gemeinsame Session mit Connection-Pool, damit Anzeige, Verkäuferprofil und Bilder
+        # bestehende Keep-Alive-Verbindungen wiederverwenden
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        pool_maxsize = max(pool_size, self.image_workers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Alle Abrufe (Anzeige, Ergebnisseiten, Verkäuferprofil, Bilder) laufen über die Anfrageschicht
+        # mit Ratenlimit, Wiederholungen und Circuit Breaker pro Host
+        self.http = HttpClient(self.session, timeout=self.timeout, requests_per_second=rate_limit,
+                               max_retries=max_retries)
+
+        # Cache für Verkäuferprofile, damit wiederkehrende Verkäufer ohne HTTP-Anfrage auskommen
+        self.seller_cache = None
+        if seller_cache_ttl > 0:
+            self.seller_cache = SellerProfileCache(
+                ttl=seller_cache_ttl,
+                max_entries=seller_cache_size,
+                cache_dir=os.path.join(output_dir, "seller_profiles") if seller_cache_on_disk else None
+            )
 
         # Erstelle Ausgabeverzeichnisse, falls sie nicht existieren
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.images_dir, exist_ok=True)
 
+        # Inhaltsadressierter Bildspeicher: gleiche Bilder werden nur einmal abgelegt und
+        # bei erneutem Scrapen per bedingter Anfrage (ETag/Last-Modified) übersprungen
+        self.image_store = ImageStore(self.images_dir)
+
+    def _resolve_html_parser(self, html_parser):
+        """Prüft den gewünschten HTML-Parser und fällt bei Bedarf auf html.parser zurück"""
+        if html_parser is None:
+            return DEFAULT_HTML_PARSER
+
+        if html_parser not in HTML_PARSERS:
+            raise ValueError(f"Unbekannter HTML-Parser: {html_parser} (erlaubt: {', '.join(HTML_PARSERS)})")
+
+        if html_parser == 'lxml' and not LXML_AVAILABLE:
+            print("lxml ist nicht installiert, verwende html.parser")
+            return 'html.parser'
+
+        return html_parser
+
+    def _parse_html(self, html):
+        """
+        Parst HTML mit dem konfigurierten Parser.
+
+        Alle _extract_*-Methoden arbeiten auf dem zurückgegebenen BeautifulSoup-Objekt und sind
+        dadurch unabhängig vom verwendeten Parser.
+
+        Args:
+            html (str): HTML-Quelltext
+
+        Returns:
+            BeautifulSoup: Geparstes Dokument
+        """
+        return BeautifulSoup(html, self.html_parser)
+
+    def close(self):
+        """Schließt die HTTP-Session und alle offenen Verbindungen"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def scrape(self, url):
         """
         Scrapt eine Kleinanzeigen-Anzeige.
@@ -52,9 +320,23 @@ class KleinanzeigenScraper:
         Args:
             url (str): URL der Kleinanzeigen-Anzeige
 
+        Liegt die Anzeige bereits gespeichert vor, wird ihre Historie übernommen und um Preis- und
+        Beschreibungsänderungen ergänzt. Im inkrementellen Modus wird außerdem der Fingerabdruck
+        der Anzeigenseite mit dem der gespeicherten Daten verglichen; ist er unverändert, werden
+        Bilder und Verkäuferprofil übersprungen, nur last_checked_at aktualisiert und die
+        gespeicherten Daten zurückgegeben.
+
+        Die Gesamtdauer und die einzelnen Phasen (Abruf, Parsen, Verkäuferprofil, Bilder,
+        Speichern) werden als Zeitspannen in metrics erfasst.
+
         Returns:
             dict: Extrahierte Daten der Anzeige
         """
+        with metrics.span('scraper', 'scrape'):
+            return self._scrape(url)
+
+    def _scrape(self, url):
+        """Führt scrape() aus und misst dabei die einzelnen Phasen"""
         print(f"Scrape Anzeige: {url}")
 
         # Anzeigen-ID aus URL extrahieren
@@ -63,35 +345,293 @@ class KleinanzeigenScraper:
             raise ValueError(f"Konnte keine Anzeigen-ID aus der URL extrahieren: {url}")
 
         # Seite abrufen
-        response = requests.get(url, headers=self.headers)
-        if response.status_code != 200:
-            raise Exception(f"Fehler beim Abrufen der Seite: HTTP {response.status_code}")
-
-        # Erzwinge UTF-8-Kodierung
-        response.encoding = 'utf-8'
+        with metrics.span('scraper', 'fetch'):
+            response = self.http.get(url)
+            if response.status_code in (404, 410):
+                raise AdNotFoundError(f"Anzeige nicht gefunden: HTTP {response.status_code}")
+            if response.status_code != 200:
+                raise Exception(f"Fehler beim Abrufen der Seite: HTTP {response.status_code}")
 
-        # HTML parsen
-        soup = BeautifulSoup(response.text, 'html.parser')
+            # Erzwinge UTF-8-Kodierung
+            response.encoding = 'utf-8'
+            html_text = response.text
+
+        # HTML parsen und Felder der Anzeigenseite extrahieren
+        with metrics.span('scraper', 'parse'):
+            soup, fields = self._extract_fields(html_text)
+            fingerprint = self._fingerprint(fields)
+
+        # Zuletzt gespeicherte Daten laden (Historie); im inkrementellen Modus werden unveränderte
+        # Anzeigen nicht erneut verarbeitet
+        with metrics.span('scraper', 'load_previous'):
+            previous = self._load_previous(ad_id)
+        if self.incremental and previous and previous.get('fingerprint') == fingerprint:
+            previous['last_checked_at'] = datetime.now().isoformat()
+            with metrics.span('scraper', 'save'):
+                self._save_data(previous, ad_id, checked_only=True)
+            print(f"Anzeige unverändert: {ad_id}")
+            return previous
+
+        # Verkäufer (inklusive Profilseite) und Bilder
+        scraped_at = datetime.now().isoformat()
+        with metrics.span('scraper', 'seller'):
+            seller = self._extract_seller_info(soup)
+        with metrics.span('scraper', 'images'):
+            images = self._save_images(fields['image_urls'], ad_id)
 
         # Daten extrahieren
         data = {
             "id": ad_id,
             "url": url,
-            "scraped_at": datetime.now().isoformat(),
-            "title": self._extract_title(soup),
-            "price": self._extract_price(soup),
-            "description": self._extract_description(soup),
-            "details": self._extract_details(soup),
-            "location": self._extract_location(soup),
-            "seller": self._extract_seller_info(soup),
-            "images": self._extract_and_save_images(soup, ad_id)
+            "scraped_at": scraped_at,
+            "title": fields['title'],
+            "price": fields['price'],
+            "description": fields['description'],
+            "details": fields['details'],
+            "location": fields['location'],
+            "seller": seller,
+            "images": images,
+            "fingerprint": fingerprint
         }
 
+        if previous:
+            history = list(previous.get('history', []))
+            change = self._describe_change(previous, data)
+            if change:
+                history.append(change)
+            if history:
+                data['history'] = history
+
         # Daten speichern
-        self._save_data(data, ad_id)
+        with metrics.span('scraper', 'save'):
+            self._save_data(data, ad_id)
 
         return data
 
+    def crawl_listing(self, search_url, max_pages=50):
+        """
+        Liefert die Anzeigen-URLs einer Such- oder Kategorieseite über alle Ergebnisseiten.
+
+        Die Ergebnisseiten werden erst abgerufen, wenn die URLs der vorherigen Seite verbraucht
+        sind. Jede Anzeige wird nur einmal geliefert, auch wenn sie (z.B. als Top-Anzeige) auf
+        mehreren Seiten erscheint.
+
+        Args:
+            search_url (str): URL der Such- oder Kategorieseite
+            max_pages (int): Maximale Anzahl abgerufener Ergebnisseiten
+
+        Yields:
+            str: Absolute URL einer Anzeige
+        """
+        seen_ads = set()
+        seen_pages = set()
+        page_url = search_url
+
+        while page_url and page_url not in seen_pages and len(seen_pages) < max_pages:
+            seen_pages.add(page_url)
+            print(f"Lade Ergebnisseite {len(seen_pages)}: {page_url}")
+
+            with metrics.span('scraper', 'listing'):
+                response = self.http.get(page_url)
+                if response.status_code != 200:
+                    raise Exception(f"Fehler beim Abrufen der Ergebnisseite: HTTP {response.status_code}")
+                response.encoding = 'utf-8'
+
+                ad_urls, page_url = self._parse_listing_page(response.text, page_url)
+            for ad_url in ad_urls:
+                ad_id = self._extract_ad_id(ad_url)
+                if ad_id and ad_id not in seen_ads:
+                    seen_ads.add(ad_id)
+                    yield ad_url
+
+    def _parse_listing_page(self, html_text, page_url):
+        """
+        Extrahiert die Anzeigen-URLs und die URL der nächsten Ergebnisseite.
+
+        Returns:
+            tuple: (Liste der Anzeigen-URLs, URL der nächsten Seite oder None)
+        """
+        soup = self._parse_html(html_text)
+
+        ad_urls = []
+        for item in soup.select('article.aditem'):
+            href = item.get('data-href')
+            if not href:
+                link = item.select_one('a[href*="/s-anzeige/"]')
+                href = link.get('href') if link else None
+            if href:
+                ad_urls.append(urljoin(page_url, href))
+
+        next_link = soup.select_one('a.pagination-next[href], link[rel="next"][href]')
+        next_url = urljoin(page_url, next_link['href']) if next_link else None
+
+        return ad_urls, next_url
+
+    def has_stored_ad(self, ad_id):
+        """Gibt an, ob eine Anzeige bereits gespeichert ist (Datenbank oder JSON-Datei)"""
+        if self.ad_store:
+            return self.ad_store.has_ad(ad_id)
+        return os.path.exists(os.path.join(self.output_dir, f"{ad_id}.json"))
+
+    def _fingerprint(self, fields):
+        """Fingerabdruck der inhaltlichen Felder einer Anzeigenseite (SHA-256 über kanonisches JSON)"""
+        content = {
+            'title': fields['title'],
+            'price': fields['price'],
+            'description': fields['description'],
+            'details': fields['details'],
+            'location': fields['location'],
+            'image_urls': [url for _, url in fields['image_urls']]
+        }
+        canonical = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _load_previous(self, ad_id):
+        """Lädt die zuletzt gespeicherten Daten einer Anzeige (Datenbank oder JSON-Datei)"""
+        if self.ad_store:
+            return self.ad_store.get_ad(ad_id)
+
+        filepath = os.path.join(self.output_dir, f"{ad_id}.json")
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Fehler beim Lesen von {filepath}: {str(e)}")
+            return None
+
+    def _describe_change(self, previous, data):
+        """
+        Beschreibt Preis- und Beschreibungsänderungen gegenüber den zuletzt gespeicherten Daten.
+
+        Beschreibungen werden als zeilenweiser Diff ohne Kontext abgelegt, damit die Historie kompakt bleibt.
+
+        Returns:
+            dict: Änderungseintrag oder None, falls sich Preis und Beschreibung nicht geändert haben
+        """
+        change = {}
+
+        if previous.get('price') != data['price']:
+            change['price'] = {'old': previous.get('price'), 'new': data['price']}
+
+        old_description = previous.get('description') or ''
+        new_description = data['description'] or ''
+        if old_description != new_description:
+            diff = difflib.unified_diff(old_description.splitlines(), new_description.splitlines(), n=0, lineterm='')
+            change['description'] = [line for line in diff if not line.startswith(('---', '+++'))]
+
+        if not change:
+            return None
+
+        change['changed_at'] = data['scraped_at']
+        change['previous_scraped_at'] = previous.get('scraped_at')
+        return change
+
+    def _extract_fields(self, html_text):
+        """
+        Extrahiert die Felder der Anzeigenseite (ohne Verkäuferinformationen).
+
+        Im JSON-LD-Modus werden die Felder zuerst aus dem rohen HTML gelesen; nur fehlende
+        Felder werden anschließend über die Selektoren ermittelt. Liefert JSON-LD alle Felder aus
+        JSON_LD_FIELDS, werden nur Details und Verkäuferbox geparst. Mit Extraktionsplan werden nur
+        die relevanten Seitenbereiche geparst und alle Selektoren in einem Durchlauf ausgewertet.
+
+        Args:
+            html_text (str): HTML der Anzeigenseite
+
+        Returns:
+            tuple: (Seite für die Selektoren, dict mit title, price, description, details, location, image_urls)
+        """
+        fields = self._extract_json_ld(html_text) if self.use_json_ld else {}
+
+        if all(fields.get(field) for field in JSON_LD_FIELDS):
+            soup = AD_PAGE_REST_PLAN.run(AD_PAGE_REST_PLAN.parse(html_text, self.html_parser))
+        elif self.use_extraction_plan:
+            soup = AD_PAGE_PLAN.run(AD_PAGE_PLAN.parse(html_text, self.html_parser))
+        else:
+            soup = self._parse_html(html_text)
+
+        extractors = {
+            'title': self._extract_title,
+            'price': self._extract_price,
+            'description': self._extract_description,
+            'details': self._extract_details,
+            'location': self._extract_location,
+            'image_urls': self._extract_image_urls,
+        }
+        for field, extractor in extractors.items():
+            if not fields.get(field):
+                fields[field] = extractor(soup)
+
+        return soup, fields
+
+    def _extract_json_ld(self, html_text):
+        """
+        Extrahiert Felder aus den JSON-LD-Blöcken und dem rohen HTML, ohne einen Dokumentbaum aufzubauen.
+
+        Die Anzeigenseite enthält pro Bild einen ImageObject-Block mit Titel und Beschreibung der Anzeige.
+        Der Block mit representativeOfPage gehört zur Anzeige selbst, die direkt folgenden Blöcke mit
+        gleichem Titel und gleicher Beschreibung liefern die weiteren Bilder. Spätere Blöcke gehören zu
+        ähnlichen Anzeigen. Preis und Standort sind nicht im JSON-LD enthalten und werden direkt aus
+        den entsprechenden Elementen im HTML gelesen.
+
+        Args:
+            html_text (str): HTML der Anzeigenseite
+
+        Returns:
+            dict: Gefundene Felder (fehlende Felder sind nicht enthalten)
+        """
+        fields = {}
+
+        ad_block = None
+        image_urls = []
+        for match in JSON_LD_PATTERN.finditer(html_text):
+            try:
+                block = json.loads(match.group(1))
+            except ValueError:
+                continue
+
+            if not isinstance(block, dict) or block.get('@type') != 'ImageObject':
+                if ad_block:
+                    break
+                continue
+
+            if ad_block is None:
+                if block.get('representativeOfPage'):
+                    ad_block = block
+                else:
+                    continue
+            elif (block.get('title'), block.get('description')) != (ad_block.get('title'), ad_block.get('description')):
+                break
+
+            if block.get('contentUrl'):
+                image_urls.append(JSON_LD_IMAGE_RULE_PATTERN.sub(r'\1.AUTO', block['contentUrl']))
+
+        if ad_block:
+            if ad_block.get('title'):
+                fields['title'] = ad_block['title'].strip()
+            if ad_block.get('description'):
+                # Zeilenumbrüche entfernen, damit der Text dem der Beschreibung im HTML entspricht
+                fields['description'] = ad_block['description'].replace('\r', '').replace('\n', '').strip()
+            if image_urls:
+                fields['image_urls'] = list(enumerate(image_urls))
+
+        price_match = RAW_PRICE_PATTERN.search(html_text)
+        if price_match:
+            fields['price'] = self._parse_price(self._raw_text(price_match.group(1)))
+
+        locality_match = RAW_LOCALITY_PATTERN.search(html_text)
+        if locality_match:
+            fields['location'] = self._parse_location(self._raw_text(locality_match.group(1)))
+
+        return fields
+
+    def _raw_text(self, fragment):
+        """Entfernt Tags und HTML-Entities aus einem HTML-Fragment"""
+        return html.unescape(RAW_TAG_PATTERN.sub('', fragment)).strip()
+
     def _extract_ad_id(self, url):
         """Extrahiert die Anzeigen-ID aus der URL"""
         match = re.search(r'/(\d+)-', url)
@@ -108,8 +648,10 @@ class KleinanzeigenScraper:
         if not price_elem:
             return None
 
-        price_text = price_elem.text.strip()
-        # Preis bereinigen (z.B. "80 € VB" -> "80")
+        return self._parse_price(price_elem.text.strip())
+
+    def _parse_price(self, price_text):
+        """Bereinigt den Preistext (z.B. "80 € VB" -> "80")"""
         price_match = re.search(r'(\d+(?:\.\d+)?)', price_text.replace(',', '.'))
         return price_match.group(1) if price_match else price_text
 
@@ -156,18 +698,21 @@ class KleinanzeigenScraper:
 
     def _extract_location(self, soup):
         """Extrahiert den Standort der Anzeige"""
-        location = {}
-
         location_elem = soup.select_one('span#viewad-locality')
-        if location_elem:
-            location['address'] = location_elem.text.strip()
+        if not location_elem:
+            return {}
+
+        return self._parse_location(location_elem.text.strip())
+
+    def _parse_location(self, address):
+        """Zerlegt die Adresse in PLZ und Ort"""
+        location = {'address': address}
 
         # Versuche, PLZ und Ort zu extrahieren
-        if 'address' in location:
-            match = re.search(r'(\d{5})\s+(.+)', location['address'])
-            if match:
-                location['zip_code'] = match.group(1)
-                location['city'] = match.group(2)
+        match = re.search(r'(\d{5})\s+(.+)', address)
+        if match:
+            location['zip_code'] = match.group(1)
+            location['city'] = match.group(2)
 
         return location
 
@@ -234,12 +779,11 @@ class KleinanzeigenScraper:
                 seller['user_id'] = user_id
 
                 # Vollständige URL zum Profil erstellen
-                full_profile_url = urljoin('https://www.kleinanzeigen.de', profile_url)
+                full_profile_url = urljoin(self.base_url, profile_url)
                 seller['profile_url'] = full_profile_url
 
-                # Profilseite des Verkäufers scrapen
-                print(f"Scrape Verkäuferprofil: {full_profile_url}")
-                seller_profile_data = self._scrape_seller_profile(full_profile_url)
+                # Profil des Verkäufers aus dem Cache laden oder die Profilseite scrapen
+                seller_profile_data = self._get_seller_profile(user_id, full_profile_url)
 
                 # Profilinformationen zum Verkäufer hinzufügen
                 if seller_profile_data:
@@ -247,6 +791,27 @@ class KleinanzeigenScraper:
 
         return seller
 
+    def _get_seller_profile(self, user_id, profile_url):
+        """
+        Liefert das Verkäuferprofil aus dem Cache oder scrapt die Profilseite.
+
+        Args:
+            user_id (str): ID des Verkäufers
+            profile_url (str): URL der Profilseite
+
+        Returns:
+            dict: Extrahierte Profilinformationen
+        """
+        def load():
+            print(f"Scrape Verkäuferprofil: {profile_url}")
+            with metrics.span('scraper', 'seller_profile'):
+                return self._scrape_seller_profile(profile_url)
+
+        if not self.seller_cache:
+            return load()
+
+        return self.seller_cache.get_or_load(user_id, load)
+
     def _scrape_seller_profile(self, profile_url):
         """
         Scrapt die Profilseite eines Verkäufers.
@@ -259,7 +824,7 @@ class KleinanzeigenScraper:
         """
         try:
             # Profilseite abrufen
-            response = requests.get(profile_url, headers=self.headers)
+            response = self.http.get(profile_url)
             if response.status_code != 200:
                 print(f"Fehler beim Abrufen der Profilseite: HTTP {response.status_code}")
                 return {}
@@ -268,7 +833,7 @@ class KleinanzeigenScraper:
             response.encoding = 'utf-8'
 
             # HTML parsen
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = self._parse_html(response.text)
 
             # Profilinformationen extrahieren
             profile_data = {
@@ -381,7 +946,16 @@ class KleinanzeigenScraper:
 
     def _extract_and_save_images(self, soup, ad_id):
         """Extrahiert und speichert Bilder der Anzeige"""
-        images_info = []
+        return self._save_images(self._extract_image_urls(soup), ad_id)
+
+    def _extract_image_urls(self, soup):
+        """
+        Extrahiert die Bild-URLs der Galerie.
+
+        Returns:
+            list: Tupel (Index in der Galerie, URL); der Index bestimmt den Dateinamen
+        """
+        image_jobs = []
 
         # Bildergalerie finden
         gallery_items = soup.select('div.galleryimage-element img')
@@ -394,44 +968,86 @@ class KleinanzeigenScraper:
 
             # Relative URLs in absolute URLs umwandeln
             if not img_url.startswith(('http://', 'https://')):
-                img_url = urljoin('https://www.kleinanzeigen.de', img_url)
+                img_url = urljoin(self.base_url, img_url)
 
-            try:
-                # Bild herunterladen
-                img_response = requests.get(img_url, headers=self.headers)
-                if img_response.status_code != 200:
-                    print(f"Fehler beim Herunterladen des Bildes {img_url}: HTTP {img_response.status_code}")
-                    continue
+            image_jobs.append((i, img_url))
 
-                # Dateiname generieren
-                file_ext = self._get_image_extension(img_response.headers.get('Content-Type', ''))
-                filename = f"{ad_id}_{i+1}{file_ext}"
-                filepath = os.path.join(self.images_dir, filename)
+        return image_jobs
 
-                # Bild speichern
-                with open(filepath, 'wb') as f:
-                    f.write(img_response.content)
+    def _save_images(self, image_jobs, ad_id):
+        """
+        Lädt die Bilder einer Anzeige parallel herunter und speichert sie.
 
-                # Bildgröße ermitteln
-                img_data = BytesIO(img_response.content)
-                with Image.open(img_data) as img_obj:
-                    width, height = img_obj.size
+        Args:
+            image_jobs (list): Tupel (Index in der Galerie, URL)
+            ad_id (str): ID der Anzeige
 
-                # Bildinformationen speichern
-                images_info.append({
-                    'filename': filename,
-                    'original_url': img_url,
-                    'width': width,
-                    'height': height,
-                    'size_bytes': len(img_response.content)
-                })
+        Returns:
+            list: Bildinformationen in der Reihenfolge der Galerie
+        """
+        if not image_jobs:
+            return []
 
-                print(f"Bild gespeichert: {filename}")
+        # Bilder parallel herunterladen; map() liefert die Ergebnisse in der Reihenfolge der Galerie
+        workers = min(self.image_workers, len(image_jobs))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda job: self._download_image(ad_id, *job), image_jobs)
+            return [image_info for image_info in results if image_info]
 
-            except Exception as e:
-                print(f"Fehler beim Verarbeiten des Bildes {img_url}: {str(e)}")
+    def _download_image(self, ad_id, index, img_url):
+        """
+        Lädt ein einzelnes Bild herunter und speichert es.
 
-        return images_info
+        Bereits bekannte Bilder werden bedingt angefragt; bei HTTP 304 wird nur die Datei
+        der Anzeige auf den vorhandenen Blob im Bildspeicher verwiesen.
+
+        Args:
+            ad_id (str): ID der Anzeige
+            index (int): Position des Bildes in der Galerie
+            img_url (str): URL des Bildes
+
+        Returns:
+            dict: Bildinformationen oder None bei einem Fehler
+        """
+        try:
+            # Bild herunterladen, bei bekannter URL nur falls es sich geändert hat
+            entry = self.image_store.lookup(img_url)
+            headers = self.image_store.conditional_headers(entry) if entry else None
+            with self.http.get(img_url, headers=headers, stream=True) as img_response:
+                if img_response.status_code == 304 and entry:
+                    self.image_store.mark_not_modified()
+                    filename = f"{ad_id}_{index+1}{entry['extension']}"
+                    self.image_store.link(entry, filename)
+                    print(f"Bild unverändert: {filename}")
+                elif img_response.status_code == 200:
+                    # Bild blockweise in den Bildspeicher schreiben (Bildgröße wird dabei aus dem
+                    # Dateikopf gelesen) und Datei der Anzeige darauf verweisen
+                    file_ext = self._get_image_extension(img_response.headers.get('Content-Type', ''))
+                    entry = self.image_store.put_stream(
+                        img_url, img_response.iter_content(chunk_size=IMAGE_CHUNK_SIZE), file_ext,
+                        etag=img_response.headers.get('ETag'),
+                        last_modified=img_response.headers.get('Last-Modified')
+                    )
+                    metrics.inc('http_downloaded_bytes_total', entry['size_bytes'], host=urlsplit(img_url).netloc)
+                    filename = f"{ad_id}_{index+1}{file_ext}"
+                    self.image_store.link(entry, filename)
+                    print(f"Bild gespeichert: {filename}")
+                else:
+                    print(f"Fehler beim Herunterladen des Bildes {img_url}: HTTP {img_response.status_code}")
+                    return None
+
+            # Bildinformationen zurückgeben
+            return {
+                'filename': filename,
+                'original_url': img_url,
+                'width': entry['width'],
+                'height': entry['height'],
+                'size_bytes': entry['size_bytes']
+            }
+
+        except Exception as e:
+            print(f"Fehler beim Verarbeiten des Bildes {img_url}: {str(e)}")
+            return None
 
     def _get_image_extension(self, content_type):
         """Ermittelt die Dateierweiterung basierend auf dem Content-Type"""
@@ -446,8 +1062,15 @@ class KleinanzeigenScraper:
         else:
             return '.jpg'  # Standardwert
 
-    def _save_data(self, data, ad_id):
-        """Speichert die extrahierten Daten als JSON"""
+    def _save_data(self, data, ad_id, checked_only=False):
+        """
+        Speichert die extrahierten Daten als JSON (und in der Datenbank, falls vorhanden).
+
+        Args:
+            data (dict): Daten der Anzeige
+            ad_id (str): ID der Anzeige
+            checked_only (bool): Unveränderte Anzeige, in der Datenbank nur last_checked_at aktualisieren
+        """
         filename = f"{ad_id}.json"
         filepath = os.path.join(self.output_dir, filename)
 
@@ -465,20 +1088,224 @@ class KleinanzeigenScraper:
 
         print(f"Daten gespeichert: {filepath}")
 
+        if self.ad_store and checked_only:
+            self.ad_store.touch_ad(ad_id, data['last_checked_at'])
+        elif self.ad_store:
+            self.ad_store.save_ad(data)
+
+
+def read_urls(source):
+    """
+    Liest URLs zeilenweise aus einer Datei oder von stdin.
+
+    Leere Zeilen und Kommentarzeilen (beginnend mit '#') werden übersprungen.
+
+    Args:
+        source (str): Pfad zur Datei oder '-' für stdin
+
+    Yields:
+        str: URL einer Anzeige
+    """
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        for line in stream:
+            url = line.strip()
+            if url and not url.startswith('#'):
+                yield url
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def scrape_batch(scraper, urls, workers=4):
+    """
+    Scrapt mehrere Anzeigen parallel mit begrenzter Anzahl gleichzeitiger Aufträge.
+
+    Die URLs werden erst bei Bedarf aus dem Iterator gelesen, sodass auch sehr lange
+    Listen (z.B. von stdin) nicht vollständig im Speicher gehalten werden. Bricht der Iterator
+    mit einem Fehler ab, werden keine weiteren Aufträge gestartet; laufende Aufträge werden
+    noch abgeschlossen und geliefert.
+
+    Args:
+        scraper (KleinanzeigenScraper): Zu verwendender Scraper
+        urls (iterable): URLs der Anzeigen
+        workers (int): Anzahl parallel gescrapter Anzeigen
+
+    Yields:
+        tuple: (url, data, error) in der Reihenfolge der Fertigstellung
+    """
+    workers = max(1, workers)
+    url_iter = iter(urls)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        exhausted = False
+
+        def submit_next():
+            nonlocal exhausted
+            if exhausted:
+                return False
+            try:
+                url = next(url_iter, None)
+            except Exception as e:
+                print(f"Fehler beim Lesen der URLs, keine weiteren Anzeigen: {str(e)}")
+                url = None
+            if url is None:
+                exhausted = True
+                return False
+            pending[executor.submit(scraper.scrape, url)] = url
+            return True
+
+        # Höchstens doppelt so viele Aufträge wie Worker vorhalten
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                try:
+                    yield url, future.result(), None
+                except Exception as e:
+                    yield url, None, e
+                submit_next()
+
+
+def crawl_urls(scraper, search_url, max_pages=50, skip_known=True):
+    """
+    Liefert die Anzeigen-URLs einer Suche, optional ohne bereits gespeicherte Anzeigen.
+
+    Kann eine Ergebnisseite nicht geladen werden, wird der Fehler gemeldet und die Suche beendet;
+    die bis dahin gefundenen Anzeigen werden trotzdem gescrapt.
+
+    Args:
+        scraper (KleinanzeigenScraper): Zu verwendender Scraper
+        search_url (str): URL der Such- oder Kategorieseite
+        max_pages (int): Maximale Anzahl abgerufener Ergebnisseiten
+        skip_known (bool): Bereits gespeicherte Anzeigen überspringen
+
+    Yields:
+        str: URL einer Anzeige
+    """
+    try:
+        for url in scraper.crawl_listing(search_url, max_pages):
+            if skip_known and scraper.has_stored_ad(scraper._extract_ad_id(url)):
+                print(f"Anzeige bereits gespeichert, übersprungen: {url}")
+                continue
+            yield url
+    except Exception as e:
+        print(f"Fehler beim Laden der Ergebnisseiten, Suche beendet: {str(e)}")
+
+
+def _run_batch(scraper, args):
+    """Führt den Batch- bzw. Crawl-Modus aus und schreibt jedes Ergebnis als JSONL-Zeile"""
+    if args.crawl:
+        # Im inkrementellen Modus werden auch bekannte Anzeigen geprüft
+        skip_known = not (args.include_known or args.incremental)
+        urls = crawl_urls(scraper, args.crawl, args.max_pages, skip_known=skip_known)
+    else:
+        urls = read_urls(args.batch)
+
+    out = sys.stdout if args.jsonl == '-' else open(args.jsonl, 'a', encoding='utf-8')
+    succeeded = 0
+    failed = 0
+    started = time.perf_counter()
+
+    try:
+        # Fortschrittsmeldungen nach stderr umleiten, damit stdout reines JSONL bleibt
+        with redirect_stdout(sys.stderr):
+            for url, data, error in scrape_batch(scraper, urls, args.workers):
+                if error is None:
+                    record = data
+                    succeeded += 1
+                else:
+                    record = {'url': url, 'error': str(error)}
+                    failed += 1
+                    print(f"Fehler beim Scrapen von {url}: {str(error)}")
+
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    # Zusammenfassung
+    elapsed = time.perf_counter() - started
+    total = succeeded + failed
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(f"Batch abgeschlossen: {total} Anzeigen in {elapsed:.1f} s ({rate:.2f} Anzeigen/s), "
+          f"{succeeded} erfolgreich, {failed} fehlgeschlagen", file=sys.stderr)
+    stats = scraper.http.stats()
+    print(f"HTTP: {stats['requests']} Anfragen, {stats['retries']} Wiederholungen, {stats['throttled']} gedrosselt "
+          f"(429/503), {stats['circuit_opened']} Host-Pausen, Wartezeit {stats['rate_limit_wait']:.1f} s Ratenlimit "
+          f"/ {stats['backoff_wait']:.1f} s Backoff", file=sys.stderr)
+
 
 def main():
     """Hauptfunktion"""
     parser = argparse.ArgumentParser(description='Kleinanzeigen Scraper')
-    parser.add_argument('url', help='URL der Kleinanzeigen-Anzeige')
+    parser.add_argument('url', nargs='?', help='URL der Kleinanzeigen-Anzeige')
     parser.add_argument('--output', '-o', default='output', help='Ausgabeverzeichnis')
+    parser.add_argument('--image-workers', type=int, default=4, help='Anzahl paralleler Bild-Downloads')
+    parser.add_argument('--pool-size', type=int, default=10, help='Maximale Anzahl offener Verbindungen pro Host')
+    parser.add_argument('--timeout', type=float, default=30, help='Timeout für HTTP-Anfragen in Sekunden')
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help='Maximale Anfragen pro Sekunde und Host (0 = unbegrenzt)')
+    parser.add_argument('--max-retries', type=int, default=3,
+                        help='Wiederholungen bei HTTP 429/5xx und Verbindungsfehlern (mit Backoff und Retry-After)')
+    parser.add_argument('--seller-cache-ttl', type=float, default=86400,
+                        help='Gültigkeitsdauer zwischengespeicherter Verkäuferprofile in Sekunden (0 deaktiviert den Cache)')
+    parser.add_argument('--html-parser', choices=HTML_PARSERS, default=None,
+                        help=f'HTML-Parser (Standard: {DEFAULT_HTML_PARSER})')
+    parser.add_argument('--json-ld', action='store_true',
+                        help='Titel, Beschreibung, Bilder, Preis und Standort zuerst aus JSON-LD lesen')
+    parser.add_argument('--batch', '-b', metavar='DATEI',
+                        help="Datei mit einer URL pro Zeile ('-' für stdin) für den Batch-Modus")
+    parser.add_argument('--crawl', '-c', metavar='SUCH_URL',
+                        help='Alle Anzeigen einer Such- oder Kategorieseite (über alle Ergebnisseiten) scrapen')
+    parser.add_argument('--max-pages', type=int, default=50,
+                        help='Maximale Anzahl der Ergebnisseiten im Crawl-Modus')
+    parser.add_argument('--include-known', action='store_true',
+                        help='Im Crawl-Modus auch bereits gespeicherte Anzeigen erneut scrapen')
+    parser.add_argument('--workers', '-w', type=int, default=4,
+                        help='Anzahl parallel gescrapter Anzeigen im Batch- und Crawl-Modus')
+    parser.add_argument('--db', metavar='DATEI', default=None,
+                        help=f'Anzeigen zusätzlich in einer SQLite-Datenbank ablegen (z.B. {DEFAULT_DB_PATH})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Unveränderte Anzeigen überspringen und Preis-/Beschreibungsänderungen protokollieren')
+    parser.add_argument('--profile', action='store_true',
+                        help='Am Ende die Dauer der einzelnen Phasen und die HTTP-Zähler ausgeben (stderr)')
+    parser.add_argument('--jsonl', metavar='DATEI', default='-',
+                        help="Ziel der JSONL-Ausgabe im Batch-Modus ('-' für stdout)")
     args = parser.parse_args()
 
-    scraper = KleinanzeigenScraper(output_dir=args.output)
-    try:
-        scraper.scrape(args.url)
-        print(f"Scraping erfolgreich abgeschlossen. Daten wurden in '{args.output}' gespeichert.")
-    except Exception as e:
-        print(f"Fehler beim Scrapen: {str(e)}")
+    if not args.url and not args.batch and not args.crawl:
+        parser.error('Bitte eine URL, --batch oder --crawl angeben.')
+
+    # Im Batch- und Crawl-Modus teilen sich alle Worker den Connection-Pool
+    pool_size = args.pool_size
+    if args.batch or args.crawl:
+        pool_size = max(pool_size, args.workers * args.image_workers)
+
+    with KleinanzeigenScraper(output_dir=args.output, image_workers=args.image_workers,
+                              pool_size=pool_size, timeout=args.timeout,
+                              seller_cache_ttl=args.seller_cache_ttl,
+                              html_parser=args.html_parser, use_json_ld=args.json_ld,
+                              ad_store=AdStore(args.db) if args.db else None,
+                              incremental=args.incremental, rate_limit=args.rate_limit,
+                              max_retries=args.max_retries) as scraper:
+        if args.batch or args.crawl:
+            _run_batch(scraper, args)
+        else:
+            try:
+                scraper.scrape(args.url)
+                print(f"Scraping erfolgreich abgeschlossen. Daten wurden in '{args.output}' gespeichert.")
+            except Exception as e:
+                print(f"Fehler beim Scrapen: {str(e)}")
+
+    if args.profile:
+        print(metrics.registry.format_profile(), file=sys.stderr)
 
 
 if __name__ == "__main__":
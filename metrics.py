@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Metrics Module
+
+Dieses Modul sammelt Laufzeitkennzahlen des Scrapers und der Gemini-Analyse: Dauer der einzelnen
+Phasen (als Histogramm über span()) sowie Zähler, z.B. für HTTP-Statuscodes und heruntergeladene
+Bytes. Die Kennzahlen lassen sich im Prometheus-Textformat (Endpunkt /metrics der Webapp) oder als
+Übersicht pro Phase (Option --profile des Scrapers) ausgeben.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+PREFIX = 'kleinanzeigen_'
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Beschreibung der bekannten Kennzahlen (Name ohne Präfix -> (Typ, Hilfetext))
+METRICS = {
+    'phase_seconds': ('histogram', 'Dauer der Phasen von Scraper und Analyse in Sekunden'),
+    'phase_errors_total': ('counter', 'Phasen, die mit einer Ausnahme abgebrochen wurden'),
+    'http_responses_total': ('counter', 'HTTP-Antworten nach Host und Statuscode'),
+    'http_downloaded_bytes_total': ('counter', 'Heruntergeladene Bytes nach Host'),
+    'http_retries_total': ('counter', 'Wiederholte HTTP-Anfragen nach Host'),
+    'response_cache_requests_total': ('counter', 'Abfragen des Antwort-Caches der Analyse nach Ergebnis und Ebene'),
+    'chat_sessions_total': ('counter', 'Abfragen der aktiven Chats der Webapp (hit: im Speicher, load: geladen)'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histogramm mit festen Buckets, Summe, Anzahl und Maximum."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Erfasst einen Messwert"""
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+
+class MetricsRegistry:
+    """Thread-sichere Sammlung von Zählern und Histogrammen."""
+
+    def __init__(self):
+        self._counters = {}  # (Name, Labels) -> Wert
+        self._histograms = {}  # (Name, Labels) -> Histogram
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """
+        Erhöht einen Zähler.
+
+        Args:
+            name (str): Name der Kennzahl ohne Präfix (z.B. "http_responses_total")
+            amount (float, optional): Betrag. Standardmäßig 1.
+            **labels: Labels der Zeitreihe (z.B. host="www.kleinanzeigen.de", status="200")
+        """
+        key = (name, self._labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Erfasst einen Messwert in einem Histogramm.
+
+        Args:
+            name (str): Name der Kennzahl ohne Präfix
+            value (float): Messwert
+            **labels: Labels der Zeitreihe
+        """
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, component: str, phase: str) -> Iterator[None]:
+        """
+        Misst die Dauer einer Phase als phase_seconds{component, phase}.
+
+        Bricht die Phase mit einer Ausnahme ab, wird zusätzlich phase_errors_total erhöht; die
+        Dauer wird trotzdem erfasst.
+
+        Args:
+            component (str): Komponente (z.B. "scraper" oder "gemini")
+            phase (str): Phase (z.B. "fetch", "parse", "images")
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc('phase_errors_total', component=component, phase=phase)
+            raise
+        finally:
+            self.observe('phase_seconds', time.perf_counter() - started, component=component, phase=phase)
+
+    def reset(self) -> None:
+        """Verwirft alle Kennzahlen"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """
+        Liefert alle Kennzahlen im Prometheus-Textformat (Version 0.0.4).
+
+        Returns:
+            str: Text für den Endpunkt /metrics
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            histograms = [(key, (h.buckets, list(h.counts), h.sum, h.count)) for key, h in histograms]
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                described.add(name)
+                metric_type, help_text = METRICS.get(name, ('untyped', name))
+                lines.append(f"# HELP {PREFIX}{name} {help_text}")
+                lines.append(f"# TYPE {PREFIX}{name} {metric_type}")
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{PREFIX}{name}{self._format_labels(labels)} {self._format_value(value)}")
+
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (('le', self._format_value(bound)),)
+                lines.append(f"{PREFIX}{name}_bucket{self._format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{self._format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{PREFIX}{name}_sum{self._format_labels(labels)} {self._format_value(total)}")
+            lines.append(f"{PREFIX}{name}_count{self._format_labels(labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def phase_summary(self) -> List[Dict[str, object]]:
+        """
+        Liefert eine Übersicht der gemessenen Phasen, sortiert nach Gesamtdauer.
+
+        Returns:
+            List[Dict[str, object]]: component, phase, count, total, mean, max und errors pro Phase
+        """
+        with self._lock:
+            rows = []
+            for (name, labels), histogram in self._histograms.items():
+                if name != 'phase_seconds':
+                    continue
+                label_dict = dict(labels)
+                errors = self._counters.get(('phase_errors_total', labels), 0)
+                rows.append({
+                    'component': label_dict.get('component', ''),
+                    'phase': label_dict.get('phase', ''),
+                    'count': histogram.count,
+                    'total': histogram.sum,
+                    'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                    'max': histogram.max,
+                    'errors': int(errors),
+                })
+        return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+    def counter_values(self, name: str) -> Dict[Labels, float]:
+        """Liefert alle Zeitreihen eines Zählers (Labels -> Wert)"""
+        with self._lock:
+            return {labels: value for (counter_name, labels), value in self._counters.items() if counter_name == name}
+
+    def format_profile(self) -> str:
+        """
+        Formatiert die Phasenübersicht und die HTTP-Zähler als Tabelle für die Kommandozeile.
+
+        Returns:
+            str: Mehrzeiliger Text
+        """
+        lines = [f"{'Komponente':<10} {'Phase':<16} {'Anzahl':>7} {'gesamt s':>9} {'Ø ms':>8} {'max ms':>8} {'Fehler':>6}"]
+        for row in self.phase_summary():
+            lines.append(f"{row['component']:<10} {row['phase']:<16} {row['count']:>7} {row['total']:>9.2f} "
+                         f"{row['mean'] * 1000:>8.1f} {row['max'] * 1000:>8.1f} {row['errors']:>6}")
+
+        statuses = {}
+        for labels, value in self.counter_values('http_responses_total').items():
+            status = dict(labels).get('status', '?')
+            statuses[status] = statuses.get(status, 0) + value
+        if statuses:
+            lines.append("HTTP-Status: " + ", ".join(f"{status}: {int(count)}" for status, count in sorted(statuses.items())))
+
+        downloaded = sum(self.counter_values('http_downloaded_bytes_total').values())
+        if downloaded:
+            lines.append(f"Heruntergeladen: {downloaded / 2**20:.1f} MB")
+        return '\n'.join(lines)
+
+    def _labels(self, labels: Dict[str, str]) -> Labels:
+        """Normalisiert Labels zu einem sortierten Tupel"""
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def _format_labels(self, labels: Labels) -> str:
+        """Formatiert Labels im Prometheus-Format ({key="value",...})"""
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{self._escape(value)}"' for key, value in labels) + '}'
+
+    def _escape(self, value: str) -> str:
+        """Maskiert Backslash, Anführungszeichen und Zeilenumbruch in Label-Werten"""
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def _format_value(self, value: float) -> str:
+        """Formatiert einen Wert (ganze Zahlen ohne Nachkommastellen)"""
+        return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# Gemeinsame Sammlung des Prozesses
+registry = MetricsRegistry()
+
+
+def inc(name: str, amount: float = 1, **labels: str) -> None:
+    """Erhöht einen Zähler der gemeinsamen Sammlung (siehe MetricsRegistry.inc)"""
+    registry.inc(name, amount, **labels)
+
+
+def span(component: str, phase: str):
+    """Misst eine Phase in der gemeinsamen Sammlung (siehe MetricsRegistry.span)"""
+    return registry.span(component, phase)
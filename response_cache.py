@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Response Cache Module
+
+Dieses Modul speichert Antworten der Gemini-Analyse, adressiert über den Inhalt der Anfrage (Modell,
+Analysetyp, Prompt und Bilddaten). Eine erneut gescrapte oder unter neuer ID wiedereingestellte
+Anzeige mit unverändertem Inhalt wird so ohne erneuten (kostenpflichtigen) Modellaufruf analysiert.
+Die Einträge liegen in einem LRU-Speicher und als JSON-Dateien auf der Festplatte, deren
+Gesamtgröße begrenzt ist.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESPONSE_CACHE_DIR = os.path.join('output', 'response_cache')
+
+_shared_caches = {}  # Verzeichnis -> ResponseCache
+_shared_caches_lock = threading.Lock()
+
+
+def response_key(model_name: str, analysis_type: str, prompt: str, image_hashes: Iterable[str]) -> str:
+    """
+    Berechnet den Schlüssel einer Anfrage.
+
+    Args:
+        model_name (str): Name des Modells
+        analysis_type (str): Typ der Analyse
+        prompt (str): Vorbereiteter Prompt
+        image_hashes (Iterable[str]): SHA-256 der angehängten Bilddaten in Reihenfolge der Anfrage
+
+    Returns:
+        str: Hexadezimaler SHA-256 über alle Bestandteile
+    """
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    material = json.dumps([model_name, analysis_type, prompt_hash, list(image_hashes)])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def get_response_cache(cache_dir: Optional[str] = DEFAULT_RESPONSE_CACHE_DIR, max_entries: int = 128,
+                       max_bytes: int = 64 * 2**20) -> 'ResponseCache':
+    """
+    Liefert den prozessweiten Cache für ein Verzeichnis, damit kurzlebige GeminiAnalyzer-Instanzen
+    denselben LRU-Speicher nutzen. Die Größenangaben gelten beim ersten Aufruf pro Verzeichnis.
+
+    Args:
+        cache_dir (str, optional): Verzeichnis für die Ablage auf der Festplatte (None: nur im Speicher)
+        max_entries (int, optional): Maximale Anzahl der Einträge im Speicher. Standardmäßig 128.
+        max_bytes (int, optional): Maximale Gesamtgröße der Dateien. Standardmäßig 64 MB.
+
+    Returns:
+        ResponseCache: Gemeinsamer Cache
+    """
+    key = os.path.abspath(cache_dir) if cache_dir else None
+    with _shared_caches_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = _shared_caches[key] = ResponseCache(cache_dir, max_entries, max_bytes)
+        return cache
+
+
+class ResponseCache:
+    """Cache für Analyseantworten mit LRU-Speicher und größenbegrenzter Ablage auf der Festplatte."""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_RESPONSE_CACHE_DIR, max_entries: int = 128,
+                 max_bytes: int = 64 * 2**20):
+        """
+        Initialisiert den Cache.
+
+        Args:
+            cache_dir (str, optional): Verzeichnis für die Ablage auf der Festplatte. None deaktiviert die Ablage.
+            max_entries (int, optional): Maximale Anzahl der Einträge im Speicher (LRU). Standardmäßig 128.
+            max_bytes (int, optional): Maximale Gesamtgröße der Dateien; die am längsten nicht genutzten
+                                       werden zuerst gelöscht. Standardmäßig 64 MB.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()  # Schlüssel -> Eintrag
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Liefert einen Eintrag aus dem Speicher oder von der Festplatte.
+
+        Args:
+            key (str): Schlüssel der Anfrage (siehe response_key)
+
+        Returns:
+            Dict[str, Any]: Gespeicherte Antwort oder None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            metrics.inc('response_cache_requests_total', result='hit', layer='memory')
+            return dict(entry)
+
+        entry = self._read_from_disk(key) if self.cache_dir else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, entry)
+        if entry is None:
+            metrics.inc('response_cache_requests_total', result='miss', layer='none')
+            return None
+        metrics.inc('response_cache_requests_total', result='hit', layer='disk')
+        return dict(entry)
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        """
+        Speichert eine Antwort.
+
+        Args:
+            key (str): Schlüssel der Anfrage
+            entry (Dict[str, Any]): JSON-serialisierbare Antwort
+        """
+        entry = dict(entry)
+        with self._lock:
+            self._remember(key, entry)
+        if self.cache_dir:
+            self._write_to_disk(key, entry)
+
+    def stats(self) -> Dict[str, int]:
+        """Liefert Treffer, Fehlschläge, Verdrängungen und die Belegung des Caches"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'disk_bytes': self._disk_bytes,
+            }
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        """Legt einen Eintrag im LRU-Speicher ab (Aufrufer hält die Sperre)"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        """Pfad der Datei eines Eintrags"""
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_from_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Liest einen Eintrag von der Festplatte und markiert ihn als zuletzt genutzt"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Fehler beim Lesen des Cache-Eintrags {path}: {str(e)}")
+            return None
+
+    def _write_to_disk(self, key: str, entry: Dict[str, Any]) -> None:
+        """Schreibt einen Eintrag atomar und löscht bei Überschreitung der Größe die ältesten Einträge"""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        try:
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Fehler beim Speichern des Cache-Eintrags {path}: {str(e)}")
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data) - previous_size
+            over_limit = self._disk_bytes > self.max_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Löscht die am längsten nicht genutzten Dateien, bis die Gesamtgröße eingehalten wird"""
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for path, size, _ in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._disk_bytes = total
+            self.evictions += evicted
+        if evicted:
+            logger.info(f"{evicted} Einträge aus dem Antwort-Cache gelöscht ({total // 1024} KB belegt)")
+
+    def _disk_files(self):
+        """Liefert (Pfad, Größe, letzte Nutzung) aller Dateien im Cache-Verzeichnis"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((path, stat.st_size, stat.st_mtime_ns))
+        return files
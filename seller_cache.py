@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Seller Cache Module
+
+Dieses Modul stellt einen TTL-Cache für Verkäuferprofile bereit, damit Verkäufer mit
+vielen Anzeigen nur einmal pro Gültigkeitsdauer abgerufen werden.
+"""
+
+import os
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+
+
+class SellerProfileCache:
+    """TTL-Cache für Verkäuferprofile mit LRU-Speicher und optionaler Ablage auf der Festplatte."""
+
+    def __init__(self, ttl=86400, max_entries=1024, cache_dir=None):
+        """
+        Initialisiert den Cache.
+
+        Args:
+            ttl (float): Gültigkeitsdauer eines Eintrags in Sekunden
+            max_entries (int): Maximale Anzahl der Einträge im Speicher (LRU)
+            cache_dir (str, optional): Verzeichnis für die Ablage auf der Festplatte
+        """
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()  # user_id -> (cached_at, profile_data)
+        self._lock = threading.Lock()
+        self._loading = {}  # user_id -> Lock für gleichzeitige Abrufe desselben Verkäufers
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get(self, user_id):
+        """
+        Liefert das Profil eines Verkäufers aus dem Cache.
+
+        Args:
+            user_id (str): ID des Verkäufers
+
+        Returns:
+            dict: Profilinformationen oder None, falls kein gültiger Eintrag existiert
+        """
+        profile_data = self._lookup(user_id)
+        with self._lock:
+            if profile_data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return profile_data
+
+    def set(self, user_id, profile_data):
+        """
+        Speichert das Profil eines Verkäufers im Cache.
+
+        Args:
+            user_id (str): ID des Verkäufers
+            profile_data (dict): Profilinformationen
+        """
+        cached_at = time.time()
+        self._remember(user_id, cached_at, copy.deepcopy(profile_data))
+
+        if self.cache_dir:
+            self._write_to_disk(user_id, cached_at, profile_data)
+
+    def get_or_load(self, user_id, loader):
+        """
+        Liefert das Profil aus dem Cache oder lädt es über `loader`.
+
+        Gleichzeitige Anfragen für denselben Verkäufer warten auf den ersten Abruf,
+        statt die Profilseite mehrfach herunterzuladen.
+
+        Args:
+            user_id (str): ID des Verkäufers
+            loader (callable): Funktion ohne Argumente, die das Profil abruft
+
+        Returns:
+            dict: Profilinformationen
+        """
+        profile_data = self._lookup(user_id)
+        if profile_data is not None:
+            with self._lock:
+                self.hits += 1
+            return profile_data
+
+        with self._lock:
+            key_lock = self._loading.setdefault(user_id, threading.Lock())
+
+        with key_lock:
+            # Ein anderer Thread hat das Profil eventuell inzwischen geladen
+            profile_data = self._lookup(user_id)
+            if profile_data is not None:
+                with self._lock:
+                    self.hits += 1
+                return profile_data
+
+            with self._lock:
+                self.misses += 1
+
+            try:
+                profile_data = loader()
+                # Leere Ergebnisse (z.B. nach HTTP-Fehlern) werden nicht zwischengespeichert
+                if profile_data:
+                    self.set(user_id, profile_data)
+                return profile_data
+            finally:
+                with self._lock:
+                    self._loading.pop(user_id, None)
+
+    def _lookup(self, user_id):
+        """Sucht einen gültigen Eintrag im Speicher und danach auf der Festplatte"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                cached_at, profile_data = entry
+                if now - cached_at < self.ttl:
+                    self._entries.move_to_end(user_id)
+                    return copy.deepcopy(profile_data)
+                del self._entries[user_id]
+
+        if not self.cache_dir:
+            return None
+
+        entry = self._read_from_disk(user_id)
+        if entry is None:
+            return None
+
+        cached_at, profile_data = entry
+        if now - cached_at >= self.ttl:
+            return None
+
+        self._remember(user_id, cached_at, profile_data)
+        return copy.deepcopy(profile_data)
+
+    def _remember(self, user_id, cached_at, profile_data):
+        """Legt einen Eintrag im Speicher ab und verdrängt bei Bedarf den ältesten"""
+        with self._lock:
+            self._entries[user_id] = (cached_at, profile_data)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, user_id):
+        """Pfad der Cache-Datei eines Verkäufers"""
+        return os.path.join(self.cache_dir, f"{user_id}.json")
+
+    def _read_from_disk(self, user_id):
+        """Liest einen Eintrag von der Festplatte"""
+        filepath = self._disk_path(user_id)
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry['cached_at'], entry['profile_data']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Fehler beim Lesen des Verkäufer-Caches {filepath}: {str(e)}")
+            return None
+
+    def _write_to_disk(self, user_id, cached_at, profile_data):
+        """Schreibt einen Eintrag atomar auf die Festplatte"""
+        filepath = self._disk_path(user_id)
+        tmp_path = f"{filepath}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'user_id': user_id,
+                    'cached_at': cached_at,
+                    'profile_data': profile_data
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, filepath)
+        except OSError as e:
+            print(f"Fehler beim Schreiben des Verkäufer-Caches {filepath}: {str(e)}")
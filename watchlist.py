@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Watchlist Module
+
+Dieses Modul stellt einen dauerhaft laufenden Planer für beobachtete Anzeigen und Suchen bereit.
+Statt alle Einträge in festen Abständen abzurufen, passt der Planer das Abrufintervall jedes
+Eintrags an seine tatsächliche Änderungshäufigkeit an: Einträge, die sich ändern, werden häufiger
+geprüft, unveränderte seltener. Alle Abrufe teilen sich ein globales Anfragebudget. Änderungen
+(Preisänderungen, entfernte Anzeigen, neue Suchtreffer) werden als Ereignisse an einen Callback
+und/oder in eine JSONL-Datei gemeldet.
+"""
+
+import os
+import json
+import time
+import heapq
+import argparse
+import threading
+from datetime import datetime
+
+from kleinanzeigen_scraper import KleinanzeigenScraper, AdNotFoundError
+from ad_store import AdStore, DEFAULT_DB_PATH
+
+DEFAULT_WATCHLIST_PATH = os.path.join('output', 'watchlist.json')
+
+# Arten beobachteter Einträge
+AD = 'ad'
+SEARCH = 'search'
+
+# Längste Wartezeit zwischen zwei Durchläufen, damit neu hinzugefügte Einträge zeitnah geprüft werden
+MAX_SLEEP = 60
+
+
+class WatchItem:
+    """Eine beobachtete Anzeige oder Suche mit Abrufintervall und zuletzt gesehenem Zustand."""
+
+    def __init__(self, url, kind=AD, interval=3600, next_due=0.0):
+        """
+        Initialisiert den Eintrag.
+
+        Args:
+            url (str): URL der Anzeige bzw. der Such- oder Kategorieseite
+            kind (str): "ad" oder "search"
+            interval (float): Aktuelles Abrufintervall in Sekunden
+            next_due (float): Zeitpunkt der nächsten Prüfung (Unix-Zeit)
+        """
+        self.url = url
+        self.kind = kind
+        self.interval = interval
+        self.next_due = next_due
+        self.fingerprint = None  # Anzeige: Fingerabdruck der zuletzt gesehenen Daten
+        self.price = None
+        self.title = None
+        self.known_ads = []  # Suche: IDs der bereits gesehenen Anzeigen
+        self.checks = 0
+        self.changes = 0
+        self.errors = 0
+        self.last_checked_at = None
+        self.last_changed_at = None
+
+    def to_dict(self):
+        """Liefert den Eintrag als Dictionary für die Watchlist-Datei"""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Erzeugt einen Eintrag aus der Watchlist-Datei"""
+        item = cls(data['url'], data.get('kind', AD), data.get('interval', 3600), data.get('next_due', 0.0))
+        for key, value in data.items():
+            if key in item.__dict__:
+                setattr(item, key, value)
+        return item
+
+
+class RequestBudget:
+    """Token-Bucket für das globale Anfragebudget (Anfragen pro Stunde)."""
+
+    def __init__(self, requests_per_hour, burst=None):
+        """
+        Initialisiert das Budget.
+
+        Args:
+            requests_per_hour (float): Erlaubte HTTP-Anfragen pro Stunde (0 deaktiviert das Budget)
+            burst (float, optional): Maximal angesparte Anfragen, standardmäßig das Budget einer Minute
+        """
+        self.rate = requests_per_hour / 3600
+        self.capacity = burst if burst is not None else max(1.0, requests_per_hour / 60)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def wait_time(self):
+        """Sekunden, bis wieder eine Anfrage erlaubt ist (0, falls sofort)"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def spend(self, count):
+        """
+        Zieht die tatsächlich gestellten Anfragen ab.
+
+        Das Budget darf dabei negativ werden (z.B. wenn eine geänderte Anzeige Bilder nachlädt);
+        die folgenden Prüfungen warten dann entsprechend länger.
+        """
+        if self.rate <= 0:
+            return
+        self._refill()
+        self.tokens -= count
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class WatchlistScheduler:
+    """Prüft beobachtete Anzeigen und Suchen mit adaptiven Intervallen und globalem Anfragebudget."""
+
+    def __init__(self, scraper, path=DEFAULT_WATCHLIST_PATH, event_log=None, on_event=None,
+                 min_interval=300, max_interval=86400, initial_interval=3600,
+                 speedup=0.5, backoff=1.5, requests_per_hour=600, max_pages=3, watch_new_ads=False):
+        """
+        Initialisiert den Planer und lädt die Watchlist-Datei.
+
+        Args:
+            scraper (KleinanzeigenScraper): Scraper für die Abrufe; im inkrementellen Modus kostet eine
+                                            unveränderte Anzeige nur eine Anfrage. None erlaubt nur
+                                            das Verwalten der Watchlist.
+            path (str, optional): Watchlist-Datei (JSON); None hält die Watchlist nur im Speicher
+            event_log (str, optional): JSONL-Datei, an die jedes Ereignis angehängt wird
+            on_event (callable, optional): Wird mit jedem Ereignis (dict) aufgerufen
+            min_interval (float): Kürzestes Abrufintervall in Sekunden
+            max_interval (float): Längstes Abrufintervall in Sekunden
+            initial_interval (float): Abrufintervall neuer Einträge in Sekunden
+            speedup (float): Faktor für das Intervall nach einer Änderung
+            backoff (float): Faktor für das Intervall nach einer Prüfung ohne Änderung
+            requests_per_hour (float): Globales Budget an HTTP-Anfragen pro Stunde (0 = unbegrenzt)
+            max_pages (int): Maximale Anzahl abgerufener Ergebnisseiten pro Suche
+            watch_new_ads (bool): Neue Suchtreffer automatisch als Anzeigen beobachten
+        """
+        self.scraper = scraper
+        self.path = path
+        self.event_log = event_log
+        self.on_event = on_event
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.initial_interval = min(max(initial_interval, self.min_interval), self.max_interval)
+        self.speedup = speedup
+        self.backoff = backoff
+        self.max_pages = max_pages
+        self.watch_new_ads = watch_new_ads
+        self.budget = RequestBudget(requests_per_hour)
+        self.requests = 0
+        self.checks = 0
+        self.events = 0
+
+        self.items = {}  # URL -> WatchItem
+        self._heap = []  # (next_due, Reihenfolge, URL); veraltete Einträge werden beim Entnehmen verworfen
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._request_lock = threading.Lock()
+
+        # Alle HTTP-Anfragen des Scrapers (Seiten, Verkäuferprofile, Bilder, Weiterleitungen) zählen
+        if scraper is not None:
+            scraper.session.hooks['response'].append(self._count_request)
+
+        self._load()
+
+    def add(self, url, kind=AD, interval=None):
+        """
+        Nimmt eine Anzeige oder Suche in die Watchlist auf; sie wird sofort fällig.
+
+        Args:
+            url (str): URL der Anzeige bzw. der Such- oder Kategorieseite
+            kind (str): "ad" oder "search"
+            interval (float, optional): Anfängliches Abrufintervall in Sekunden
+
+        Returns:
+            WatchItem: Der neue oder bereits vorhandene Eintrag
+        """
+        if kind not in (AD, SEARCH):
+            raise ValueError(f"Unbekannte Art: {kind} (erlaubt: {AD}, {SEARCH})")
+
+        with self._lock:
+            item = self.items.get(url)
+            if item is None:
+                item = WatchItem(url, kind, interval or self.initial_interval, time.time())
+                self.items[url] = item
+                self._push(item)
+        self._save()
+        return item
+
+    def remove(self, url):
+        """
+        Entfernt einen Eintrag aus der Watchlist.
+
+        Returns:
+            bool: True, falls der Eintrag vorhanden war
+        """
+        with self._lock:
+            removed = self.items.pop(url, None) is not None
+        if removed:
+            self._save()
+        return removed
+
+    def run_pending(self):
+        """
+        Prüft alle fälligen Einträge, am längsten überfällige zuerst, solange das Budget reicht.
+
+        Returns:
+            int: Anzahl der geprüften Einträge
+        """
+        checked = 0
+        while True:
+            with self._lock:
+                item = self._peek_due()
+                if item is None or self.budget.wait_time() > 0:
+                    break
+                heapq.heappop(self._heap)
+
+            self._check(item)
+            checked += 1
+        return checked
+
+    def seconds_until_next(self):
+        """Sekunden bis zur nächsten möglichen Prüfung (Fälligkeit und Budget), höchstens MAX_SLEEP"""
+        with self._lock:
+            self._discard_stale()
+            if not self._heap:
+                return MAX_SLEEP
+            due_in = self._heap[0][0] - time.time()
+        return min(MAX_SLEEP, max(0.0, due_in, self.budget.wait_time()))
+
+    def run(self, stop_event=None):
+        """
+        Prüft die Watchlist, bis stop_event gesetzt wird.
+
+        Args:
+            stop_event (threading.Event, optional): Beendet die Schleife, sobald es gesetzt ist
+        """
+        stop_event = stop_event or threading.Event()
+        print(f"Watchlist gestartet: {len(self.items)} Einträge, Budget "
+              f"{self.budget.rate * 3600:.0f} Anfragen/h")
+        while not stop_event.is_set():
+            self.run_pending()
+            stop_event.wait(self.seconds_until_next())
+
+    def _check(self, item):
+        """Prüft einen Eintrag, meldet Änderungen und plant die nächste Prüfung"""
+        with self._request_lock:
+            requests_before = self.requests
+
+        try:
+            if item.kind == SEARCH:
+                changed = self._check_search(item)
+            else:
+                changed = self._check_ad(item)
+        except AdNotFoundError as e:
+            self._emit('removed', item, reason=str(e))
+            self.remove(item.url)
+            return
+        except Exception as e:
+            print(f"Fehler beim Prüfen von {item.url}: {str(e)}")
+            item.errors += 1
+            self._emit('error', item, error=str(e))
+            changed = False
+        finally:
+            with self._request_lock:
+                used = self.requests - requests_before
+            self.budget.spend(used)
+            self.checks += 1
+
+        item.checks += 1
+        item.last_checked_at = datetime.now().isoformat()
+        if changed:
+            item.changes += 1
+            item.last_changed_at = item.last_checked_at
+            item.interval = max(self.min_interval, item.interval * self.speedup)
+        else:
+            item.interval = min(self.max_interval, item.interval * self.backoff)
+        item.next_due = time.time() + item.interval
+
+        with self._lock:
+            if self.items.get(item.url) is item:
+                self._push(item)
+        self._save()
+
+    def _check_ad(self, item):
+        """Scrapt eine Anzeige; liefert True, wenn sich ihr Fingerabdruck seit der letzten Prüfung geändert hat"""
+        data = self.scraper.scrape(item.url)
+        fingerprint = data.get('fingerprint')
+        changed = item.fingerprint is not None and fingerprint != item.fingerprint
+
+        if changed:
+            details = {'title': data.get('title')}
+            if data.get('price') != item.price:
+                details['price'] = {'old': item.price, 'new': data.get('price')}
+            history = data.get('history') or []
+            if history and history[-1].get('changed_at') == data.get('scraped_at'):
+                details['change'] = history[-1]
+            self._emit('price_changed' if 'price' in details else 'changed', item, **details)
+
+        item.fingerprint = fingerprint
+        item.price = data.get('price')
+        item.title = data.get('title')
+        return changed
+
+    def _check_search(self, item):
+        """Lädt die Ergebnisseiten einer Suche; liefert True, wenn neue Anzeigen aufgetaucht sind"""
+        first_check = item.checks == 0
+        known = set(item.known_ads)
+        new_urls = {}
+        for ad_url in self.scraper.crawl_listing(item.url, self.max_pages):
+            ad_id = self.scraper._extract_ad_id(ad_url)
+            if ad_id not in known:
+                known.add(ad_id)
+                new_urls[ad_id] = ad_url
+        item.known_ads = sorted(known)
+
+        # Bei der ersten Prüfung sind alle Treffer bekannt, nicht neu
+        if first_check:
+            return False
+
+        for ad_id, ad_url in new_urls.items():
+            self._emit('new_ad', item, ad_id=ad_id, ad_url=ad_url)
+            if self.watch_new_ads:
+                self.add(ad_url, AD)
+        return bool(new_urls)
+
+    def _emit(self, event_type, item, **details):
+        """Meldet ein Ereignis an den Callback und hängt es an die JSONL-Datei an"""
+        event = {'type': event_type, 'kind': item.kind, 'url': item.url, 'at': datetime.now().isoformat()}
+        event.update(details)
+        self.events += 1
+        print(f"Ereignis {event_type}: {item.url}")
+
+        if self.event_log:
+            try:
+                with open(self.event_log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + '\n')
+            except OSError as e:
+                print(f"Fehler beim Schreiben des Ereignisprotokolls {self.event_log}: {str(e)}")
+
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Fehler im Ereignis-Callback: {str(e)}")
+
+    def _count_request(self, response, *args, **kwargs):
+        """Response-Hook der Session: zählt jede HTTP-Anfrage"""
+        with self._request_lock:
+            self.requests += 1
+        return response
+
+    def _push(self, item):
+        """Plant einen Eintrag ein (Aufrufer hält self._lock)"""
+        self._counter += 1
+        heapq.heappush(self._heap, (item.next_due, self._counter, item.url))
+
+    def _discard_stale(self):
+        """Verwirft veraltete Heap-Einträge (entfernt oder neu eingeplant; Aufrufer hält self._lock)"""
+        while self._heap:
+            next_due, _, url = self._heap[0]
+            item = self.items.get(url)
+            if item is not None and item.next_due == next_due:
+                return
+            heapq.heappop(self._heap)
+
+    def _peek_due(self):
+        """Liefert den am längsten fälligen Eintrag oder None (Aufrufer hält self._lock)"""
+        self._discard_stale()
+        if not self._heap or self._heap[0][0] > time.time():
+            return None
+        return self.items[self._heap[0][2]]
+
+    def _load(self):
+        """Lädt die Watchlist-Datei"""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Fehler beim Lesen der Watchlist {self.path}: {str(e)}")
+            return
+
+        with self._lock:
+            for entry in entries:
+                item = WatchItem.from_dict(entry)
+                self.items[item.url] = item
+                self._push(item)
+
+    def _save(self):
+        """Schreibt die Watchlist-Datei atomar"""
+        if not self.path:
+            return
+
+        with self._lock:
+            entries = [item.to_dict() for item in self.items.values()]
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Fehler beim Speichern der Watchlist {self.path}: {str(e)}")
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description='Beobachtete Anzeigen und Suchen mit adaptiven Intervallen prüfen')
+    parser.add_argument('--watchlist', default=DEFAULT_WATCHLIST_PATH, help='Watchlist-Datei (JSON)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add_parser = subparsers.add_parser('add', help='Anzeige oder Suche beobachten')
+    add_parser.add_argument('url', help='URL der Anzeige bzw. der Such- oder Kategorieseite')
+    add_parser.add_argument('--search', action='store_true', help='Die URL ist eine Such- oder Kategorieseite')
+    add_parser.add_argument('--interval', type=float, default=None, help='Anfängliches Abrufintervall in Sekunden')
+
+    remove_parser = subparsers.add_parser('remove', help='Eintrag aus der Watchlist entfernen')
+    remove_parser.add_argument('url', help='URL des Eintrags')
+
+    subparsers.add_parser('list', help='Watchlist anzeigen')
+
+    run_parser = subparsers.add_parser('run', help='Watchlist dauerhaft prüfen')
+    run_parser.add_argument('--output', '-o', default='output', help='Ausgabeverzeichnis')
+    run_parser.add_argument('--db', metavar='DATEI', default=None,
+                            help=f'Anzeigen in einer SQLite-Datenbank ablegen (z.B. {DEFAULT_DB_PATH})')
+    run_parser.add_argument('--events', metavar='DATEI', default=os.path.join('output', 'watchlist_events.jsonl'),
+                            help='JSONL-Datei für Änderungsereignisse')
+    run_parser.add_argument('--budget', type=float, default=600, help='Globales Budget an HTTP-Anfragen pro Stunde')
+    run_parser.add_argument('--min-interval', type=float, default=300, help='Kürzestes Abrufintervall in Sekunden')
+    run_parser.add_argument('--max-interval', type=float, default=86400, help='Längstes Abrufintervall in Sekunden')
+    run_parser.add_argument('--max-pages', type=int, default=3, help='Maximale Anzahl der Ergebnisseiten pro Suche')
+    run_parser.add_argument('--watch-new-ads', action='store_true', help='Neue Suchtreffer automatisch beobachten')
+    run_parser.add_argument('--once', action='store_true', help='Nur die aktuell fälligen Einträge prüfen und beenden')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        scraper = KleinanzeigenScraper(output_dir=args.output, ad_store=AdStore(args.db) if args.db else None,
+                                       incremental=True)
+        with scraper:
+            scheduler = WatchlistScheduler(scraper, args.watchlist, event_log=args.events,
+                                           min_interval=args.min_interval, max_interval=args.max_interval,
+                                           requests_per_hour=args.budget, max_pages=args.max_pages,
+                                           watch_new_ads=args.watch_new_ads)
+            try:
+                if args.once:
+                    scheduler.run_pending()
+                else:
+                    scheduler.run()
+            except KeyboardInterrupt:
+                pass
+            print(f"{scheduler.checks} Prüfungen, {scheduler.requests} Anfragen, {scheduler.events} Ereignisse")
+        return
+
+    # Verwaltung der Watchlist-Datei ohne HTTP-Session
+    scheduler = WatchlistScheduler(None, args.watchlist)
+    if args.command == 'add':
+        item = scheduler.add(args.url, SEARCH if args.search else AD, args.interval)
+        print(f"Beobachtet ({item.kind}): {item.url}")
+    elif args.command == 'remove':
+        if not scheduler.remove(args.url):
+            print(f"Nicht in der Watchlist: {args.url}")
+    else:
+        for item in sorted(scheduler.items.values(), key=lambda item: item.next_due):
+            due = datetime.fromtimestamp(item.next_due).strftime('%Y-%m-%d %H:%M')
+            print(f"{item.kind:<6}  {due}  alle {item.interval / 60:>6.0f} min  "
+                  f"{item.checks:>4} Prüfungen  {item.changes:>3} Änderungen  {item.url}")
+
+
+if __name__ == "__main__":
+    main()